@@ -0,0 +1,471 @@
+"""Alpha-beta negamax computer player for Connect 5."""
+
+import sys
+import time
+from typing import List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from bitboard import BitBoard, CONNECT_LENGTH
+from connect5 import Connect5Game, TIMER_MAX
+from windows import WindowCounts, window_weights
+
+if TYPE_CHECKING:
+    from opening_book import OpeningBook
+
+# Constants
+WIN_SCORE = 1000000
+WIN_THRESHOLD = WIN_SCORE - 1000
+INFINITY = WIN_SCORE + 1
+DRAW_SCORE = 0
+
+# Score for a window holding 1, 2, 3 or 4 stones of one player only,
+# other run lengths use windows.window_weights
+WINDOW_WEIGHTS = (0, 1, 4, 32, 512)
+
+TT_SIZE = 1 << 20
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+HASH_MASK = (1 << 64) - 1
+
+TIME_CHECK_INTERVAL = 1023
+# Time kept back from TIMER_MAX so a move is always made in time
+TIME_MARGIN = 250
+MS_PER_SECOND = 1000
+
+
+class SearchResult(NamedTuple):
+    """
+    The outcome of a search.
+
+    Attributes:
+        column (int): The best column found.
+        score (int): The score of the best column for the side to move.
+        depth (int): The deepest fully completed search depth.
+        nodes (int): The number of positions visited.
+        elapsed (float): Wall-clock search time in seconds.
+        nodes_per_second (float): Search throughput.
+    """
+
+    column: int
+    score: int
+    depth: int
+    nodes: int
+    elapsed: float
+    nodes_per_second: float
+
+
+class _SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out."""
+
+
+class TranspositionTable:
+    """
+    A fixed-size transposition table keyed by position hash.
+
+    Each key hashes to a single slot. A slot is replaced when it is
+    empty, holds the same position, was written by an older search, or
+    holds a shallower result than the new one (depth-preferred).
+
+    Attributes:
+        size (int): The number of slots, a power of two.
+        slots (List[Optional[tuple]]): The table entries, stored as
+        (key, depth, flag, score, column, generation) tuples.
+        generation (int): The current search generation.
+    """
+
+    def __init__(self, size: int = TT_SIZE) -> None:
+        """
+        Initialize an empty TranspositionTable.
+
+        Args:
+            size (int): The number of slots, rounded up to a power of two.
+
+        Returns:
+        None
+        """
+        bits = max(size - 1, 1).bit_length()
+        self.size = 1 << bits
+        self._shift = 64 - bits
+        self.slots: List[Optional[tuple]] = [None] * self.size
+        self.generation = 0
+
+    def _index(self, key: int) -> int:
+        """
+        Map a key to a slot index using multiplicative hashing.
+
+        Args:
+            key (int): The position key.
+
+        Returns:
+            int: The slot index.
+        """
+        return ((key * HASH_MULTIPLIER) & HASH_MASK) >> self._shift
+
+    def probe(self, key: int) -> Optional[tuple]:
+        """
+        Look up a position.
+
+        Args:
+            key (int): The position key.
+
+        Returns:
+            Optional[tuple]: The stored entry, or None if not present.
+        """
+        entry = self.slots[self._index(key)]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int,
+              column: int) -> None:
+        """
+        Store a search result, following the replacement policy.
+
+        Args:
+            key (int): The position key.
+            depth (int): The remaining depth the score was searched to.
+            flag (int): TT_EXACT, TT_LOWER or TT_UPPER.
+            score (int): The score of the position.
+            column (int): The best column found.
+
+        Returns:
+        None
+        """
+        index = self._index(key)
+        entry = self.slots[index]
+        if (entry is None or entry[0] == key or
+                entry[5] != self.generation or depth >= entry[1]):
+            self.slots[index] = (key, depth, flag, score, column,
+                                 self.generation)
+
+    def new_search(self) -> None:
+        """
+        Start a new generation so older entries become replaceable.
+
+        Returns:
+        None
+        """
+        self.generation += 1
+
+
+class NegamaxPlayer:
+    """
+    An iterative-deepening negamax player with alpha-beta pruning.
+
+    Attributes:
+        table (TranspositionTable): Results shared between searches.
+        book (Optional[OpeningBook]): Opening moves played without search.
+        nodes (int): Positions visited by the current search.
+    """
+
+    def __init__(self, table_size: int = TT_SIZE,
+                 book: Optional["OpeningBook"] = None) -> None:
+        """
+        Initialize a NegamaxPlayer.
+
+        Args:
+            table_size (int): The number of transposition table slots.
+            book (Optional[OpeningBook]): An opening book to consult
+            before searching.
+
+        Returns:
+        None
+        """
+        self.table = TranspositionTable(table_size)
+        self.book = book
+        self.nodes = 0
+        self._deadline = 0.0
+        self._shape: Tuple[int, int, int] = (0, 0, 0)
+        self._counts: Optional[WindowCounts] = None
+        self._weights: Tuple[int, ...] = WINDOW_WEIGHTS
+        self._order: Tuple[int, ...] = ()
+
+    def search(self, game: Connect5Game,
+               time_budget: int = TIMER_MAX,
+               max_depth: Optional[int] = None) -> SearchResult:
+        """
+        Search for the best column for the player whose turn it is.
+
+        Args:
+            game (Connect5Game): The game to search, which is not changed.
+            A GameState works too.
+            time_budget (int): Time allowed in milliseconds, capped to
+            stay inside the TIMER_MAX turn timer.
+            max_depth (Optional[int]): Stop after this depth, defaults
+            to the number of empty cells.
+
+        Returns:
+            SearchResult: The best column and search statistics.
+        """
+        board = game.bitboard.copy()
+        piece = game.turn + 1
+        legal = board.legal_columns
+        if not legal:
+            raise ValueError("no legal moves left")
+        if self.book is not None:
+            entry = self.book.probe(game)
+            if entry is not None:
+                return SearchResult(entry.column, entry.score, 0, 0, 0.0,
+                                    0.0)
+        self._prepare(board)
+        # Window counts follow every play and undo, so a leaf is scored
+        # without scanning the board
+        self._counts = WindowCounts.from_board(board, self._weights)
+
+        budget = min(time_budget, TIMER_MAX - TIME_MARGIN)
+        start = time.perf_counter()
+        self._deadline = start + budget / MS_PER_SECOND
+        self.nodes = 0
+        self.table.new_search()
+        if max_depth is None:
+            max_depth = board.rows * board.columns - sum(board.heights)
+
+        best_column = self._order_moves(board, None)[0]
+        best_score = DRAW_SCORE
+        completed = 0
+        for depth in range(1, max_depth + 1):
+            try:
+                score, column = self._root(board, piece, depth)
+            except _SearchTimeout:
+                break
+            best_score, best_column, completed = score, column, depth
+            # A forced result will not change with more depth
+            if abs(score) >= WIN_THRESHOLD:
+                break
+
+        elapsed = time.perf_counter() - start
+        return SearchResult(best_column, best_score, completed, self.nodes,
+                            elapsed, self.nodes / elapsed if elapsed else 0.0)
+
+    def _prepare(self, board: BitBoard) -> None:
+        """
+        Build the window weights and move order for the board.
+
+        Args:
+            board (BitBoard): The board to prepare for.
+
+        Returns:
+        None
+        """
+        shape = (board.rows, board.columns, board.connect)
+        if shape == self._shape:
+            return
+        if board.connect == CONNECT_LENGTH:
+            self._weights = WINDOW_WEIGHTS
+        else:
+            self._weights = window_weights(board.connect)
+        center = (board.columns - 1) / 2
+        self._shape = shape
+        self._order = tuple(sorted(range(board.columns),
+                                   key=lambda col: abs(col - center)))
+
+    def _order_moves(self, board: BitBoard,
+                     first: Optional[int]) -> List[int]:
+        """
+        Order the legal columns center first, after a preferred column.
+
+        Args:
+            board (BitBoard): The board to order moves for.
+            first (Optional[int]): A column to try first, if legal.
+
+        Returns:
+            List[int]: The legal columns in search order.
+        """
+        legal = board.legal_mask
+        moves = [col for col in self._order if (legal >> col) & 1]
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def _root(self, board: BitBoard, piece: int,
+              depth: int) -> Tuple[int, int]:
+        """
+        Search the root position to a fixed depth.
+
+        Args:
+            board (BitBoard): The board to search.
+            piece (int): The piece to move.
+            depth (int): The depth to search to.
+
+        Returns:
+            Tuple[int, int]: The best score and column.
+        """
+        key, mirrored = board.canonical_hash(piece)
+        entry = self.table.probe(key)
+        tt_column = None
+        if entry is not None:
+            tt_column = entry[4]
+            if mirrored:
+                tt_column = board.columns - 1 - tt_column
+        moves = self._order_moves(board, tt_column)
+        alpha = -INFINITY
+        best_column = moves[0]
+        for col in moves:
+            row = board.play(col, piece)
+            if board.wins_at(row, col, piece):
+                score = WIN_SCORE
+            else:
+                index = col * board.stride + row
+                self._counts.add(index, piece)
+                score = -self._negamax(board, 3 - piece, depth - 1,
+                                       -INFINITY, -alpha, 1)
+                self._counts.remove(index)
+            board.undo(col)
+            if score > alpha:
+                alpha = score
+                best_column = col
+        self.table.store(key, depth, TT_EXACT, alpha,
+                         board.columns - 1 - best_column if mirrored
+                         else best_column)
+        return alpha, best_column
+
+    def _negamax(self, board: BitBoard, piece: int, depth: int,
+                 alpha: int, beta: int, ply: int) -> int:
+        """
+        Score a position for the side to move with alpha-beta pruning.
+
+        Args:
+            board (BitBoard): The board to search.
+            piece (int): The piece to move.
+            depth (int): The remaining depth.
+            alpha (int): The lower bound of the search window.
+            beta (int): The upper bound of the search window.
+            ply (int): The distance from the root.
+
+        Returns:
+            int: The score of the position for the side to move.
+        """
+        self.nodes += 1
+        if (not self.nodes & TIME_CHECK_INTERVAL and
+                time.perf_counter() > self._deadline):
+            raise _SearchTimeout
+        if not board.legal_mask:
+            return DRAW_SCORE
+        if depth == 0:
+            return self._counts.score_for(piece)
+
+        # A position and its mirror image share one entry, with the
+        # column stored as seen from the smaller of the two hashes
+        key, mirrored = board.canonical_hash(piece)
+        entry = self.table.probe(key)
+        tt_column = None
+        if entry is not None:
+            tt_column = entry[4]
+            if mirrored:
+                tt_column = board.columns - 1 - tt_column
+            if entry[1] >= depth:
+                score = _score_from_table(entry[3], ply)
+                if entry[2] == TT_EXACT:
+                    return score
+                if entry[2] == TT_LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_column = tt_column
+        for col in self._order_moves(board, tt_column):
+            row = board.play(col, piece)
+            if board.wins_at(row, col, piece):
+                score = WIN_SCORE - ply
+            else:
+                index = col * board.stride + row
+                self._counts.add(index, piece)
+                score = -self._negamax(board, 3 - piece, depth - 1,
+                                       -beta, -alpha, ply + 1)
+                self._counts.remove(index)
+            board.undo(col)
+            if score > best_score:
+                best_score = score
+                best_column = col
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= original_alpha:
+            flag = TT_UPPER
+        elif best_score >= beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        if mirrored:
+            best_column = board.columns - 1 - best_column
+        self.table.store(key, depth, flag, _score_to_table(best_score, ply),
+                         best_column)
+        return best_score
+
+
+def _score_to_table(score: int, ply: int) -> int:
+    """
+    Make a win score relative to the stored position.
+
+    Args:
+        score (int): The score relative to the root.
+        ply (int): The distance from the root.
+
+    Returns:
+        int: The score to store.
+    """
+    if score >= WIN_THRESHOLD:
+        return score + ply
+    if score <= -WIN_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score: int, ply: int) -> int:
+    """
+    Make a stored win score relative to the root again.
+
+    Args:
+        score (int): The stored score.
+        ply (int): The distance from the root.
+
+    Returns:
+        int: The score relative to the root.
+    """
+    if score >= WIN_THRESHOLD:
+        return score - ply
+    if score <= -WIN_THRESHOLD:
+        return score + ply
+    return score
+
+
+_default_player: Optional[NegamaxPlayer] = None
+
+
+def best_move(game: Connect5Game, time_budget: int = TIMER_MAX) -> int:
+    """
+    Find the best column for the player whose turn it is.
+
+    A module level NegamaxPlayer is reused so its transposition table
+    carries over between turns.
+
+    Args:
+        game (Connect5Game): The game to pick a move for.
+        time_budget (int): Time allowed in milliseconds.
+
+    Returns:
+        int: The column to play.
+    """
+    global _default_player
+    if _default_player is None:
+        _default_player = NegamaxPlayer()
+    return _default_player.search(game, time_budget).column
+
+
+if __name__ == "__main__":
+    # Search the opening position and report search throughput
+    budget = int(sys.argv[1]) if len(sys.argv) > 1 else TIMER_MAX
+    result = NegamaxPlayer().search(Connect5Game(), budget)
+    print(f"column={result.column} score={result.score} "
+          f"depth={result.depth} nodes={result.nodes} "
+          f"time={result.elapsed:.2f}s "
+          f"nodes/s={result.nodes_per_second:.0f}")
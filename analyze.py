@@ -0,0 +1,253 @@
+"""Analyse Connect 5 positions in bulk, streaming JSON lines.
+
+Each input line is one position given as the columns played from the
+start. The columns are separated by spaces or commas, or written as
+bare digits ("3443") on boards with at most ten columns. -1 is a turn
+lost to the hidden turn timer and an empty line is the empty board.
+Each output line is a JSON object with the line number, the winner,
+the legal moves and the best move and score found by the negamax
+search. Results come out in input order.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import (Deque, Dict, Iterable, Iterator, List, Optional, TextIO,
+                    Tuple)
+
+import ai
+from bitboard import CONNECT_LENGTH
+from connect5 import COLUMN_COUNT, ROW_COUNT, TIMER_FORFEIT, TIMER_MAX
+from state import GameState
+
+# Constants
+SEARCH_DEPTH = 6
+ANALYSIS_TABLE_SIZE = 1 << 16
+CHUNK_LINES = 64
+IN_FLIGHT_PER_WORKER = 4
+SEPARATORS = re.compile(r"[\s,]+")
+DIGIT_COLUMNS = 10  # widest board whose columns fit in one digit
+
+Settings = Tuple[Tuple[int, int, int], int, int]
+
+# Opening book opened once per worker process
+_book = None
+
+
+def parse_moves(text: str, columns: int) -> List[int]:
+    """
+    Parse a move string.
+
+    Args:
+        text (str): Columns separated by spaces or commas, or digits.
+        columns (int): Number of columns on the board.
+
+    Returns:
+        List[int]: The columns played, TIMER_FORFEIT for lost turns.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if (SEPARATORS.search(text) or columns > DIGIT_COLUMNS or
+            text.startswith("-")):
+        return [int(word) for word in SEPARATORS.split(text) if word]
+    return [int(digit) for digit in text]
+
+
+def analyse(text: str, settings: Settings) -> Dict[str, object]:
+    """
+    Replay a position and search it.
+
+    Every position gets a new transposition table, so the result does
+    not depend on which worker analysed which lines before it.
+
+    Args:
+        text (str): The move string.
+        settings (Settings): The board shape, search depth and time
+        budget in milliseconds.
+
+    Returns:
+        Dict[str, object]: The analysis, or an error message.
+    """
+    shape, depth, budget = settings
+    state = GameState(*shape)
+    try:
+        for col in parse_moves(text, state.bitboard.columns):
+            if col == TIMER_FORFEIT:
+                state.pass_turn()
+            else:
+                state.play(col)
+    except ValueError as error:
+        return {"error": str(error)}
+    result: Dict[str, object] = {
+        "winner": state.winner,
+        "to_move": state.turn + 1,
+        "legal_moves": list(state.legal_moves()),
+        "best_move": None,
+        "score": None,
+        "depth": 0,
+    }
+    if not state.is_over():
+        player = ai.NegamaxPlayer(ANALYSIS_TABLE_SIZE, _book)
+        search = player.search(state, budget, depth)
+        result.update(best_move=search.column, score=search.score,
+                      depth=search.depth)
+    return result
+
+
+def _open_book(path: Optional[str]) -> None:
+    """
+    Open the opening book in a worker process.
+
+    Args:
+        path (Optional[str]): The book file, or None for no book.
+
+    Returns:
+    None
+    """
+    global _book
+    if path is not None:
+        import opening_book
+        _book = opening_book.OpeningBook(path)
+
+
+def _analyse_chunk(args: Tuple[List[Tuple[int, str]], Settings]
+                   ) -> List[str]:
+    """
+    Analyse a chunk of numbered lines into JSON lines.
+
+    Args:
+        args (tuple): The (line number, text) pairs and the settings.
+
+    Returns:
+        List[str]: One JSON line per input line.
+    """
+    lines, settings = args
+    out = []
+    for number, text in lines:
+        record = {"line": number, "moves": text.strip()}
+        record.update(analyse(text, settings))
+        out.append(json.dumps(record))
+    return out
+
+
+def _chunks(lines: Iterable[str],
+            size: int) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Group lines into numbered chunks.
+
+    Args:
+        lines (Iterable[str]): The input lines.
+        size (int): Lines per chunk.
+
+    Returns:
+        Iterator[List[Tuple[int, str]]]: The chunks in order.
+    """
+    chunk = []
+    for number, text in enumerate(lines, 1):
+        chunk.append((number, text))
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(lines: Iterable[str], out: TextIO, settings: Settings,
+        workers: int = 1, book: Optional[str] = None,
+        chunk_lines: int = CHUNK_LINES) -> int:
+    """
+    Analyse every line and write the results in input order.
+
+    At most IN_FLIGHT_PER_WORKER chunks per worker are submitted ahead
+    of the output, so memory stays flat however large the input is.
+
+    Args:
+        lines (Iterable[str]): The input lines, read lazily.
+        out (TextIO): Where the JSON lines are written.
+        settings (Settings): The board shape, search depth and time
+        budget in milliseconds.
+        workers (int): Number of processes, 1 analyses in this process.
+        book (Optional[str]): An opening book file to consult.
+        chunk_lines (int): Lines sent to a worker at once.
+
+    Returns:
+        int: Number of positions analysed.
+    """
+    count = 0
+    if workers == 1:
+        _open_book(book)
+        for chunk in _chunks(lines, chunk_lines):
+            for line in _analyse_chunk((chunk, settings)):
+                out.write(line + "\n")
+            count += len(chunk)
+        return count
+
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(workers, initializer=_open_book,
+                             initargs=(book,)) as pool:
+        for chunk in _chunks(lines, chunk_lines):
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                # Write the oldest chunk before reading any further
+                for line in pending.popleft().result():
+                    out.write(line + "\n")
+            pending.append(pool.submit(_analyse_chunk, (chunk, settings)))
+            count += len(chunk)
+        while pending:
+            for line in pending.popleft().result():
+                out.write(line + "\n")
+    return count
+
+
+def main() -> None:
+    """
+    Analyse positions from files or stdin from the command line.
+
+    Returns:
+    None
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", metavar="FILE",
+                        help="files of move strings (default: stdin)")
+    parser.add_argument("--output", "-o", metavar="FILE",
+                        help="write JSON lines here instead of stdout")
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH,
+                        help="search depth per position")
+    parser.add_argument("--time", type=int, default=TIMER_MAX,
+                        help="search time per position in milliseconds")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: number of cores)")
+    parser.add_argument("--book", metavar="FILE",
+                        help="opening book to consult before searching")
+    parser.add_argument("--rows", type=int, default=ROW_COUNT)
+    parser.add_argument("--columns", type=int, default=COLUMN_COUNT)
+    parser.add_argument("--connect", type=int, default=CONNECT_LENGTH)
+    options = parser.parse_args()
+
+    settings = ((options.rows, options.columns, options.connect),
+                options.depth, options.time)
+    workers = options.workers or os.cpu_count() or 1
+
+    def read_lines() -> Iterator[str]:
+        if not options.inputs:
+            yield from sys.stdin
+        for path in options.inputs:
+            with open(path) as file:
+                yield from file
+
+    out = open(options.output, "w") if options.output else sys.stdout
+    try:
+        run(read_lines(), out, settings, workers, options.book)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Vectorized NumPy win detection over batches of Connect 5 boards."""
+
+from typing import Iterable
+
+import numpy as np
+
+from bitboard import CONNECT_LENGTH, PLAYER_ONE_PIECE, PLAYER_TWO_PIECE
+from connect5 import Connect5Game
+
+# Constants
+NO_WINNER = 0
+BOTH_WIN = 3
+
+
+def batch_win_check(boards: np.ndarray, piece: int,
+                    length: int = CONNECT_LENGTH) -> np.ndarray:
+    """
+    Check a batch of boards for a winning line of one piece.
+
+    A line of ``length`` cells starting at a cell is found by ANDing
+    ``length`` shifted views of the piece mask, once for each of the
+    vertical, horizontal and both diagonal directions.
+
+    Args:
+        boards (np.ndarray): Boards shaped (N, ROW_COUNT, COLUMN_COUNT)
+        laid out like Connect5Game.board (row 0 at the bottom).
+        piece (int): The piece (player) to check for a win.
+        length (int): The number of pieces in a row needed to win.
+
+    Returns:
+        np.ndarray: A bool array of shape (N,), matching
+        Connect5Game.win_check(piece) for each board.
+    """
+    mask = np.asarray(boards) == piece
+    count, rows, columns = mask.shape
+    found = np.zeros(count, dtype=bool)
+    span = length - 1
+    if rows > span:
+        # Vertical lines
+        run = mask[:, :rows - span, :].copy()
+        for i in range(1, length):
+            run &= mask[:, i:rows - span + i, :]
+        found |= run.any(axis=(1, 2))
+    if columns > span:
+        # Horizontal lines
+        run = mask[:, :, :columns - span].copy()
+        for i in range(1, length):
+            run &= mask[:, :, i:columns - span + i]
+        found |= run.any(axis=(1, 2))
+    if rows > span and columns > span:
+        # Positively sloped diagonals
+        run = mask[:, :rows - span, :columns - span].copy()
+        for i in range(1, length):
+            run &= mask[:, i:rows - span + i, i:columns - span + i]
+        found |= run.any(axis=(1, 2))
+        # Negatively sloped diagonals
+        run = mask[:, span:, :columns - span].copy()
+        for i in range(1, length):
+            run &= mask[:, span - i:rows - i, i:columns - span + i]
+        found |= run.any(axis=(1, 2))
+    return found
+
+
+def batch_winners(boards: np.ndarray,
+                  length: int = CONNECT_LENGTH) -> np.ndarray:
+    """
+    Find the winner of every board in a batch.
+
+    Args:
+        boards (np.ndarray): Boards shaped (N, ROW_COUNT, COLUMN_COUNT).
+        length (int): The number of pieces in a row needed to win.
+
+    Returns:
+        np.ndarray: An int array of shape (N,) holding the winning
+        piece, NO_WINNER, or BOTH_WIN if both players have a line.
+    """
+    one = batch_win_check(boards, PLAYER_ONE_PIECE, length)
+    two = batch_win_check(boards, PLAYER_TWO_PIECE, length)
+    return (one * PLAYER_ONE_PIECE + two * PLAYER_TWO_PIECE).astype(np.int8)
+
+
+def stack_boards(games: Iterable[Connect5Game]) -> np.ndarray:
+    """
+    Stack the boards of several games into one batch array.
+
+    Args:
+        games (Iterable[Connect5Game]): Games with boards of equal size.
+
+    Returns:
+        np.ndarray: An int8 array shaped (N, ROW_COUNT, COLUMN_COUNT).
+    """
+    return np.array([game.board for game in games], dtype=np.int8)
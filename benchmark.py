@@ -0,0 +1,320 @@
+"""Micro- and macro-benchmarks for the Connect 5 rules and rendering."""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from connect5 import Connect5Game, EMPTY_CELL
+from state import GameState
+
+# Constants
+MIN_TIME = 0.2  # seconds each timing run should last
+REPEAT = 5
+DEFAULT_THRESHOLD = 0.9
+BENCH_SEED = 12345
+MID_GAME_MOVES = 20
+
+# A benchmark returns a function doing a batch of work and the number
+# of operations in one batch
+Benchmark = Callable[[], Tuple[Callable[[], None], int]]
+
+
+def _random_game(moves: Optional[int], seed: int = BENCH_SEED
+                 ) -> Connect5Game:
+    """
+    Play random moves that do not win, to build a test position.
+
+    Args:
+        moves (Optional[int]): Number of moves, or None to fill the board.
+        seed (int): The random seed.
+
+    Returns:
+        Connect5Game: The game after the moves.
+    """
+    rng = random.Random(seed)
+    game = Connect5Game()
+    piece = 1
+    played = 0
+    while game.legal_moves() and (moves is None or played < moves):
+        # Prefer moves that do not end the game
+        columns = list(game.legal_moves())
+        rng.shuffle(columns)
+        for col in columns:
+            row = game.get_next_open_row(col)
+            game.drop_piece(row, col, piece)
+            if not game.win_check_at(row, col, piece):
+                break
+            game.drop_piece(row, col, 3 - piece)
+            if not game.win_check_at(row, col, 3 - piece):
+                break
+            game.drop_piece(row, col, EMPTY_CELL)
+        else:
+            break
+        piece = 3 - piece
+        played += 1
+    return game
+
+
+def bench_drop_piece() -> Tuple[Callable[[], None], int]:
+    """Fill an empty board with drop_piece, then clear it again."""
+    game = Connect5Game()
+    cells = [(row, col) for col in range(game.COLUMN_COUNT)
+             for row in range(game.ROW_COUNT)]
+    pieces = [1 + (i % 2) for i in range(len(cells))]
+
+    def run() -> None:
+        drop = game.drop_piece
+        for (row, col), piece in zip(cells, pieces):
+            drop(row, col, piece)
+        for row, col in reversed(cells):
+            drop(row, col, EMPTY_CELL)
+    return run, 2 * len(cells)
+
+
+def bench_get_next_open_row() -> Tuple[Callable[[], None], int]:
+    """Find the open row of every column of a mid-game board."""
+    game = _random_game(MID_GAME_MOVES)
+    columns = range(game.COLUMN_COUNT)
+
+    def run() -> None:
+        next_row = game.get_next_open_row
+        for col in columns:
+            next_row(col)
+    return run, game.COLUMN_COUNT
+
+
+def _bench_win_check(moves: Optional[int]
+                     ) -> Tuple[Callable[[], None], int]:
+    """
+    Check both players for a win on one board.
+
+    Args:
+        moves (Optional[int]): Moves played first, None fills the board.
+
+    Returns:
+        Tuple[Callable[[], None], int]: The batch function and its size.
+    """
+    game = _random_game(moves)
+
+    def run() -> None:
+        game.win_check(1)
+        game.win_check(2)
+    return run, 2
+
+
+def bench_win_check_empty() -> Tuple[Callable[[], None], int]:
+    """win_check on an empty board."""
+    return _bench_win_check(0)
+
+
+def bench_win_check_mid() -> Tuple[Callable[[], None], int]:
+    """win_check on a mid-game board."""
+    return _bench_win_check(MID_GAME_MOVES)
+
+
+def bench_win_check_full() -> Tuple[Callable[[], None], int]:
+    """win_check on a full board without a winner."""
+    return _bench_win_check(None)
+
+
+def bench_win_check_at() -> Tuple[Callable[[], None], int]:
+    """win_check_at through every top checker of a full board."""
+    game = _random_game(None)
+    cells = []
+    for col in range(game.COLUMN_COUNT):
+        row = game.heights[col] - 1
+        if row >= 0:
+            cells.append((row, col, game.board[row][col]))
+
+    def run() -> None:
+        check = game.win_check_at
+        for row, col, piece in cells:
+            check(row, col, piece)
+    return run, len(cells)
+
+
+def bench_random_playout() -> Tuple[Callable[[], None], int]:
+    """Play a full random game from an empty board."""
+    rng = random.Random(BENCH_SEED)
+
+    def run() -> None:
+        game = Connect5Game()
+        piece = 1
+        while game.legal_moves():
+            col = rng.choice(game.legal_moves())
+            row = game.get_next_open_row(col)
+            game.drop_piece(row, col, piece)
+            if game.win_check_at(row, col, piece):
+                break
+            piece = 3 - piece
+    return run, 1
+
+
+def bench_state_play_undo() -> Tuple[Callable[[], None], int]:
+    """Play every legal column of a mid-game GameState and take it back."""
+    state = GameState.from_game(_random_game(MID_GAME_MOVES))
+    columns = state.legal_moves()
+
+    def run() -> None:
+        play = state.play
+        undo = state.undo
+        for col in columns:
+            play(col)
+            undo()
+    return run, 2 * len(columns)
+
+
+def bench_draw_board() -> Tuple[Callable[[], None], int]:
+    """Draw a mid-game board with SDL's dummy video driver."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    game = _random_game(MID_GAME_MOVES)
+    game.open_window()
+
+    def run() -> None:
+        game.draw_board()
+    return run, 1
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "drop_piece": bench_drop_piece,
+    "get_next_open_row": bench_get_next_open_row,
+    "win_check_empty": bench_win_check_empty,
+    "win_check_mid": bench_win_check_mid,
+    "win_check_full": bench_win_check_full,
+    "win_check_at": bench_win_check_at,
+    "random_playout": bench_random_playout,
+    "state_play_undo": bench_state_play_undo,
+    "draw_board": bench_draw_board,
+}
+
+
+def measure(benchmark: Benchmark, min_time: float = MIN_TIME,
+            repeat: int = REPEAT) -> float:
+    """
+    Time a benchmark and return its best rate.
+
+    The number of batches per run is doubled until a run takes at
+    least min_time, then the best of repeat runs is used.
+
+    Args:
+        benchmark (Benchmark): The benchmark to time.
+        min_time (float): Minimum length of a timing run in seconds.
+        repeat (int): Number of timing runs.
+
+    Returns:
+        float: Operations per second.
+    """
+    run, ops = benchmark()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        best = min(best, time.perf_counter() - start)
+    return loops * ops / best
+
+
+def run_benchmarks(names: List[str], min_time: float = MIN_TIME,
+                   repeat: int = REPEAT) -> Dict[str, float]:
+    """
+    Run several benchmarks.
+
+    Args:
+        names (List[str]): Names of the benchmarks to run.
+        min_time (float): Minimum length of a timing run in seconds.
+        repeat (int): Number of timing runs per benchmark.
+
+    Returns:
+        Dict[str, float]: Operations per second for each benchmark.
+    """
+    return {name: measure(BENCHMARKS[name], min_time, repeat)
+            for name in names}
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            threshold: float) -> bool:
+    """
+    Print results next to a baseline and check for regressions.
+
+    Args:
+        results (Dict[str, float]): Operations per second to check.
+        baseline (Dict[str, float]): Saved operations per second.
+        threshold (float): Lowest allowed ratio of result to baseline.
+
+    Returns:
+        bool: True if no benchmark fell below the threshold.
+    """
+    passed = True
+    for name, rate in results.items():
+        if name not in baseline:
+            print(f"{name:20} {rate:14,.0f} ops/s  (no baseline)")
+            continue
+        ratio = rate / baseline[name]
+        flag = ""
+        if ratio < threshold:
+            flag = "  REGRESSION"
+            passed = False
+        print(f"{name:20} {rate:14,.0f} ops/s  {ratio:6.2f}x "
+              f"baseline{flag}")
+    return passed
+
+
+def main() -> None:
+    """
+    Run the benchmarks from the command line.
+
+    Returns:
+    None
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("names", nargs="*", metavar="NAME",
+                        help="benchmarks to run (default: all): " +
+                        ", ".join(BENCHMARKS))
+    parser.add_argument("--save", metavar="FILE",
+                        help="write the results to a baseline file")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the results with a baseline file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail if a benchmark runs slower than this "
+                        "fraction of the baseline")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    options = parser.parse_args()
+
+    names = options.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+    results = run_benchmarks(names, options.min_time, options.repeat)
+
+    passed = True
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        passed = compare(results, baseline, options.threshold)
+    else:
+        for name, rate in results.items():
+            print(f"{name:20} {rate:14,.0f} ops/s")
+
+    if options.save:
+        with open(options.save, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""Bitboard game-state backend for Connect 5."""
+
+import random
+import sys
+from array import array
+from collections import OrderedDict
+from typing import List, Tuple
+
+# Constants
+EMPTY_CELL = 0
+PLAYER_ONE_PIECE = 1
+PLAYER_TWO_PIECE = 2
+
+CONNECT_LENGTH = 5
+SENTINEL_ROWS = 1
+ZOBRIST_SEED = 0x5EED
+ZOBRIST_BITS = 64
+ZOBRIST_KEY_TYPE = "Q"  # array type code of an unsigned 64-bit key
+ZOBRIST_CACHE_SIZE = 8  # board sizes whose keys are kept
+
+ZobristTables = Tuple[Tuple[List[int], ...], Tuple[List[int], ...], int]
+
+# Zobrist keys by (rows, columns, seed), shared by every board of a size
+# and evicted least recently used first
+_ZOBRIST_TABLES: "OrderedDict[Tuple[int, int, int], ZobristTables]" = (
+    OrderedDict())
+
+
+class BitBoard:
+    """
+    A class storing a Connect 5 (or connect-N) position as bitboards.
+
+    Each player's stones are kept in a single int. Cell (row, col) maps
+    to bit ``col * stride + row`` where ``stride`` is ROW_COUNT plus one
+    sentinel row. The sentinel row is never set, so shifting a bitboard
+    by 1 (vertical), ``stride`` (horizontal), ``stride + 1`` (positive
+    diagonal) or ``stride - 1`` (negative diagonal) never lets a line
+    wrap from one column into the next.
+
+    Python ints are stored in 30-bit digits, so large boards are kept
+    as one chunked int per player and whole-board operations stay a
+    handful of C-level loops over the digits.
+
+    Attributes:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        connect (int): Number of pieces in a row needed to win.
+        stride (int): Number of bits used per column (rows + sentinel).
+        stones (List[int]): Bitboard per piece, indexed by piece value
+        (index 0 is unused, 1 for player 1, 2 for player 2).
+        heights (List[int]): Number of filled cells in each column.
+        legal_mask (int): Bit ``col`` is set while column col has room.
+        legal_columns (Tuple[int, ...]): The columns set in legal_mask,
+        rebuilt only when a column fills up or empties.
+        full_mask (int): Bitboard with every playable cell set.
+        bottom_mask (int): Bitboard with the bottom cell of each column set.
+        hash (int): 64-bit Zobrist hash of the stones, updated with one
+        XOR per change.
+        zobrist (Tuple[List[int], ...]): Zobrist key per piece and bit
+        index, indexed like stones.
+        side_key (int): Zobrist key XORed in when player 2 is to move.
+        mirror_hash (int): The hash of the position mirrored left to
+        right, kept up to date alongside hash.
+        mirror_zobrist (Tuple[List[int], ...]): The Zobrist key of the
+        mirrored cell per piece and bit index.
+    """
+
+    __slots__ = ("rows", "columns", "connect", "stride", "stones", "heights",
+                 "legal_mask", "legal_columns", "full_mask",
+                 "bottom_mask", "hash", "zobrist", "side_key",
+                 "mirror_hash", "mirror_zobrist", "_directions")
+
+    def __init__(self, rows: int, columns: int,
+                 connect: int = CONNECT_LENGTH,
+                 seed: int = ZOBRIST_SEED) -> None:
+        """
+        Initialize an empty BitBoard.
+
+        Args:
+            rows (int): Number of rows on the game board.
+            columns (int): Number of columns on the game board.
+            connect (int): Number of pieces in a row needed to win.
+            seed (int): Seed of the Zobrist keys. Boards with the same
+            size and seed hash alike in every process.
+
+        Returns:
+        None
+        """
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        self.stride = rows + SENTINEL_ROWS
+        self.stones = [0, 0, 0]
+        self.heights = [0] * columns
+        self.legal_mask = (1 << columns) - 1
+        self.legal_columns = tuple(range(columns))
+        column_mask = (1 << rows) - 1
+        self.full_mask = 0
+        self.bottom_mask = 0
+        for col in range(columns):
+            self.full_mask |= column_mask << (col * self.stride)
+            self.bottom_mask |= 1 << (col * self.stride)
+        (self.zobrist, self.mirror_zobrist,
+         self.side_key) = zobrist_keys(rows, columns, seed)
+        self.hash = 0
+        self.mirror_hash = 0
+        # Vertical, horizontal, positive and negative diagonal shifts
+        self._directions = (1, self.stride, self.stride + 1,
+                            self.stride - 1)
+
+    def bit(self, row: int, col: int) -> int:
+        """
+        Get the single-bit mask for a cell.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+
+        Returns:
+            int: The bitboard with only the given cell set.
+        """
+        return 1 << (col * self.stride + row)
+
+    def drop(self, row: int, col: int, piece: int) -> None:
+        """
+        Place a piece on the bitboards.
+
+        Args:
+            row (int): The row where the piece will be placed.
+            col (int): The column where the piece will be placed.
+            piece (int): The piece to place (EMPTY_CELL clears the cell).
+
+        Returns:
+        None
+        """
+        index = col * self.stride + row
+        bit = 1 << index
+        stones = self.stones
+        if (stones[PLAYER_ONE_PIECE] | stones[PLAYER_TWO_PIECE]) & bit:
+            # Overwriting a stone, so clear the cell first
+            old = (PLAYER_ONE_PIECE if stones[PLAYER_ONE_PIECE] & bit
+                   else PLAYER_TWO_PIECE)
+            self.hash ^= self.zobrist[old][index]
+            self.mirror_hash ^= self.mirror_zobrist[old][index]
+            stones[PLAYER_ONE_PIECE] &= ~bit
+            stones[PLAYER_TWO_PIECE] &= ~bit
+        if piece == EMPTY_CELL:
+            self._settle(col)
+            return
+        stones[piece] |= bit
+        self.hash ^= self.zobrist[piece][index]
+        self.mirror_hash ^= self.mirror_zobrist[piece][index]
+        if row >= self.heights[col]:
+            self.heights[col] = row + 1
+            if row + 1 == self.rows:
+                # Column is now full
+                self._set_legal(self.legal_mask & ~(1 << col))
+
+    def play(self, col: int, piece: int) -> int:
+        """
+        Drop a piece into the lowest open row of a column.
+
+        Args:
+            col (int): The column to play, which must not be full.
+            piece (int): The piece to place.
+
+        Returns:
+            int: The row the piece landed in.
+        """
+        row = self.heights[col]
+        index = col * self.stride + row
+        self.stones[piece] |= 1 << index
+        self.hash ^= self.zobrist[piece][index]
+        self.mirror_hash ^= self.mirror_zobrist[piece][index]
+        self.heights[col] = row + 1
+        if row + 1 == self.rows:
+            self._set_legal(self.legal_mask & ~(1 << col))
+        return row
+
+    def undo(self, col: int) -> None:
+        """
+        Remove the top piece of a column, reversing play().
+
+        Args:
+            col (int): The column to take the piece from.
+
+        Returns:
+        None
+        """
+        row = self.heights[col] - 1
+        index = col * self.stride + row
+        bit = 1 << index
+        piece = (PLAYER_ONE_PIECE if self.stones[PLAYER_ONE_PIECE] & bit
+                 else PLAYER_TWO_PIECE)
+        self.hash ^= self.zobrist[piece][index]
+        self.mirror_hash ^= self.mirror_zobrist[piece][index]
+        self.stones[piece] &= ~bit
+        self.heights[col] = row
+        if row + 1 == self.rows:
+            self._set_legal(self.legal_mask | (1 << col))
+
+    def key(self) -> int:
+        """
+        Get a unique integer key for the stones on the board.
+
+        Player 1's stones plus the occupied mask plus the bottom row
+        gives every column a distinct value that fits in ``stride``
+        bits, so the key is collision free and for the 7x8 board fits
+        in 64 bits. It does not include whose turn it is.
+
+        Returns:
+            int: The position key.
+        """
+        return (self.stones[PLAYER_ONE_PIECE] +
+                (self.stones[PLAYER_ONE_PIECE] |
+                 self.stones[PLAYER_TWO_PIECE]) + self.bottom_mask)
+
+    def mirror_key(self) -> int:
+        """
+        Get the key of the position mirrored left to right.
+
+        Each column of key() only depends on that column's stones, so
+        mirroring the key is reversing the order of its columns.
+
+        Returns:
+            int: The key of the mirrored position.
+        """
+        key = self.key()
+        stride = self.stride
+        column_mask = (1 << stride) - 1
+        mirrored = 0
+        for col in range(self.columns):
+            mirrored = (mirrored << stride) | (key & column_mask)
+            key >>= stride
+        return mirrored
+
+    def canonical_key(self) -> Tuple[int, bool]:
+        """
+        Get the same key for a position and its mirror image.
+
+        Returns:
+            Tuple[int, bool]: The smaller of key() and mirror_key(), and
+            whether it is the mirrored one. Columns stored under a
+            mirrored key must be mirrored with mirror_column.
+        """
+        key = self.key()
+        mirrored = self.mirror_key()
+        if mirrored < key:
+            return mirrored, True
+        return key, False
+
+    def canonical_hash(self, piece: int) -> Tuple[int, bool]:
+        """
+        Get the same Zobrist hash for a position and its mirror image.
+
+        Args:
+            piece (int): The piece to move, hashed in with side_key.
+
+        Returns:
+            Tuple[int, bool]: The smaller of hash and mirror_hash, and
+            whether it is the mirrored one.
+        """
+        side = self.side_key if piece == PLAYER_TWO_PIECE else 0
+        plain = self.hash ^ side
+        mirrored = self.mirror_hash ^ side
+        if mirrored < plain:
+            return mirrored, True
+        return plain, False
+
+    def mirror_column(self, col: int) -> int:
+        """
+        Get the column a column maps to in the mirror image.
+
+        Args:
+            col (int): The column.
+
+        Returns:
+            int: The mirrored column.
+        """
+        return self.columns - 1 - col
+
+    def copy(self) -> "BitBoard":
+        """
+        Create an independent copy of the position.
+
+        Returns:
+            BitBoard: A new BitBoard holding the same stones.
+        """
+        clone = BitBoard.__new__(BitBoard)
+        for name in BitBoard.__slots__:
+            setattr(clone, name, getattr(self, name))
+        clone.stones = list(self.stones)
+        clone.heights = list(self.heights)
+        return clone
+
+    def _settle(self, col: int) -> None:
+        """
+        Recompute the height of a column after a cell was cleared.
+
+        Args:
+            col (int): The column to recompute.
+
+        Returns:
+        None
+        """
+        occupied = self.stones[PLAYER_ONE_PIECE] | self.stones[
+            PLAYER_TWO_PIECE]
+        column = (occupied >> (col * self.stride)) & ((1 << self.rows) - 1)
+        self.heights[col] = column.bit_length()
+        if self.heights[col] < self.rows:
+            self._set_legal(self.legal_mask | (1 << col))
+
+    def _set_legal(self, legal_mask: int) -> None:
+        """
+        Update the legal column mask and its tuple of columns.
+
+        Args:
+            legal_mask (int): The new legal column mask.
+
+        Returns:
+        None
+        """
+        if legal_mask == self.legal_mask:
+            return
+        self.legal_mask = legal_mask
+        self.legal_columns = tuple(col for col in range(self.columns)
+                                   if (legal_mask >> col) & 1)
+
+    def is_legal(self, col: int) -> bool:
+        """
+        Check if a column has room for another piece.
+
+        Args:
+            col (int): The column to check.
+
+        Returns:
+            bool: True if the column is not full.
+        """
+        return self.heights[col] < self.rows
+
+    def get_cell(self, row: int, col: int) -> int:
+        """
+        Get the piece stored in a cell.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+
+        Returns:
+            int: The piece in the cell, or EMPTY_CELL.
+        """
+        bit = 1 << (col * self.stride + row)
+        if self.stones[PLAYER_ONE_PIECE] & bit:
+            return PLAYER_ONE_PIECE
+        if self.stones[PLAYER_TWO_PIECE] & bit:
+            return PLAYER_TWO_PIECE
+        return EMPTY_CELL
+
+    def piece_mask(self, piece: int) -> int:
+        """
+        Get the bitboard of cells holding a piece.
+
+        Args:
+            piece (int): The piece to look up (EMPTY_CELL for empty cells).
+
+        Returns:
+            int: The bitboard of matching cells.
+        """
+        if piece == EMPTY_CELL:
+            return self.full_mask & ~(self.stones[PLAYER_ONE_PIECE] |
+                                      self.stones[PLAYER_TWO_PIECE])
+        return self.stones[piece]
+
+    def has_won(self, piece: int) -> bool:
+        """
+        Check for connect pieces in a row anywhere on the board.
+
+        Args:
+            piece (int): The piece (player) to check for a win.
+
+        Returns:
+            bool: True if a winning line is found, False otherwise.
+        """
+        board = self.piece_mask(piece)
+        for shift in self._directions:
+            if _runs(board, shift, self.connect):
+                return True
+        return False
+
+    def wins_at(self, row: int, col: int, piece: int) -> bool:
+        """
+        Check for a win on the lines through a single cell.
+
+        Only the four lines through (row, col) can change when a piece
+        is dropped there, so this counts contiguous pieces outward from
+        the cell in each direction instead of scanning the whole board.
+
+        Args:
+            row (int): The row of the last placed piece.
+            col (int): The column of the last placed piece.
+            piece (int): The piece (player) to check for a win.
+
+        Returns:
+            bool: True if the cell is part of a winning line.
+        """
+        board = self.piece_mask(piece)
+        origin = col * self.stride + row
+        # Cut out the bits within reach of the cell first, so walking
+        # the lines shifts a small int even on very large boards
+        reach = (self.connect - 1) * (self.stride + 1)
+        low = max(origin - reach, 0)
+        board = (board >> low) & ((1 << (origin - low + reach + 1)) - 1)
+        origin -= low
+        if not (board >> origin) & 1:
+            return False
+        for shift in self._directions:
+            count = 1
+            # Count forwards, the sentinel row and the bits past the
+            # cut are always empty so the walk stops at the edges
+            index = origin + shift
+            while (board >> index) & 1:
+                count += 1
+                index += shift
+            # Count backwards
+            index = origin - shift
+            while index >= 0 and (board >> index) & 1:
+                count += 1
+                index -= shift
+            if count >= self.connect:
+                return True
+        return False
+
+    def to_list(self) -> List[List[int]]:
+        """
+        Expand the bitboards into a 2D list board.
+
+        Returns:
+        List[List[int]]: A 2D list indexed as [row][col].
+        """
+        return [[self.get_cell(row, col) for col in range(self.columns)]
+                for row in range(self.rows)]
+
+
+def zobrist_keys(rows: int, columns: int,
+                 seed: int = ZOBRIST_SEED) -> ZobristTables:
+    """
+    Get the Zobrist keys of a board size.
+
+    The keys come from a Random seeded with seed, not from hash(), so
+    they are the same in every process and hashes can be shared
+    between workers and saved to disk. Only the ZOBRIST_CACHE_SIZE most
+    recently used sizes are kept, as keys take memory in proportion to
+    the board.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        seed (int): Seed of the keys.
+
+    Returns:
+        ZobristTables: A key per bit index for each piece, indexed like
+        BitBoard.stones, the same keys looked up through the mirrored
+        cell, and the side-to-move key.
+    """
+    size = (rows, columns, seed)
+    if size in _ZOBRIST_TABLES:
+        _ZOBRIST_TABLES.move_to_end(size)
+        return _ZOBRIST_TABLES[size]
+    rng = random.Random(seed)
+    stride = rows + SENTINEL_ROWS
+    cells = stride * columns
+    key_bytes = ZOBRIST_BITS // 8
+    # One call for all the random bits is much faster than one per key
+    keys: Tuple[List[int], ...] = ([],)
+    for _ in (PLAYER_ONE_PIECE, PLAYER_TWO_PIECE):
+        table = array(ZOBRIST_KEY_TYPE, rng.randbytes(cells * key_bytes))
+        # The bytes are read as little-endian on every host, so a seed
+        # gives the same keys everywhere
+        if sys.byteorder == "big":
+            table.byteswap()
+        keys += (table.tolist(),)
+    # Bit col * stride + row mirrors to (columns - 1 - col) * stride
+    # + row, the same row of the opposite column
+    mirror_keys: Tuple[List[int], ...] = ([], [], [])
+    for col in range(columns - 1, -1, -1):
+        start = col * stride
+        for piece in (PLAYER_ONE_PIECE, PLAYER_TWO_PIECE):
+            mirror_keys[piece].extend(keys[piece][start:start + stride])
+    _ZOBRIST_TABLES[size] = (keys, mirror_keys,
+                             rng.getrandbits(ZOBRIST_BITS))
+    if len(_ZOBRIST_TABLES) > ZOBRIST_CACHE_SIZE:
+        _ZOBRIST_TABLES.popitem(last=False)
+    return _ZOBRIST_TABLES[size]
+
+
+def _runs(board: int, shift: int, length: int) -> int:
+    """
+    Find the start bits of every run of set bits along a direction.
+
+    The run is doubled each step (2, 4, 8, ...) and the remainder is
+    covered by one overlapping shift, so connect-5 takes three ANDs and
+    connect-N takes about log2(N).
+
+    Args:
+        board (int): The bitboard to scan.
+        shift (int): The bit distance between neighbouring cells.
+        length (int): The required run length.
+
+    Returns:
+        int: A bitboard with the first cell of every run set.
+    """
+    run = board
+    span = 1
+    while span * 2 <= length:
+        run &= run >> (span * shift)
+        span *= 2
+    if span < length:
+        run &= run >> ((length - span) * shift)
+    return run
@@ -2,11 +2,15 @@
 # Videos from https://www.youtube.com/@freecodecamp/videos
 # were used to aid the development of this section of code
 
-import numpy as np
-import pygame
 import sys
 import math
-from typing import List
+from typing import List, Optional, Tuple, TYPE_CHECKING
+from bitboard import BitBoard, CONNECT_LENGTH
+import profiler
+from windows import WindowCounts
+
+if TYPE_CHECKING:
+    import pygame
 
 # Constants
 PLAYER_ONE = 0
@@ -19,15 +23,21 @@ BG_COLOR = (0, 0, 0)
 
 EMPTY_CELL = 0
 SQUARESIZE = 100
+MIN_SQUARESIZE = 4
+RADIUS_MARGIN = 0.05  # gap around a checker as a fraction of a square
+DISPLAY_FILL = 0.9  # largest fraction of the display the window may use
+WIN_FONT_SIZE = 75
+MIN_FONT_SIZE = 12
 
 ROW_COUNT = 7
 COLUMN_COUNT = 8
 ROW_MINUS_ONE = 1
 
-TICKRATE = 60
 TIMER_MAX = 20000
-TIMER_RESET = 0
+TIMER_FORFEIT = -1  # recorded in the move list when a turn times out
+TURN_TIMEOUT_EVENT = 1  # offset from pygame.USEREVENT
 AUTO_EXIT_TIME = 5000
+AI_TIME_BUDGET = 2000
 
 
 class Connect5Game:
@@ -41,9 +51,15 @@ class Connect5Game:
         BG_COLOUR (tuple): RGB color code for the background (black).
         ROW_COUNT (int): Number of rows on the game board.
         COLUMN_COUNT (int): Number of columns on the game board.
-        board (List[List[int]]): 2D list representing the game board.
+        CONNECT_LENGTH (int): Number of checkers in a row needed to win.
+        board (List[List[int]]): 2D list mirror of the game board,
+        used for drawing and printing.
+        bitboard (BitBoard): Bitboard backend used for the game rules.
+        heights (List[int]): Number of filled cells in each column.
         turn (int): Current player's turn (0 for player 1, 1 for player 2).
         game_over (bool): Indicates if the game is over.
+        moves (List[int]): Columns played in order, with TIMER_FORFEIT
+        for every turn lost to the hidden turn timer.
 
     Methods:
         create_board() -> List[List[int]]:
@@ -58,21 +74,45 @@ class Connect5Game:
         get_next_open_row(col: int) -> int:
             Find the next open row in a given column.
 
+        legal_moves() -> Tuple[int, ...]:
+            Get the columns that can still be played.
+
+        position_hash() -> int:
+            Get the Zobrist hash of the position and side to move.
+
+        canonical_hash() -> int:
+            Get one hash for the position and its mirror image.
+
+        windows -> WindowCounts:
+            Stone counts for every window, kept up to date once used.
+
+        make_move(col: int) -> Optional[int]:
+            Play the current player's checker in a column, headless.
+
         print_board():
             Print the game board.
 
         win_check(piece: int) -> bool:
             Check for a winning move on the game board.
 
+        win_check_at(row: int, col: int, piece: int) -> bool:
+            Check for a winning move through the last placed piece.
+
     Usage:
     - Create an instance of Connect5Game to start a new game.
     - Use the provided methods to play and manage the game.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, rows: int = ROW_COUNT, columns: int = COLUMN_COUNT,
+                 connect: int = CONNECT_LENGTH) -> None:
         """
         Initialize a Connect5Game instance.
 
+        Args:
+            rows (int): Number of rows on the game board.
+            columns (int): Number of columns on the game board.
+            connect (int): Number of checkers in a row needed to win.
+
         This constructor initializes a new Connect5Game
         instance with default values for attributes.
         - BLUE: RGB color code for blue.
@@ -81,9 +121,14 @@ class Connect5Game:
         - BG_COLOUR: RGB color code for the background.
         - ROW_COUNT: Number of rows on the game board.
         - COLUMN_COUNT: Number of columns on the game board.
+        - CONNECT_LENGTH: Number of checkers in a row needed to win.
         - board: 2D list representing the game board.
+        - bitboard: Bitboard backend holding the same position.
+        - heights: Number of filled cells in each column.
         - turn: Current player's turn (0 for player 1, 1 for player 2).
         - game_over: Indicates if the game is over.
+        - moves: Columns played in order, including timer forfeits.
+        - windows: Window counts, built the first time they are used.
 
         Returns:
         None
@@ -92,12 +137,22 @@ class Connect5Game:
         self.RED = RED
         self.YELLOW = YELLOW
         self.BG_COLOUR = BG_COLOR
-        self.ROW_COUNT = ROW_COUNT
-        self.COLUMN_COUNT = COLUMN_COUNT
+        self.ROW_COUNT = rows
+        self.COLUMN_COUNT = columns
+        self.CONNECT_LENGTH = connect
         self.EMPTY_CELL = EMPTY_CELL
         self.board = self.create_board()
+        self.bitboard = BitBoard(self.ROW_COUNT, self.COLUMN_COUNT,
+                                 self.CONNECT_LENGTH)
+        # Shared with the bitboard, which keeps it up to date
+        self.heights = self.bitboard.heights
         self.turn = 0
         self.game_over = False
+        self.moves: List[int] = []
+        self._windows: Optional[WindowCounts] = None
+        # Cached grid surface, rebuilt when the window size changes
+        self._grid_surface = None
+        self._grid_size = (0, 0)
 
     def create_board(self) -> List[List[int]]:
         """
@@ -120,10 +175,13 @@ class Connect5Game:
             col (int): The column where the piece will be placed.
             piece (int): The piece to place on the game board.
 
-        This method updates the game board with the
-        specified piece at the given row and column.
+        This method updates the game board and the bitboard
+        backend with the specified piece at the given row and column.
         """
         self.board[row][col] = piece
+        self.bitboard.drop(row, col, piece)
+        if self._windows is not None:
+            self._windows.set(row, col, piece)
 
     def is_valid_location(self, col: int) -> bool:
         """
@@ -136,8 +194,7 @@ class Connect5Game:
             bool: True if the column is a valid location
             for placing a checker, False otherwise.
         """
-        return self.board[self.ROW_COUNT -
-                          ROW_MINUS_ONE][col] == EMPTY_CELL
+        return self.heights[col] < self.ROW_COUNT
 
     def get_next_open_row(self, col: int) -> int:
         """
@@ -149,12 +206,67 @@ class Connect5Game:
         Returns:
             int: The index of the next open row, or -1 if the column is full.
         """
-        for row in range(self.ROW_COUNT):
-            # Checks if the row for the column is full
-            if self.board[row][col] == EMPTY_CELL:
-                return row
+        row = self.heights[col]
+        # Checks if the column is full
+        if row < self.ROW_COUNT:
+            return row
         return - ROW_MINUS_ONE  # -1 if column is full
 
+    def legal_moves(self) -> Tuple[int, ...]:
+        """
+        Get the columns that can still be played.
+
+        The tuple is maintained by the bitboard as columns fill up, so
+        this does not scan the board. The same set is available as a
+        bitmask in bitboard.legal_mask.
+
+        Returns:
+            Tuple[int, ...]: The playable columns in ascending order.
+        """
+        return self.bitboard.legal_columns
+
+    @property
+    def windows(self) -> WindowCounts:
+        """
+        Get the stone counts of every window on the board.
+
+        The counts are built from the board the first time they are
+        used and then updated by drop_piece, so games that never use
+        them do not pay for the window index.
+
+        Returns:
+            WindowCounts: Counts giving the heuristic score and threats.
+        """
+        if self._windows is None:
+            self._windows = WindowCounts.from_board(self.bitboard)
+        return self._windows
+
+    def position_hash(self) -> int:
+        """
+        Get the 64-bit Zobrist hash of the position and side to move.
+
+        The bitboard keeps the stone hash up to date with one XOR per
+        drop_piece or undo, so this costs the same on any board size.
+        Hashes only depend on the board size and ZOBRIST_SEED, so they
+        can be shared between processes.
+
+        Returns:
+            int: The position hash.
+        """
+        if self.turn:
+            return self.bitboard.hash ^ self.bitboard.side_key
+        return self.bitboard.hash
+
+    def canonical_hash(self) -> int:
+        """
+        Get one hash for the position and its mirror image.
+
+        Returns:
+            int: The smaller of the position hash and the hash of the
+            position mirrored left to right, with the side to move.
+        """
+        return self.bitboard.canonical_hash(self.turn + 1)[0]
+
     def print_board(self) -> None:
         """
         Print the game board.
@@ -163,6 +275,9 @@ class Connect5Game:
         flipping it vertically (from top to bottom) for display.
         It helps visualize the game board's current layout.
         """
+        # Imported here so the rules engine does not need numpy
+        import numpy as np
+
         print(np.flip(self.board, EMPTY_CELL))
 
     def win_check(self, piece: int) -> bool:
@@ -184,214 +299,433 @@ class Connect5Game:
         Returns:
             bool: True if a winning combination is found, False otherwise.
         """
-        # Check for 5 verticle checkers in a row
-        for row in range(self.ROW_COUNT - 4):
-            for col in range(self.COLUMN_COUNT):
-                # If 5 checkers in a row win_check will become True
-                if all(self.board[row + i][col] == piece for i in range(5)):
-                    return True
-
-        # Check for 5 horizontal checkers in a row
-        for row in range(self.ROW_COUNT):
-            for col in range(self.COLUMN_COUNT - 4):
-                # If 5 checkers in a row win_check will become True
-                if all(self.board[row][col + i] == piece for i in range(5)):
-                    return True
-
-        # Checks for 5 negativly sloped diagonal checkers in a row
-        for row in range(4, self.ROW_COUNT):
-            for col in range(self.COLUMN_COUNT - 4):
-                # If 5 checkers in a row win_check will become True
-                if all(self.board[row - i][col + i]
-                       == piece for i in range(5)):
-                    return True
-
-        # Checks for 5 positively sloped diagonal checkers in a row
-        for row in range(self.ROW_COUNT - 4):
-            for col in range(self.COLUMN_COUNT - 4):
-                # If 5 checkers in a row win_check will become True
-                if all(self.board[row + i][col + i]
-                       == piece for i in range(5)):
-                    return True
-
-        return False
+        # Shift-and-mask check for checkers in a row in all directions
+        return self.bitboard.has_won(piece)
 
-    def draw_board(self) -> None:
+    def win_check_at(self, row: int, col: int, piece: int) -> bool:
         """
-        Draw the Connect 5 game board on the screen.
+        Check for a winning move through the last placed piece.
 
-        This method visually represents the current
-        state of the game board on the game screen.
-        It draws the game grid and any player checkers that are on the board.
+        Args:
+            row (int): The row of the last placed piece.
+            col (int): The column of the last placed piece.
+            piece (int): The player (piece) to check for a win.
+
+        Only lines through the given cell are counted, so this is much
+        cheaper than win_check after every drop.
 
         Returns:
-        None
+            bool: True if a winning combination is found, False otherwise.
         """
+        return self.bitboard.wins_at(row, col, piece)
+
+    def draw_grid(self) -> "pygame.Surface":
+        """
+        Get the blue grid of the game board as a surface.
+
+        The grid never changes during a game, so it is drawn once and
+        cached until the window size changes.
+
+        Returns:
+        pygame.Surface: The grid surface, to be drawn at (0, SQUARESIZE).
+        """
+        import pygame
+
+        size = self.screen.get_size()
+        if self._grid_surface is not None and self._grid_size == size:
+            return self._grid_surface
+
+        grid = pygame.Surface((self.COLUMN_COUNT * self.SQUARESIZE,
+                               self.ROW_COUNT * self.SQUARESIZE))
+        grid.fill(self.BG_COLOUR)
         # This part of code draws the blue grid that the checkers fall into
         for col in range(self.COLUMN_COUNT):
             for row in range(self.ROW_COUNT):
-                pygame.draw.rect(self.screen, self.BLUE,
+                pygame.draw.rect(grid, self.BLUE,
                                  (col * self.SQUARESIZE, row *
-                                  self.SQUARESIZE + self.SQUARESIZE,
+                                  self.SQUARESIZE,
                                   self.SQUARESIZE, self.SQUARESIZE))
                 pygame.draw.circle(
-                    self.screen, self.BG_COLOUR,
+                    grid, self.BG_COLOUR,
                     (int(col * self.SQUARESIZE + self.SQUARESIZE / 2),
-                        (row * self.SQUARESIZE + self.SQUARESIZE +
-                         self.SQUARESIZE / 2)),
+                        (row * self.SQUARESIZE + self.SQUARESIZE / 2)),
                     self.RADIUS
                 )
+        self._grid_surface = grid
+        self._grid_size = size
+        return grid
+
+    def draw_checker(self, row: int, col: int) -> "pygame.Rect":
+        """
+        Draw the checker in a single cell of the game board.
+
+        Args:
+            row (int): The row of the checker.
+            col (int): The column of the checker.
+
+        Returns:
+        pygame.Rect: The area of the screen that was drawn on.
+        """
+        import pygame
+
+        colour = self.RED if self.board[row][col] == 1 else self.YELLOW
+        return pygame.draw.circle(self.screen, colour,
+                                  self.checker_center(row, col),
+                                  self.RADIUS)
+
+    def checker_center(self, row: int, col: int) -> Tuple[int, int]:
+        """
+        Get the screen position of the center of a cell's checker.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+
+        Returns:
+            Tuple[int, int]: The (x, y) pixel position.
+        """
+        return (int(col * self.SQUARESIZE + self.SQUARESIZE / 2),
+                self.height - int(row * self.SQUARESIZE +
+                                  self.SQUARESIZE / 2))
+
+    def draw_hover(self, posx: Optional[int] = None) -> "pygame.Rect":
+        """
+        Draw the strip above the board with the hovering checker.
+
+        Args:
+            posx (Optional[int]): The x position of the mouse, or None to
+            only clear the strip.
+
+        Returns:
+        pygame.Rect: The area of the screen that was drawn on.
+        """
+        import pygame
+
+        strip = pygame.draw.rect(self.screen, self.BG_COLOUR,
+                                 (0, 0, self.width, self.SQUARESIZE))
+        if posx is not None:
+            colour = self.RED if self.turn == PLAYER_ONE else self.YELLOW
+            pygame.draw.circle(self.screen, colour,
+                               (posx, int(self.SQUARESIZE / 2)),
+                               self.RADIUS)
+        return strip
+
+    def draw_board(self) -> None:
+        """
+        Draw the Connect 5 game board on the screen.
+
+        This method visually represents the current
+        state of the game board on the game screen.
+        It draws the game grid and any player checkers that are on the board.
+
+        Returns:
+        None
+        """
+        import pygame
+
+        self.screen.blit(self.draw_grid(), (0, self.SQUARESIZE))
 
         # This part of code draws the red or
         # yellow checkers that the player places
         for col in range(self.COLUMN_COUNT):
-            for row in range(self.ROW_COUNT):
-                if self.board[row][col] == 1:
-                    pygame.draw.circle(self.screen, self.RED, (int(col *
-                                       self.SQUARESIZE +
-                                       self.SQUARESIZE /
-                                       2), self.height -
-                                       int(row * self.SQUARESIZE +
-                                       self.SQUARESIZE /
-                                       2)), self.RADIUS)
-                elif self.board[row][col] == 2:
-                    pygame.draw.circle(self.screen, self.YELLOW, (int(col *
-                                       self.SQUARESIZE +
-                                       self.SQUARESIZE /
-                                       2), self.height -
-                                       int(row * self.SQUARESIZE +
-                                       self.SQUARESIZE /
-                                       2)), self.RADIUS)
+            for row in range(self.heights[col]):
+                if self.board[row][col] != EMPTY_CELL:
+                    self.draw_checker(row, col)
         pygame.display.update()
 
-    def run_game(self) -> None:
+    def make_move(self, col: int) -> Optional[int]:
         """
-        Run the Connect 5 game.
+        Drop the current player's checker into a column without drawing.
 
-        This method initializes the game, handles player
-        moves,checks for wins, and manages the game loop.
+        Args:
+            col (int): The column the checker is dropped into.
 
-        The game loop continues until one of the
-        players wins or the game is exited.
+        Invalid columns are ignored. Otherwise the move is recorded, the
+        turn passes to the other player and game_over is set if the
+        move wins.
+
+        Returns:
+            Optional[int]: The row the checker landed in, or None if the
+            column was not valid.
+        """
+        if not self.is_valid_location(col):
+            return None
+        piece = self.turn + 1
+        self.turn += 1
+        self.turn = self.turn % 2
+        row = self.get_next_open_row(col)
+        self.drop_piece(row, col, piece)
+        self.moves.append(col)
+        if self.win_check_at(row, col, piece):
+            self.game_over = True
+        return row
+
+    def play_turn(self, col: int,
+                  font: "pygame.font.Font") -> Optional[Tuple[int, int]]:
+        """
+        Drop the current player's checker into a column.
+
+        Args:
+            col (int): The column the checker is dropped into.
+            font (pygame.font.Font): The font used for the win message.
+
+        Invalid columns are ignored. Otherwise the turn passes to the
+        other player and a win message is drawn if the move wins.
+
+        Returns:
+        Optional[Tuple[int, int]]: The (row, col) the checker landed in,
+        or None if the column was not valid.
+        """
+        piece = self.turn + 1
+        colour = self.RED if self.turn == PLAYER_ONE else self.YELLOW
+        row = self.make_move(col)
+        if row is None:
+            return None
+
+        if self.game_over:
+            label = font.render(f"Player {piece} wins!!", 1, colour)
+            self.screen.blit(label, (40, 10))
+        return row, col
+
+    def forfeit_turn(self) -> None:
+        """
+        Pass the turn on when the hidden turn timer runs out.
+
+        The forfeit is recorded in the move list as TIMER_FORFEIT.
 
         Returns:
         None
         """
+        self.turn += 1
+        self.turn = self.turn % 2
+        self.moves.append(TIMER_FORFEIT)
+
+    def save_moves(self, path: str) -> None:
+        """
+        Append the moves of this game to a binary move log file.
+
+        Args:
+            path (str): The move log to append to, see movelog.py.
+
+        Returns:
+        None
+        """
+        import movelog
+
+        with movelog.MoveLogWriter(path, self.ROW_COUNT, self.COLUMN_COUNT,
+                                   self.CONNECT_LENGTH) as writer:
+            writer.write_game(self.moves)
+
+    def show_turn(self, cell: Optional[Tuple[int, int]]) -> None:
+        """
+        Update the screen after a turn.
+
+        Only the new checker is drawn, and only it and the hover strip
+        are sent to the display, unless the game is over and the win
+        message needs the whole screen updating.
+
+        Args:
+            cell (Optional[Tuple[int, int]]): The cell played by
+            play_turn, or None if nothing was played.
+
+        Returns:
+        None
+        """
+        import pygame
+
+        dirty = [pygame.Rect(0, 0, self.width, self.SQUARESIZE)]
+        if cell is not None:
+            dirty.append(self.draw_checker(*cell))
+        if self.game_over:
+            pygame.display.update()
+        else:
+            pygame.display.update(dirty)
+
+    def fit_square_size(self) -> int:
+        """
+        Pick a square size so the whole board fits on the display.
+
+        Boards up to 7x8 keep the full SQUARESIZE; larger boards are
+        scaled down to fit, but never below MIN_SQUARESIZE.
+
+        Returns:
+            int: The size of a board square in pixels.
+        """
+        import pygame
+
+        info = pygame.display.Info()
+        fit = SQUARESIZE
+        if info.current_w > 0 and info.current_h > 0:
+            fit = min(fit,
+                      int(info.current_w * DISPLAY_FILL) // self.COLUMN_COUNT,
+                      int(info.current_h * DISPLAY_FILL) //
+                      (self.ROW_COUNT + 1))
+        return max(fit, MIN_SQUARESIZE)
+
+    def open_window(self) -> None:
+        """
+        Initialize pygame and open a window sized for the board.
+
+        This sets SQUARESIZE, RADIUS, width, height and screen, which
+        the drawing methods rely on.
+
+        Returns:
+        None
+        """
+        import pygame
+
         pygame.init()
 
-        self.SQUARESIZE = SQUARESIZE
+        self.set_square_size(self.fit_square_size())
+        self.screen = pygame.display.set_mode((self.width, self.height))
+
+    def set_square_size(self, size: int) -> None:
+        """
+        Lay the board out with squares of a given size.
+
+        This sets SQUARESIZE, RADIUS, width and height. open_window uses
+        it for the window, and offscreen renderers for their surfaces.
+
+        Args:
+            size (int): The size of a board square in pixels.
+
+        Returns:
+        None
+        """
+        self.SQUARESIZE = size
 
         # Width and height of the board
         self.width = self.COLUMN_COUNT * self.SQUARESIZE
         self.height = (self.ROW_COUNT + 1) * self.SQUARESIZE
 
-        size = (self.width, self.height)
+        self.RADIUS = max(int(self.SQUARESIZE/2 -
+                              self.SQUARESIZE * RADIUS_MARGIN), 1)
+
+    def run_game(self, ai_turn: Optional[int] = None,
+                 echo_board: bool = False,
+                 move_log: Optional[str] = None) -> None:
+        """
+        Run the Connect 5 game.
+
+        This method initializes the game, handles player
+        moves,checks for wins, and manages the game loop.
+
+        The game loop continues until one of the
+        players wins or the game is exited.
 
-        self.RADIUS = int(self.SQUARESIZE/2 - 5)
+        Args:
+            ai_turn (Optional[int]): PLAYER_ONE or PLAYER_TWO to let the
+            computer play that side, or None for two human players.
+            echo_board (bool): Print the board to stdout after every move.
+            move_log (Optional[str]): A binary move log file the moves are
+            appended to when the game ends or the window is closed.
+
+        Returns:
+        None
+        """
+        # pygame is only loaded once a window is opened, so the
+        # rules engine can be imported and used headless
+        import pygame
 
-        self.screen = pygame.display.set_mode(size)
+        if ai_turn is not None:
+            import ai
 
+        # Per-frame timings, only recorded if CONNECT5_PROFILE is set
+        timing = profiler.from_env("game")
+        timing.begin()
+        self.open_window()
         self.draw_board()
-        pygame.display.update()
+        timing.mark("draw_board")
 
-        myfont = pygame.font.SysFont("monospace", 75)
+        myfont = pygame.font.SysFont("monospace", max(
+            WIN_FONT_SIZE * self.SQUARESIZE // SQUARESIZE, MIN_FONT_SIZE))
 
-        clock = pygame.time.Clock()
-        current_time = 0
-        player_one_button_press_time = 0
-        player_two_button_press_time = 0
-        first_move = False
+        # The hidden turn timer is a one-shot pygame timer event that is
+        # restarted whenever a turn begins, so the loop can sleep in
+        # pygame.event.wait until something happens
+        turn_timeout = pygame.USEREVENT + TURN_TIMEOUT_EVENT
+        timer_started = False
         # Check if game is still running or not
         while not self.game_over:
-            for event in pygame.event.get():
+            timing.begin()
+            # Computer player's turn
+            if self.turn == ai_turn and self.legal_moves():
+                self.draw_hover()
+                timing.mark("draw")
+                col = ai.best_move(self, AI_TIME_BUDGET)
+                timing.mark("ai")
+                cell = self.play_turn(col, myfont)
+                timing.mark("move")
+                if echo_board:
+                    self.print_board()
+                    timing.mark("print_board")
+                self.show_turn(cell)
+                timing.mark("draw")
+                pygame.time.set_timer(turn_timeout, TIMER_MAX, loops=1)
+                timer_started = True
+
+                # Auto closes game after 5 seconds after a win
+                if self.game_over:
+                    pygame.time.wait(AUTO_EXIT_TIME)
+                    timing.mark("idle", busy=False)
+                continue
+
+            events = [pygame.event.wait()]
+            timing.mark("idle", busy=False)
+            for event in events + pygame.event.get():
                 if event.type == pygame.QUIT:
+                    if move_log is not None:
+                        self.save_moves(move_log)
+                    timing.finish(self.screen)
                     sys.exit()
 
                 if event.type == pygame.MOUSEMOTION:
-                    pygame.draw.rect(self.screen, self.BG_COLOUR,
-                                     (0, 0, self.width, self.SQUARESIZE))
-                    posx = event.pos[0]
-                    if self.turn == PLAYER_ONE:
-                        pygame.draw.circle(self.screen, self.RED,
-                                           (posx, int(self.SQUARESIZE
-                                                      / 2)), self.RADIUS)
-                    else:
-                        pygame.draw.circle(self.screen, self.YELLOW,
-                                           (posx, int(self.SQUARESIZE
-                                                      / 2)), self.RADIUS)
-                    pygame.display.update()
+                    # Only the strip above the board needs updating
+                    pygame.display.update(self.draw_hover(event.pos[0]))
+                    timing.mark("draw")
 
                 if event.type == pygame.MOUSEBUTTONDOWN:
-                    first_move = True
-                    pygame.draw.rect(self.screen, self.BG_COLOUR,
-                                     (0, 0, self.width, self.SQUARESIZE))
-                    # Player one's turn
-                    if self.turn == PLAYER_ONE:
-                        posx = event.pos[0]
-                        col = int(math.floor(posx/self.SQUARESIZE))
-
-                        if self.is_valid_location(col):
-                            self.turn += 1
-                            self.turn = self.turn % 2
-                            row = self.get_next_open_row(col)
-                            self.drop_piece(row, col, 1)
-
-                            if self.win_check(1):
-                                label = myfont.render("Player 1 wins!!",
-                                                      1, self.RED)
-                                self.screen.blit(label, (40, 10))
-                                self.game_over = True
-
-                    # Player two's turn
-                    else:
+                    self.draw_hover()
+                    timing.mark("draw")
+                    cell = None
+                    # Clicks are ignored while the computer is playing
+                    if self.turn != ai_turn:
                         posx = event.pos[0]
                         col = int(math.floor(posx/self.SQUARESIZE))
-                        if self.is_valid_location(col):
-                            self.turn += 1
-                            self.turn = self.turn % 2
-                            row = self.get_next_open_row(col)
-                            self.drop_piece(row, col, 2)
-
-                            if self.win_check(2):
-                                label = myfont.render("Player 2 wins!!",
-                                                      1, self.YELLOW)
-                                self.screen.blit(label, (40, 10))
-                                self.game_over = True
-
-                    self.print_board()
-                    self.draw_board()
+                        cell = self.play_turn(col, myfont)
+                        timing.mark("move")
+
+                    # The first click starts the timer, after that only a
+                    # move restarts it for the next player
+                    if cell is not None or not timer_started:
+                        pygame.time.set_timer(turn_timeout, TIMER_MAX,
+                                              loops=1)
+                        timer_started = True
+
+                    if echo_board:
+                        self.print_board()
+                        timing.mark("print_board")
+                    self.show_turn(cell)
+                    timing.mark("draw")
 
                     # Auto closes game after 5 seconds after a win
                     if self.game_over:
                         pygame.time.wait(AUTO_EXIT_TIME)
-
-            # Code for hidden turn timer
-            current_time = pygame.time.get_ticks()
-            # Checks if it is first move to start timer
-            if first_move:
-                match self.turn:
-                    case 0:
-                        player_one_button_press_time = pygame.time.get_ticks()
-                    case 1:
-                        player_two_button_press_time = pygame.time.get_ticks()
-            else:
-                player_one_button_press_time = pygame.time.get_ticks()
-                player_two_button_press_time = pygame.time.get_ticks()
-            # Checks if player 1's timer reaches 20 seconds
-            if current_time - player_one_button_press_time > TIMER_MAX:
-                print("1")
-                self.turn = PLAYER_ONE
-                player_two_button_press_time = pygame.time.get_ticks()
-                player_one_button_press_time = TIMER_RESET
-            # Checks if player 2's timer reaches 20 seconds
-            if current_time - player_two_button_press_time > TIMER_MAX:
-                print("2")
-                self.turn = PLAYER_TWO
-                player_one_button_press_time = pygame.time.get_ticks()
-                player_two_button_press_time = TIMER_RESET
-
-            clock.tick(TICKRATE)
-            sys.exit
+                        timing.mark("idle", busy=False)
+                        break
+
+                # Hidden turn timer ran out, the turn passes on
+                if event.type == turn_timeout:
+                    self.forfeit_turn()
+                    print(self.turn + 1)
+                    pygame.time.set_timer(turn_timeout, TIMER_MAX, loops=1)
+            timing.mark("events")
+
+        # Stop the hidden turn timer
+        pygame.time.set_timer(turn_timeout, 0)
+        if move_log is not None:
+            self.save_moves(move_log)
+        timing.finish(self.screen)
 
 
 if __name__ == "__main__":
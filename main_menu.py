@@ -1,12 +1,12 @@
 """Main menu for Connect 5."""
 
-import pygame
 import sys
 import connect5
-from typing import Optional, Callable
+import profiler
+from typing import Optional, Callable, Dict, Tuple, TYPE_CHECKING
 
-# Initialize Pygame
-pygame.init()
+if TYPE_CHECKING:
+    import pygame
 
 # Constants
 ORIGINAL_WIDTH, ORIGINAL_HEIGHT = 800, 600
@@ -28,12 +28,61 @@ BUTTON_HEIGHT = 50
 
 PLAY_BUTTON_X = 300
 PLAY_BUTTON_Y = 250
+PLAY_AI_BUTTON_X = 300
+PLAY_AI_BUTTON_Y = 320
 GIMMICKS_BUTTON_X = 300
-GIMMICKS_BUTTON_Y = 320
+GIMMICKS_BUTTON_Y = 390
 GIMMICKS_WINDOW_X = 50
 GIMMICKS_WINDOW_Y_ADJUST = 30
 EXIT_BUTTON_X = 300
-EXIT_BUTTON_Y = 390
+EXIT_BUTTON_Y = 460
+MENU_FPS = 30
+
+# Rendered text surfaces keyed by (text, size, color) and fonts by size
+_text_cache: Dict[Tuple[str, int, Tuple[int, int, int]],
+                  "pygame.Surface"] = {}
+_font_cache: Dict[int, "pygame.font.Font"] = {}
+
+
+def render_text(text: str, size: int,
+                color: Tuple[int, int, int]) -> "pygame.Surface":
+    """
+    Render a line of text, reusing earlier renders of the same text.
+
+    Args:
+        text (str): The text to render.
+        size (int): The font size.
+        color (Tuple[int, int, int]): The RGB text color.
+
+    Returns:
+    pygame.Surface: The rendered text. It is shared, so do not draw on it.
+    """
+    key = (text, size, color)
+    surface = _text_cache.get(key)
+    if surface is None:
+        import pygame
+
+        font = _font_cache.get(size)
+        if font is None:
+            font = _font_cache[size] = pygame.font.Font(None, size)
+        surface = _text_cache[key] = font.render(text, True, color)
+    return surface
+
+
+def is_expose_event(event: "pygame.event.Event") -> bool:
+    """
+    Check if an event means the window contents must be repainted.
+
+    Args:
+        event (pygame.event.Event): The event to check.
+
+    Returns:
+        bool: True if the window was exposed or resized.
+    """
+    import pygame
+
+    return event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED,
+                          pygame.WINDOWSIZECHANGED)
 
 
 # Create a Button class
@@ -72,23 +121,26 @@ class Button:
         Returns:
             None
         """
+        import pygame
+
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
         self.action = action
         self.color = BUTTON_COLOR
         self.hovered = False
 
-    def draw(self, screen: pygame.Surface) -> None:
+    def draw(self, screen: "pygame.Surface") -> None:
         """
         Draw the button on the screen.
 
         Args:
         - screen (pygame.Surface): The game screen to draw the button on.
         """
+        import pygame
+
         color = self.hovered and BUTTON_HOVER_COLOR or self.color
         pygame.draw.rect(screen, color, self.rect)
-        font = pygame.font.Font(None, BUTTON_FONT_SIZE)
-        text = font.render(self.text, True, WHITE)
+        text = render_text(self.text, BUTTON_FONT_SIZE, WHITE)
         text_rect = text.get_rect(center=self.rect.center)
         screen.blit(text, text_rect)
 
@@ -114,12 +166,15 @@ class MainMenu:
         This constructor initializes the class instance with the specified
         window dimensions and creates various buttons for a main menu.
         """
-        self.title = (pygame.font.Font(None, TITLE_FONT_SIZE).render
-                      ("Connect 5", True, WHITE))
+        self.title = render_text("Connect 5", TITLE_FONT_SIZE, WHITE)
         self.title_rect = self.title.get_rect(center=(width // 2, 100))
         # dimentions and text for play button
         self.play_button = Button(PLAY_BUTTON_X, PLAY_BUTTON_Y, BUTTON_WIDTH,
                                   BUTTON_HEIGHT, "Play", self.play_game)
+        # dimentions and text for play against the computer button
+        self.play_ai_button = Button(PLAY_AI_BUTTON_X, PLAY_AI_BUTTON_Y,
+                                     BUTTON_WIDTH, BUTTON_HEIGHT,
+                                     "Play vs AI", self.play_ai_game)
         # dimentions and text for gimmicks button
         self.gimmicks_button = (Button(GIMMICKS_BUTTON_X,
                                        GIMMICKS_BUTTON_Y,
@@ -134,12 +189,12 @@ class MainMenu:
                                   BUTTON_HEIGHT,
                                   "Exit",
                                   self.exit_game)
-        self.buttons = ([self.play_button, self.
-                         gimmicks_button, self.exit_button])
+        self.buttons = ([self.play_button, self.play_ai_button,
+                         self.gimmicks_button, self.exit_button])
         self.width = width
         self.height = height
 
-    def draw(self, screen: pygame.Surface) -> None:
+    def draw(self, screen: "pygame.Surface") -> None:
         """
         Draw the main menu on the screen.
 
@@ -155,6 +210,11 @@ class MainMenu:
         game = connect5.Connect5Game()
         game.run_game()
 
+    def play_ai_game(self) -> None:
+        """Start a game against the computer as player 2."""
+        game = connect5.Connect5Game()
+        game.run_game(ai_turn=connect5.PLAYER_TWO)
+
     def show_gimmicks(self) -> None:
         """
         Display game gimmicks when clicked.
@@ -172,6 +232,8 @@ class MainMenu:
         Returns:
         None
         """
+        import pygame
+
         # This list is for the lines that show up
         # when you click the "Gimmicks" button
         gimmicks_text = [
@@ -186,25 +248,32 @@ class MainMenu:
         gimmicks_window = pygame.display.set_mode((GIMMICKS_WIDTH,
                                                    GIMMICKS_HEIGHT))
         pygame.display.set_caption("Gimmicks")
+        clock = pygame.time.Clock()
+        repaint = True
         running = True
         while running:
-            for event in pygame.event.get():
+            # Sleep until something happens instead of redrawing
+            for event in [pygame.event.wait()] + pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
                     # Reset the window size to the original size
                     pygame.display.set_mode((self.width, self.height))
-            gimmicks_window.fill(BLACK)
-            # Initial Y position for the first line of text
-            gimmicks_window_y = 100
-            font = pygame.font.Font(None, GIMMICKS_FONT_SIZE)
-            for line in gimmicks_text:
-                line_text = font.render(line, True, WHITE)
-                gimmicks_window.blit(line_text, (GIMMICKS_WINDOW_X,
-                                                 gimmicks_window_y))
-                # Adjust Y position for the next line
-                gimmicks_window_y += GIMMICKS_WINDOW_Y_ADJUST
-
-            pygame.display.flip()
+                elif is_expose_event(event):
+                    repaint = True
+            if running and repaint:
+                gimmicks_window.fill(BLACK)
+                # Initial Y position for the first line of text
+                gimmicks_window_y = 100
+                for line in gimmicks_text:
+                    line_text = render_text(line, GIMMICKS_FONT_SIZE, WHITE)
+                    gimmicks_window.blit(line_text, (GIMMICKS_WINDOW_X,
+                                                     gimmicks_window_y))
+                    # Adjust Y position for the next line
+                    gimmicks_window_y += GIMMICKS_WINDOW_Y_ADJUST
+
+                pygame.display.flip()
+                repaint = False
+            clock.tick(MENU_FPS)
 
     def exit_game(self) -> None:
         """
@@ -215,39 +284,85 @@ class MainMenu:
         Returns:
         None
         """
+        import pygame
+
         pygame.quit()
         sys.exit()
 
 
-# Create the MainMenu object with the original window size
-main_menu = MainMenu(ORIGINAL_WIDTH, ORIGINAL_HEIGHT)
-
-# Create the game window
-screen = pygame.display.set_mode((main_menu.width, main_menu.height))
-pygame.display.set_caption(WINDOW_TITLE)
-
-# Main game loop
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        elif event.type == pygame.MOUSEMOTION:
-            for button in main_menu.buttons:
-                if button.rect.collidepoint(event.pos):
-                    button.hovered = True
-                else:
-                    button.hovered = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == LMB:
+def main() -> None:
+    """
+    Open the main menu window and run the menu loop.
+
+    pygame is imported and initialised here rather than at module load,
+    so importing this module does not open a window.
+
+    Returns:
+    None
+    """
+    import pygame
+
+    # Initialize Pygame
+    pygame.init()
+
+    # Create the MainMenu object with the original window size
+    main_menu = MainMenu(ORIGINAL_WIDTH, ORIGINAL_HEIGHT)
+
+    # Create the game window
+    screen = pygame.display.set_mode((main_menu.width, main_menu.height))
+    pygame.display.set_caption(WINDOW_TITLE)
+
+    # Per-frame timings, only recorded if CONNECT5_PROFILE is set
+    timing = profiler.from_env("menu")
+
+    # Main game loop, capped at MENU_FPS and only repainting on changes
+    clock = pygame.time.Clock()
+    repaint = True
+    running = True
+    while running:
+        timing.begin()
+        if repaint:
+            screen.fill(BLACK)
+            main_menu.draw(screen)
+            pygame.display.flip()
+            repaint = False
+            timing.mark("draw")
+        # Sleep until something happens instead of redrawing
+        events = [pygame.event.wait()]
+        timing.mark("idle", busy=False)
+        for event in events + pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.MOUSEMOTION:
                 for button in main_menu.buttons:
-                    if button.rect.collidepoint(event.pos):
-                        if button.action:
-                            button.action()
-    screen.fill(BLACK)
-    main_menu.draw(screen)
-    pygame.display.flip()
-
-# Quit the game
-pygame.quit()
-sys.exit()
+                    hovered = button.rect.collidepoint(event.pos)
+                    if hovered != button.hovered:
+                        button.hovered = hovered
+                        repaint = True
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == LMB:
+                    for button in main_menu.buttons:
+                        if button.rect.collidepoint(event.pos):
+                            if button.action:
+                                timing.mark("events")
+                                button.action()
+                                # Games and the gimmicks window are
+                                # not part of the menu's frame time
+                                timing.mark("action", busy=False)
+                                # The action may have used the window
+                                screen = pygame.display.get_surface()
+                                repaint = True
+            elif is_expose_event(event):
+                repaint = True
+        timing.mark("events")
+        clock.tick(MENU_FPS)
+        timing.mark("idle", busy=False)
+
+    # Quit the game
+    timing.finish(screen)
+    pygame.quit()
+    sys.exit()
+
+
+if __name__ == "__main__":
+    main()
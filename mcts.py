@@ -0,0 +1,511 @@
+"""Monte Carlo tree search computer player for Connect 5."""
+
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import (FIRST_COMPLETED, Future, ProcessPoolExecutor,
+                                wait)
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from ai import MS_PER_SECOND, TIME_MARGIN
+from bitboard import BitBoard, PLAYER_ONE_PIECE, PLAYER_TWO_PIECE
+from connect5 import Connect5Game, TIMER_FORFEIT, TIMER_MAX
+
+# Constants
+UCT_EXPLORATION = math.sqrt(2)
+PLAYOUTS_PER_LEAF = 8
+LEAVES_PER_BATCH = 16
+BATCHES_PER_WORKER = 2
+WIN = 1.0
+DRAW = 0.5
+
+
+class MCTSResult(NamedTuple):
+    """
+    The outcome of a tree search.
+
+    Attributes:
+        column (int): The most visited root column.
+        visits (int): Playouts through the chosen column.
+        win_rate (float): Share of those playouts won, draws count half.
+        playouts (int): Playouts run by this search.
+        tree_playouts (int): Playouts in the tree, including reused ones.
+        elapsed (float): Wall-clock search time in seconds.
+        playouts_per_second (float): Search throughput.
+    """
+
+    column: int
+    visits: int
+    win_rate: float
+    playouts: int
+    tree_playouts: int
+    elapsed: float
+    playouts_per_second: float
+
+
+class Node:
+    """
+    A position in the search tree.
+
+    Attributes:
+        move (int): The column played to reach the node.
+        mover (int): The piece that played move.
+        parent (Optional[Node]): The node the move was played from.
+        children (Dict[int, Node]): Expanded children by column.
+        untried (List[int]): Legal columns not expanded yet.
+        visits (float): Playouts through the node, including pending ones.
+        wins (float): Playout score of mover, draws count half.
+        terminal (Optional[float]): Score of mover if the game ended here.
+    """
+
+    __slots__ = ("move", "mover", "parent", "children", "untried", "visits",
+                 "wins", "terminal")
+
+    def __init__(self, move: int, mover: int, parent: Optional["Node"],
+                 untried: List[int],
+                 terminal: Optional[float] = None) -> None:
+        """
+        Initialize an unvisited Node.
+
+        Args:
+            move (int): The column played to reach the node.
+            mover (int): The piece that played move.
+            parent (Optional[Node]): The node the move was played from.
+            untried (List[int]): Legal columns to expand later.
+            terminal (Optional[float]): Score of mover if the game ended.
+
+        Returns:
+        None
+        """
+        self.move = move
+        self.mover = mover
+        self.parent = parent
+        self.children: Dict[int, Node] = {}
+        self.untried = untried
+        self.visits = 0.0
+        self.wins = 0.0
+        self.terminal = terminal
+
+    def select_child(self) -> "Node":
+        """
+        Pick the child with the highest UCT score.
+
+        An unvisited child is picked first, as its score is unbounded.
+
+        Returns:
+            Node: The child to descend into.
+        """
+        log_visits = math.log(self.visits) if self.visits > 0 else 0.0
+        best = None
+        best_score = -1.0
+        for child in self.children.values():
+            if child.visits <= 0:
+                return child
+            score = (child.wins / child.visits + UCT_EXPLORATION *
+                     math.sqrt(log_visits / child.visits))
+            if score > best_score:
+                best = child
+                best_score = score
+        return best
+
+
+def _restore(rows: int, columns: int, connect: int,
+             stones: Tuple[int, int]) -> BitBoard:
+    """
+    Build a BitBoard from the stones of each player.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        connect (int): Number of checkers in a row needed to win.
+        stones (Tuple[int, int]): The bitboards of player 1 and 2.
+
+    Returns:
+        BitBoard: The position.
+    """
+    board = BitBoard(rows, columns, connect)
+    for piece, mask in zip((PLAYER_ONE_PIECE, PLAYER_TWO_PIECE), stones):
+        for col in range(columns):
+            for row in range(rows):
+                if mask & board.bit(row, col):
+                    board.drop(row, col, piece)
+    return board
+
+
+def _run_playouts(args: Tuple[Tuple[int, int, int], Tuple[int, int], int,
+                              List[Sequence[int]], int, int,
+                              Optional[float]]
+                  ) -> List[float]:
+    """
+    Run random playouts from a batch of leaves below one root.
+
+    This is the unit of work sent to the process pool, so it only takes
+    and returns plain values.
+
+    Args:
+        args (tuple): The board shape, the root stones, the piece to
+        move at the root, the column path to each leaf, the playouts
+        per leaf, the random seed and a time.perf_counter() deadline,
+        or None to play out every leaf.
+
+    Returns:
+        List[float]: For each leaf played out, the summed playout score
+        of the piece that moved into it. Leaves not reached by the
+        deadline are left off the end.
+    """
+    shape, stones, piece, paths, playouts, seed, deadline = args
+    board = _restore(*shape, stones)
+    rng = random.Random(seed)
+    choice = rng.choice
+    scores = []
+    for path in paths:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        to_move = piece
+        for col in path:
+            board.play(col, to_move)
+            to_move = 3 - to_move
+        mover = 3 - to_move
+        score = 0.0
+        for _ in range(playouts):
+            played = []
+            current = to_move
+            result = DRAW
+            while board.legal_mask:
+                col = choice(board.legal_columns)
+                row = board.play(col, current)
+                played.append(col)
+                if board.wins_at(row, col, current):
+                    result = WIN if current == mover else 0.0
+                    break
+                current = 3 - current
+            score += result
+            for col in reversed(played):
+                board.undo(col)
+        scores.append(score)
+        for col in reversed(path):
+            board.undo(col)
+    return scores
+
+
+class MCTSPlayer:
+    """
+    A UCT player whose playouts run in batches across a process pool.
+
+    The tree stays in this process. Each batch selects several leaves,
+    counting their pending playouts as visits so the batch spreads over
+    the tree (virtual loss), and the workers play them out. The subtree
+    of the position reached is kept for the next search.
+
+    Attributes:
+        workers (int): Number of worker processes, 1 runs playouts here.
+        playouts_per_leaf (int): Random playouts run from each leaf.
+        leaves_per_batch (int): Leaves sent to a worker at once.
+        root (Optional[Node]): The tree of the last search.
+    """
+
+    def __init__(self, workers: Optional[int] = None,
+                 playouts_per_leaf: int = PLAYOUTS_PER_LEAF,
+                 leaves_per_batch: int = LEAVES_PER_BATCH,
+                 seed: Optional[int] = None) -> None:
+        """
+        Initialize an MCTSPlayer.
+
+        Args:
+            workers (Optional[int]): Number of processes, defaults to the
+            number of cores.
+            playouts_per_leaf (int): Random playouts run from each leaf.
+            leaves_per_batch (int): Leaves sent to a worker at once.
+            seed (Optional[int]): Seed for expansion order and playouts.
+
+        Returns:
+        None
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.playouts_per_leaf = playouts_per_leaf
+        self.leaves_per_batch = leaves_per_batch
+        self.root: Optional[Node] = None
+        self._rng = random.Random(seed)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._board: Optional[BitBoard] = None
+        self._history: List[int] = []
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes.
+
+        Returns:
+        None
+        """
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "MCTSPlayer":
+        """Use the player as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Shut the workers down at the end of a with block."""
+        self.close()
+
+    def search(self, game: Connect5Game,
+               time_budget: int = TIMER_MAX) -> MCTSResult:
+        """
+        Search for the best column for the player whose turn it is.
+
+        Args:
+            game (Connect5Game): The game to search, which is not changed.
+            time_budget (int): Time allowed in milliseconds, capped to
+            stay inside the TIMER_MAX turn timer.
+
+        Returns:
+            MCTSResult: The most visited column and search statistics.
+        """
+        start = time.perf_counter()
+        budget = min(time_budget, TIMER_MAX - TIME_MARGIN)
+        deadline = start + budget / MS_PER_SECOND
+        board = game.bitboard.copy()
+        piece = game.turn + 1
+        if not board.legal_mask:
+            raise ValueError("no legal moves left")
+        root = self._reuse(game, board, piece)
+        shape = (board.rows, board.columns, board.connect)
+        stones = (board.stones[PLAYER_ONE_PIECE],
+                  board.stones[PLAYER_TWO_PIECE])
+        playouts = 0
+
+        if self.workers == 1:
+            while time.perf_counter() < deadline:
+                paths, leaves = self._select_batch(root, board, piece)
+                scores = _run_playouts((shape, stones, piece, paths,
+                                        self.playouts_per_leaf,
+                                        self._rng.getrandbits(32), deadline))
+                # Leaves the deadline cut off are taken back
+                played = len(scores)
+                self._backpropagate(leaves[:played], scores)
+                self._backpropagate(leaves[played:], None)
+                playouts += played * self.playouts_per_leaf
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            pending: Dict[Future, List[Node]] = {}
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                while len(pending) < self.workers * BATCHES_PER_WORKER:
+                    paths, leaves = self._select_batch(root, board, piece)
+                    if not paths:
+                        break
+                    future = self._pool.submit(
+                        _run_playouts, (shape, stones, piece, paths,
+                                        self.playouts_per_leaf,
+                                        self._rng.getrandbits(32), None))
+                    pending[future] = leaves
+                if not pending:
+                    # Every leaf was terminal and scored in place
+                    continue
+                done, _ = wait(pending, deadline - now,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    leaves = pending.pop(future)
+                    self._backpropagate(leaves, future.result())
+                    playouts += len(leaves) * self.playouts_per_leaf
+            # Results arriving after the deadline are dropped
+            for future, leaves in pending.items():
+                future.cancel()
+                self._backpropagate(leaves, None)
+
+        best = max(root.children.values(), key=lambda child: child.visits,
+                   default=None)
+        if best is None:
+            column = board.legal_columns[0]
+            visits = 0
+            win_rate = 0.0
+        else:
+            column = best.move
+            visits = int(best.visits)
+            win_rate = best.wins / best.visits
+        elapsed = time.perf_counter() - start
+        return MCTSResult(column, visits, win_rate, playouts,
+                          int(root.visits), elapsed,
+                          playouts / elapsed if elapsed else 0.0)
+
+    def _reuse(self, game: Connect5Game, board: BitBoard,
+               piece: int) -> Node:
+        """
+        Find the game's position in the last tree, or start a new tree.
+
+        Args:
+            game (Connect5Game): The game about to be searched.
+            board (BitBoard): The game's board.
+            piece (int): The piece to move.
+
+        Returns:
+            Node: The root node for the search.
+        """
+        node = self.root
+        last = self._board
+        history = self._history
+        moves = game.moves
+        if node is not None and moves[:len(history)] == history:
+            for col in moves[len(history):]:
+                if col == TIMER_FORFEIT:
+                    node = None
+                    break
+                last.play(col, 3 - node.mover)
+                node = node.children.get(col)
+                if node is None:
+                    break
+        # The move list is only a hint, the position must match too
+        if (node is None or node.mover != 3 - piece or
+                last.stones != board.stones):
+            node = Node(TIMER_FORFEIT, 3 - piece, None,
+                        self._shuffled(board.legal_columns))
+        node.parent = None
+        self.root = node
+        self._board = board.copy()
+        self._history = list(moves)
+        return node
+
+    def _shuffled(self, columns: Sequence[int]) -> List[int]:
+        """
+        Put columns in a random expansion order.
+
+        Args:
+            columns (Sequence[int]): The legal columns.
+
+        Returns:
+            List[int]: The columns in random order.
+        """
+        order = list(columns)
+        self._rng.shuffle(order)
+        return order
+
+    def _select_batch(self, root: Node, board: BitBoard, piece: int
+                      ) -> Tuple[List[List[int]], List[Node]]:
+        """
+        Select and expand leaves to play out.
+
+        Every selected leaf immediately counts its pending playouts as
+        visits, so later selections in the batch prefer other leaves.
+        Leaves where the game is already over are scored in place.
+
+        Args:
+            root (Node): The root of the tree.
+            board (BitBoard): The root position, restored on return.
+            piece (int): The piece to move at the root.
+
+        Returns:
+            Tuple[List[List[int]], List[Node]]: The column path from the
+            root to each leaf, and the leaves.
+        """
+        paths = []
+        leaves = []
+        playouts = self.playouts_per_leaf
+        for _ in range(self.leaves_per_batch):
+            node = root
+            path = []
+            to_move = piece
+            while node.terminal is None:
+                if node.untried:
+                    col = node.untried.pop()
+                    row = board.play(col, to_move)
+                    path.append(col)
+                    if board.wins_at(row, col, to_move):
+                        terminal = WIN
+                    elif not board.legal_mask:
+                        terminal = DRAW
+                    else:
+                        terminal = None
+                    child = Node(col, to_move, node,
+                                 [] if terminal is not None else
+                                 self._shuffled(board.legal_columns),
+                                 terminal)
+                    node.children[col] = child
+                    node = child
+                    break
+                node = node.select_child()
+                board.play(node.move, to_move)
+                path.append(node.move)
+                to_move = 3 - to_move
+            for col in reversed(path):
+                board.undo(col)
+            if node.terminal is not None:
+                self._update(node, playouts, node.terminal * playouts)
+                continue
+            self._update(node, playouts, None)
+            paths.append(path)
+            leaves.append(node)
+        return paths, leaves
+
+    def _backpropagate(self, leaves: List[Node],
+                       scores: Optional[List[float]]) -> None:
+        """
+        Add playout results to the leaves and their ancestors.
+
+        Args:
+            leaves (List[Node]): The leaves that were played out.
+            scores (Optional[List[float]]): The score of each leaf's
+            mover, or None to take back the pending visits instead and
+            detach leaves that were never played out.
+
+        Returns:
+        None
+        """
+        playouts = self.playouts_per_leaf
+        if scores is None:
+            for leaf in leaves:
+                self._update(leaf, -playouts, None)
+                # Nodes left unvisited go back to their parent's untried
+                # columns, so the tree only holds visited nodes
+                node = leaf
+                while node.visits <= 0 and node.parent is not None:
+                    parent = node.parent
+                    del parent.children[node.move]
+                    parent.untried.append(node.move)
+                    node.parent = None
+                    node = parent
+            return
+        for leaf, score in zip(leaves, scores):
+            self._update(leaf, 0, score)
+
+    def _update(self, leaf: Node, visits: float,
+                score: Optional[float]) -> None:
+        """
+        Add visits and a score to a leaf and every ancestor.
+
+        Args:
+            leaf (Node): The leaf the playouts started from.
+            visits (float): Playouts to add to the visit counts.
+            score (Optional[float]): Score of the leaf's mover out of
+            playouts_per_leaf playouts, or None to only add visits.
+
+        Returns:
+        None
+        """
+        node = leaf
+        mover = leaf.mover
+        while node is not None:
+            node.visits += visits
+            if score is not None:
+                if node.mover == mover:
+                    node.wins += score
+                else:
+                    node.wins += self.playouts_per_leaf - score
+            node = node.parent
+
+
+if __name__ == "__main__":
+    # Search the opening position and report playout throughput
+    budget = int(sys.argv[1]) if len(sys.argv) > 1 else TIMER_MAX
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    with MCTSPlayer(workers) as player:
+        result = player.search(Connect5Game(), budget)
+    print(f"column={result.column} visits={result.visits} "
+          f"win_rate={result.win_rate:.3f} playouts={result.playouts} "
+          f"time={result.elapsed:.2f}s "
+          f"playouts/s={result.playouts_per_second:.0f}")
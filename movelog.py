@@ -0,0 +1,312 @@
+"""Compact binary move logs for Connect 5 games.
+
+A log file starts with a header holding the board size and run length,
+followed by one record per game. A record is the number of moves as a
+varint and then the moves packed little-endian into a few bits each:
+a column index, or COLUMN_COUNT for a turn lost to the hidden turn
+timer. A 7x8 game uses 4 bits per move.
+"""
+
+import struct
+from typing import BinaryIO, Iterator, List, NamedTuple, Sequence, Tuple
+
+from bitboard import CONNECT_LENGTH
+from connect5 import (Connect5Game, COLUMN_COUNT, ROW_COUNT,
+                      TIMER_FORFEIT)
+
+# Constants
+MAGIC = b"C5ML"
+VERSION = 1
+HEADER = struct.Struct("<4sBHHB")
+READ_CHUNK_SIZE = 1 << 16
+VARINT_BITS = 7
+VARINT_MASK = 0x7F
+VARINT_MORE = 0x80
+BITS_PER_BYTE = 8
+
+
+class LogHeader(NamedTuple):
+    """
+    The board settings shared by every game in a log.
+
+    Attributes:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        connect (int): Number of checkers in a row needed to win.
+    """
+
+    rows: int
+    columns: int
+    connect: int
+
+    @property
+    def move_bits(self) -> int:
+        """int: Bits per move, enough for every column and a forfeit."""
+        return self.columns.bit_length()
+
+
+def _encode_varint(value: int) -> bytes:
+    """
+    Encode a non-negative int as a LEB128 varint.
+
+    Args:
+        value (int): The value to encode.
+
+    Returns:
+        bytes: The encoded value.
+    """
+    out = bytearray()
+    while value > VARINT_MASK:
+        out.append((value & VARINT_MASK) | VARINT_MORE)
+        value >>= VARINT_BITS
+    out.append(value)
+    return bytes(out)
+
+
+def pack_moves(moves: Sequence[int], header: LogHeader) -> bytes:
+    """
+    Pack a game's moves into a log record.
+
+    Args:
+        moves (Sequence[int]): Columns played, or TIMER_FORFEIT.
+        header (LogHeader): The settings of the log.
+
+    Returns:
+        bytes: The record, a varint move count then the packed moves.
+    """
+    bits = header.move_bits
+    packed = 0
+    for index, move in enumerate(moves):
+        if move == TIMER_FORFEIT:
+            code = header.columns
+        elif 0 <= move < header.columns:
+            code = move
+        else:
+            raise ValueError(f"move out of range: {move}")
+        packed |= code << (index * bits)
+    size = -(-len(moves) * bits // BITS_PER_BYTE)
+    return _encode_varint(len(moves)) + packed.to_bytes(size, "little")
+
+
+def unpack_moves(data: bytes, count: int, header: LogHeader) -> List[int]:
+    """
+    Unpack the moves of a log record.
+
+    Args:
+        data (bytes): The packed moves.
+        count (int): The number of moves.
+        header (LogHeader): The settings of the log.
+
+    Returns:
+        List[int]: Columns played, or TIMER_FORFEIT.
+    """
+    bits = header.move_bits
+    mask = (1 << bits) - 1
+    packed = int.from_bytes(data, "little")
+    moves = []
+    for _ in range(count):
+        code = packed & mask
+        moves.append(TIMER_FORFEIT if code == header.columns else code)
+        packed >>= bits
+    return moves
+
+
+def read_header(file: BinaryIO) -> LogHeader:
+    """
+    Read and check the header of a log file.
+
+    Args:
+        file (BinaryIO): The log, positioned at the start.
+
+    Returns:
+        LogHeader: The board settings of the log.
+    """
+    data = file.read(HEADER.size)
+    if len(data) != HEADER.size:
+        raise ValueError("truncated move log header")
+    magic, version, rows, columns, connect = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a Connect 5 move log")
+    return LogHeader(rows, columns, connect)
+
+
+class MoveLogWriter:
+    """
+    An append-only writer for a binary move log.
+
+    Attributes:
+        header (LogHeader): The board settings of the log.
+        games (int): Number of games written by this writer.
+    """
+
+    def __init__(self, path: str, rows: int = ROW_COUNT,
+                 columns: int = COLUMN_COUNT,
+                 connect: int = CONNECT_LENGTH) -> None:
+        """
+        Open a log for appending, writing the header if it is new.
+
+        Args:
+            path (str): The log file.
+            rows (int): Number of rows on the game board.
+            columns (int): Number of columns on the game board.
+            connect (int): Number of checkers in a row needed to win.
+
+        Returns:
+        None
+        """
+        self.header = LogHeader(rows, columns, connect)
+        self.games = 0
+        self._file = open(path, "ab+")
+        self._file.seek(0)
+        if self._file.read(1):
+            self._file.seek(0)
+            if read_header(self._file) != self.header:
+                self._file.close()
+                raise ValueError("move log was written for another board")
+        else:
+            self._file.write(HEADER.pack(MAGIC, VERSION, rows, columns,
+                                         connect))
+
+    def write_game(self, moves: Sequence[int]) -> None:
+        """
+        Append one game to the log.
+
+        Args:
+            moves (Sequence[int]): Columns played, or TIMER_FORFEIT.
+
+        Returns:
+        None
+        """
+        self._file.write(pack_moves(moves, self.header))
+        self.games += 1
+
+    def close(self) -> None:
+        """
+        Flush and close the log.
+
+        Returns:
+        None
+        """
+        self._file.close()
+
+    def __enter__(self) -> "MoveLogWriter":
+        """Use the writer as a context manager."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close the writer at the end of a with block."""
+        self.close()
+
+
+def _read_records(file: BinaryIO, header: LogHeader) -> Iterator[List[int]]:
+    """
+    Parse game records from a file in fixed-size chunks.
+
+    Args:
+        file (BinaryIO): The log, positioned after the header.
+        header (LogHeader): The board settings of the log.
+
+    Returns:
+        Iterator[List[int]]: The moves of each game in order.
+    """
+    buffer = b""
+    offset = 0
+    while True:
+        # Parse the move count varint, refilling the buffer as needed
+        count = 0
+        shift = 0
+        while True:
+            if offset == len(buffer):
+                buffer = file.read(READ_CHUNK_SIZE)
+                offset = 0
+                if not buffer:
+                    if shift:
+                        raise ValueError("truncated move log record")
+                    return
+            byte = buffer[offset]
+            offset += 1
+            count |= (byte & VARINT_MASK) << shift
+            shift += VARINT_BITS
+            if not byte & VARINT_MORE:
+                break
+        size = -(-count * header.move_bits // BITS_PER_BYTE)
+        data = buffer[offset:offset + size]
+        offset += len(data)
+        if len(data) < size:
+            rest = file.read(size - len(data))
+            if len(rest) < size - len(data):
+                raise ValueError("truncated move log record")
+            data += rest
+        yield unpack_moves(data, count, header)
+
+
+def read_games(path: str) -> Iterator[List[int]]:
+    """
+    Stream the games of a log one at a time.
+
+    Only one chunk of the file is held in memory, so logs with millions
+    of games can be replayed without loading them.
+
+    Args:
+        path (str): The log file.
+
+    Returns:
+        Iterator[List[int]]: The moves of each game in order.
+    """
+    with open(path, "rb") as file:
+        header = read_header(file)
+        yield from _read_records(file, header)
+
+
+def replay(moves: Sequence[int], game: Connect5Game, record: int = 0
+           ) -> Iterator[Tuple[int, int, int]]:
+    """
+    Play recorded moves on a game, yielding each one as it is made.
+
+    A move off the board or into a full column raises ValueError.
+
+    Args:
+        moves (Sequence[int]): Columns played, or TIMER_FORFEIT.
+        game (Connect5Game): The game to play on, normally a new one.
+        record (int): Index of the game in its log, for error messages.
+
+    Returns:
+        Iterator[Tuple[int, int, int]]: (row, col, piece) for each move,
+        with row and col set to TIMER_FORFEIT for a forfeited turn.
+    """
+    for index, col in enumerate(moves):
+        piece = game.turn + 1
+        if col == TIMER_FORFEIT:
+            game.turn = (game.turn + 1) % 2
+            yield TIMER_FORFEIT, TIMER_FORFEIT, piece
+            continue
+        if not (0 <= col < game.COLUMN_COUNT and
+                game.is_valid_location(col)):
+            raise ValueError(f"record {record} move {index}: column {col} "
+                             f"cannot be played")
+        row = game.get_next_open_row(col)
+        game.drop_piece(row, col, piece)
+        game.turn = (game.turn + 1) % 2
+        if game.win_check_at(row, col, piece):
+            game.game_over = True
+        yield row, col, piece
+
+
+def replay_log(path: str) -> Iterator[Connect5Game]:
+    """
+    Stream-replay every game of a log.
+
+    Args:
+        path (str): The log file.
+
+    Returns:
+        Iterator[Connect5Game]: Each game in its final position.
+    """
+    with open(path, "rb") as file:
+        header = read_header(file)
+        for record, moves in enumerate(_read_records(file, header)):
+            game = Connect5Game(*header)
+            for _ in replay(moves, game, record):
+                pass
+            game.moves = list(moves)
+            yield game
@@ -0,0 +1,275 @@
+"""Precomputed opening book stored as a memory-mapped binary table."""
+
+import argparse
+import mmap
+import struct
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import ai
+from bitboard import CONNECT_LENGTH
+from connect5 import Connect5Game, COLUMN_COUNT, ROW_COUNT, TIMER_MAX
+
+# Constants
+MAGIC = b"C5OB"
+VERSION = 2
+HEADER = struct.Struct("<4sBBBBQ")
+RECORD = struct.Struct("<QiBxxx")
+KEY_BITS = 64
+BOOK_DEPTH = 4
+SEARCH_DEPTH = 8
+
+
+class BookEntry(NamedTuple):
+    """
+    A stored opening move.
+
+    Attributes:
+        column (int): The best column for the side to move.
+        score (int): The search score of the position.
+    """
+
+    column: int
+    score: int
+
+
+def book_key(game: Connect5Game) -> Optional[Tuple[int, bool]]:
+    """
+    Get the book key of a position.
+
+    Book positions are reached without timer forfeits, so the side to
+    move follows from the number of checkers and is not in the key.
+    A position and its mirror image share a key, and the book stores
+    columns as seen from the smaller of the two keys.
+
+    Args:
+        game (Connect5Game): The position to look up.
+
+    Returns:
+        Optional[Tuple[int, bool]]: The 64-bit canonical key and whether
+        the position is mirrored to get it, or None if the position
+        cannot be in a book because the side to move does not match.
+    """
+    if game.turn != sum(game.bitboard.heights) % 2:
+        return None
+    return game.bitboard.canonical_key()
+
+
+def generate(depth: int = BOOK_DEPTH, search_depth: int = SEARCH_DEPTH,
+             rows: int = ROW_COUNT, columns: int = COLUMN_COUNT,
+             connect: int = CONNECT_LENGTH) -> Dict[int, BookEntry]:
+    """
+    Search every position up to a number of moves from the start.
+
+    Args:
+        depth (int): Positions with fewer checkers than this are stored.
+        search_depth (int): Fixed negamax depth used for each position.
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        connect (int): Number of checkers in a row needed to win.
+
+    Returns:
+        Dict[int, BookEntry]: The best move of each position by key.
+    """
+    if (rows + 1) * columns > KEY_BITS:
+        raise ValueError("board too large for 64-bit book keys")
+    start = Connect5Game(rows, columns, connect)
+    player = ai.NegamaxPlayer()
+    book: Dict[int, BookEntry] = {}
+    # Positions of the current depth by canonical key, so transpositions
+    # and mirror images are only searched once
+    frontier: Dict[int, Tuple[int, ...]] = {
+        start.bitboard.canonical_key()[0]: ()}
+    for _ in range(depth):
+        next_frontier: Dict[int, Tuple[int, ...]] = {}
+        for key, moves in frontier.items():
+            game = _play(start, moves)
+            result = player.search(game, TIMER_MAX, search_depth)
+            board = game.bitboard
+            column = result.column
+            if board.canonical_key()[1]:
+                column = board.mirror_column(column)
+            book[key] = BookEntry(column, result.score)
+            piece = game.turn + 1
+            for col in game.legal_moves():
+                row = board.play(col, piece)
+                # Won positions end the game, so they need no book move
+                if not board.wins_at(row, col, piece):
+                    next_frontier.setdefault(board.canonical_key()[0],
+                                             moves + (col,))
+                board.undo(col)
+        frontier = next_frontier
+    return book
+
+
+def _play(start: Connect5Game, moves: Tuple[int, ...]) -> Connect5Game:
+    """
+    Create a new game and play a sequence of columns on it.
+
+    Args:
+        start (Connect5Game): A game with the board size to use.
+        moves (Tuple[int, ...]): The columns to play.
+
+    Returns:
+        Connect5Game: The game after the moves.
+    """
+    game = Connect5Game(start.ROW_COUNT, start.COLUMN_COUNT,
+                        start.CONNECT_LENGTH)
+    for col in moves:
+        game.drop_piece(game.get_next_open_row(col), col, game.turn + 1)
+        game.turn = (game.turn + 1) % 2
+    return game
+
+
+def write_book(path: str, book: Dict[int, BookEntry], rows: int,
+               columns: int, connect: int) -> None:
+    """
+    Write a book as a table of fixed-width records sorted by key.
+
+    Args:
+        path (str): The file to write.
+        book (Dict[int, BookEntry]): The entries by key.
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        connect (int): Number of checkers in a row needed to win.
+
+    Returns:
+    None
+    """
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, rows, columns, connect,
+                               len(book)))
+        for key in sorted(book):
+            entry = book[key]
+            file.write(RECORD.pack(key, entry.score, entry.column))
+
+
+class OpeningBook:
+    """
+    A read-only opening book backed by a memory-mapped file.
+
+    The file is never parsed as a whole. Lookups binary-search the
+    mapped records, so processes using the same book share one copy
+    through the page cache.
+
+    Attributes:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        connect (int): Number of checkers in a row needed to win.
+        count (int): Number of positions in the book.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Map a book file.
+
+        Args:
+            path (str): The book file written by write_book.
+
+        Returns:
+        None
+        """
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.rows, self.columns, self.connect,
+         self.count) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError("not a Connect 5 opening book")
+        if len(self._map) < HEADER.size + self.count * RECORD.size:
+            self._map.close()
+            raise ValueError("truncated opening book")
+
+    def lookup(self, key: int) -> Optional[BookEntry]:
+        """
+        Find a position by key.
+
+        Args:
+            key (int): The canonical position key from book_key.
+
+        Returns:
+            Optional[BookEntry]: The stored move, or None if not found.
+        """
+        data = self._map
+        unpack = RECORD.unpack_from
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            stored, score, column = unpack(data, HEADER.size +
+                                           middle * RECORD.size)
+            if stored < key:
+                low = middle + 1
+            elif stored > key:
+                high = middle
+            else:
+                return BookEntry(column, score)
+        return None
+
+    def probe(self, game: Connect5Game) -> Optional[BookEntry]:
+        """
+        Find the book move for a game.
+
+        Args:
+            game (Connect5Game): The position to look up, or a GameState.
+
+        Returns:
+            Optional[BookEntry]: The stored move, or None if not found.
+        """
+        board = game.bitboard
+        if (board.rows, board.columns, board.connect) != (
+                self.rows, self.columns, self.connect):
+            return None
+        found = book_key(game)
+        if found is None:
+            return None
+        key, mirrored = found
+        entry = self.lookup(key)
+        if entry is not None and mirrored:
+            entry = BookEntry(board.mirror_column(entry.column), entry.score)
+        return entry
+
+    def close(self) -> None:
+        """
+        Unmap the book file.
+
+        Returns:
+        None
+        """
+        self._map.close()
+
+
+def main() -> None:
+    """
+    Generate a book or look up a position from the command line.
+
+    Returns:
+    None
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("generate", help="generate a book file")
+    build.add_argument("path")
+    build.add_argument("--depth", type=int, default=BOOK_DEPTH,
+                       help="store positions with fewer checkers than this")
+    build.add_argument("--search-depth", type=int, default=SEARCH_DEPTH)
+    find = commands.add_parser("lookup", help="look up a position")
+    find.add_argument("path")
+    find.add_argument("moves", nargs="*", type=int,
+                      help="columns played from the start")
+    options = parser.parse_args()
+
+    if options.command == "generate":
+        book = generate(options.depth, options.search_depth)
+        write_book(options.path, book, ROW_COUNT, COLUMN_COUNT,
+                   CONNECT_LENGTH)
+        print(f"wrote {len(book)} positions to {options.path}")
+    else:
+        book = OpeningBook(options.path)
+        game = _play(Connect5Game(book.rows, book.columns, book.connect),
+                     tuple(options.moves))
+        print(book.probe(game))
+        book.close()
+
+
+if __name__ == "__main__":
+    main()
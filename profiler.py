@@ -0,0 +1,271 @@
+"""Opt-in per-frame timing for the game and menu loops.
+
+Set CONNECT5_PROFILE to turn it on ("0", "false", "off" and "no" leave
+it off). The timings are printed when the loop ends, or drawn over the
+window if it is "overlay". If CONNECT5_PROFILE_FILE holds a path they
+are appended to it as a JSON line instead.
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pygame
+
+# Constants
+PROFILE_ENV = "CONNECT5_PROFILE"
+PROFILE_FILE_ENV = "CONNECT5_PROFILE_FILE"
+DISABLED_MODES = ("", "0", "false", "off", "no")
+PRINT_MODE = "print"
+OVERLAY_MODE = "overlay"
+PROFILE_FRAMES = 1024
+FRAME = "frame"
+MS_PER_SECOND = 1000
+PERCENTILE_P50 = 0.50
+PERCENTILE_P95 = 0.95
+OVERLAY_FONT_SIZE = 20
+OVERLAY_LINE_HEIGHT = 22
+OVERLAY_MARGIN = 10
+OVERLAY_COLOR = (255, 255, 255)
+OVERLAY_BG_COLOR = (0, 0, 0)
+OVERLAY_TIME = 5000
+
+
+class PhaseStats(NamedTuple):
+    """
+    Timing statistics of one phase over the recorded frames.
+
+    Attributes:
+        frames (int): Number of frames the phase ran in.
+        p50 (float): Median time in milliseconds.
+        p95 (float): 95th percentile time in milliseconds.
+        max (float): Longest time in milliseconds.
+    """
+
+    frames: int
+    p50: float
+    p95: float
+    max: float
+
+
+class NullProfiler:
+    """
+    A profiler that records nothing, used when profiling is off.
+
+    Every method is an empty call, so instrumented loops cost next to
+    nothing when CONNECT5_PROFILE is not set.
+    """
+
+    enabled = False
+
+    def begin(self) -> None:
+        """Start a frame."""
+
+    def mark(self, phase: str, busy: bool = True) -> None:
+        """Close a phase of the current frame."""
+
+    def finish(self, surface: Optional["pygame.Surface"] = None) -> None:
+        """Report the timings."""
+
+
+class FrameProfiler(NullProfiler):
+    """
+    Records how long each phase of each frame takes.
+
+    A frame is one pass of a loop. begin() starts it and every mark()
+    charges the time since the previous mark to a phase. The last
+    PROFILE_FRAMES frames are kept in a ring buffer.
+
+    Attributes:
+        name (str): The loop being profiled, used in reports.
+        mode (str): Where finish() reports: print or overlay.
+        path (Optional[str]): File the timings are appended to instead.
+        frames (List[Optional[Dict[str, float]]]): The ring buffer of
+        phase times in seconds per frame.
+        count (int): Number of frames recorded so far.
+    """
+
+    enabled = True
+
+    def __init__(self, name: str, mode: str = PRINT_MODE,
+                 path: Optional[str] = None,
+                 capacity: int = PROFILE_FRAMES) -> None:
+        """
+        Initialize a FrameProfiler with an empty ring buffer.
+
+        Args:
+            name (str): The loop being profiled.
+            mode (str): Where finish() reports: print or overlay.
+            path (Optional[str]): File to append the timings to instead.
+            capacity (int): Number of frames kept.
+
+        Returns:
+        None
+        """
+        self.name = name
+        self.mode = mode
+        self.path = path
+        self.frames: List[Optional[Dict[str, float]]] = [None] * capacity
+        self.count = 0
+        self._frame: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def begin(self) -> None:
+        """
+        Start a frame, storing the previous one in the ring buffer.
+
+        Returns:
+        None
+        """
+        if self._frame:
+            self._frame.setdefault(FRAME, 0.0)
+            self.frames[self.count % len(self.frames)] = self._frame
+            self.count += 1
+        self._frame = {}
+        self._last = time.perf_counter()
+
+    def mark(self, phase: str, busy: bool = True) -> None:
+        """
+        Charge the time since the last mark to a phase.
+
+        Args:
+            phase (str): The phase that just ended.
+            busy (bool): Whether the time counts towards the frame time.
+            Waiting for events or for a game started from the menu
+            does not.
+
+        Returns:
+        None
+        """
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        frame = self._frame
+        frame[phase] = frame.get(phase, 0.0) + elapsed
+        if busy:
+            frame[FRAME] = frame.get(FRAME, 0.0) + elapsed
+
+    def stats(self) -> Dict[str, PhaseStats]:
+        """
+        Summarise the recorded frames.
+
+        Returns:
+            Dict[str, PhaseStats]: Statistics of the frame time and of
+            every phase.
+        """
+        self.begin()
+        timings: Dict[str, List[float]] = {}
+        for frame in self.frames:
+            if frame is None:
+                continue
+            for phase, seconds in frame.items():
+                timings.setdefault(phase, []).append(seconds)
+        summary = {}
+        for phase, values in timings.items():
+            values.sort()
+            summary[phase] = PhaseStats(
+                len(values), _percentile(values, PERCENTILE_P50),
+                _percentile(values, PERCENTILE_P95),
+                values[-1] * MS_PER_SECOND)
+        return summary
+
+    def lines(self) -> List[str]:
+        """
+        Format the statistics as a small table.
+
+        Returns:
+            List[str]: One line per phase, frame time first.
+        """
+        summary = self.stats()
+        lines = [f"{self.name}: {min(self.count, len(self.frames))} "
+                 f"frames (ms)   p50     p95     max"]
+        for phase in sorted(summary, key=lambda name: name != FRAME):
+            stats = summary[phase]
+            lines.append(f"{phase:18} {stats.p50:7.2f} {stats.p95:7.2f} "
+                         f"{stats.max:7.2f}")
+        return lines
+
+    def finish(self, surface: Optional["pygame.Surface"] = None) -> None:
+        """
+        Report the timings as chosen by mode.
+
+        Args:
+            surface (Optional[pygame.Surface]): The window to draw the
+            overlay on, if mode is overlay.
+
+        Returns:
+        None
+        """
+        if self.path is not None:
+            with open(self.path, "a") as file:
+                record = {"loop": self.name,
+                          "stats": {phase: stats._asdict() for phase, stats
+                                    in self.stats().items()}}
+                file.write(json.dumps(record) + "\n")
+        elif self.mode == OVERLAY_MODE and surface is not None:
+            self._draw_overlay(surface)
+        else:
+            print("\n".join(self.lines()), file=sys.stderr)
+
+    def _draw_overlay(self, surface: "pygame.Surface") -> None:
+        """
+        Draw the statistics over the window and leave them up a while.
+
+        Args:
+            surface (pygame.Surface): The window surface.
+
+        Returns:
+        None
+        """
+        import pygame
+
+        font = pygame.font.SysFont("monospace", OVERLAY_FONT_SIZE)
+        for index, line in enumerate(self.lines()):
+            label = font.render(line, 1, OVERLAY_COLOR, OVERLAY_BG_COLOR)
+            surface.blit(label, (OVERLAY_MARGIN, OVERLAY_MARGIN +
+                                 index * OVERLAY_LINE_HEIGHT))
+        pygame.display.update()
+        pygame.time.wait(OVERLAY_TIME)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Pick a percentile from sorted times.
+
+    Args:
+        ordered (List[float]): Times in seconds in ascending order.
+        fraction (float): The percentile as a fraction.
+
+    Returns:
+        float: The time in milliseconds.
+    """
+    index = min(int(len(ordered) * fraction), len(ordered) - 1)
+    return ordered[index] * MS_PER_SECOND
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def from_env(name: str) -> NullProfiler:
+    """
+    Create a profiler for a loop if CONNECT5_PROFILE turns it on.
+
+    Any value other than "overlay" or one of DISABLED_MODES prints the
+    timings.
+
+    Args:
+        name (str): The loop being profiled.
+
+    Returns:
+        NullProfiler: A FrameProfiler, or NULL_PROFILER when profiling
+        is off.
+    """
+    mode = os.environ.get(PROFILE_ENV, "").strip().lower()
+    if mode in DISABLED_MODES:
+        return NULL_PROFILER
+    if mode != OVERLAY_MODE:
+        mode = PRINT_MODE
+    return FrameProfiler(name, mode, os.environ.get(PROFILE_FILE_ENV) or None)
@@ -0,0 +1,343 @@
+"""Render recorded games to PNG frames without a window.
+
+Every game of a move log becomes a directory of frames, one for the
+empty board and one per checker dropped, laid out exactly like the
+game window. Games are rendered in parallel processes using SDL's
+dummy video driver.
+"""
+
+import argparse
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import (Deque, Dict, Iterator, List, NamedTuple,
+                    Optional, Sequence, Tuple, TYPE_CHECKING)
+
+from connect5 import (Connect5Game, MIN_FONT_SIZE, SQUARESIZE, TIMER_FORFEIT,
+                      WIN_FONT_SIZE)
+import movelog
+
+if TYPE_CHECKING:
+    import pygame
+
+# Constants
+GAME_DIR = "game_{:06d}"
+FRAME_NAME = "frame_{:04d}.png"
+WIN_LABEL_POS = (40, 10)
+GAMES_PER_TASK = 8
+IN_FLIGHT_PER_WORKER = 4
+# zlib level for frames, fast since encoding dominates the frame time
+PNG_COMPRESSION = 1
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_HEADER = struct.Struct(">IIBBBBB")
+PNG_LENGTH = struct.Struct(">I")
+PNG_BIT_DEPTH = 8
+PNG_RGB = 2
+PNG_NO_FILTER = b"\x00"
+
+# The renderer of each worker process, keyed by board shape and size
+_renderers: Dict[Tuple[int, int, int, int], "ReplayRenderer"] = {}
+
+
+class RenderStats(NamedTuple):
+    """
+    Results of a batch render.
+
+    Attributes:
+        games (int): Number of games rendered.
+        frames (int): Number of frames written.
+        elapsed (float): Wall-clock time in seconds.
+        frames_per_second (float): Throughput.
+    """
+
+    games: int
+    frames: int
+    elapsed: float
+    frames_per_second: float
+
+
+class ReplayRenderer:
+    """
+    Draws a game's frames on an offscreen surface.
+
+    The layout, colours and grid come from Connect5Game, so frames match
+    the window. The grid is drawn once, and each checker is a sprite
+    rendered once per colour and blitted onto the previous frame, so a
+    frame costs one blit plus the PNG encoding.
+
+    Attributes:
+        game (Connect5Game): Holds the layout and the offscreen screen.
+        grid (pygame.Surface): The cached grid surface.
+        sprites (Dict[int, pygame.Surface]): The checker of each piece.
+    """
+
+    def __init__(self, rows: int, columns: int, connect: int,
+                 square_size: int = SQUARESIZE) -> None:
+        """
+        Lay out the board and pre-render the grid and checkers.
+
+        Args:
+            rows (int): Number of rows on the game board.
+            columns (int): Number of columns on the game board.
+            connect (int): Number of checkers in a row needed to win.
+            square_size (int): The size of a board square in pixels.
+
+        Returns:
+        None
+        """
+        import pygame
+
+        pygame.font.init()
+        game = Connect5Game(rows, columns, connect)
+        game.set_square_size(square_size)
+        game.screen = pygame.Surface((game.width, game.height))
+        self.game = game
+        self.grid = game.draw_grid()
+        self.sprites = {piece: self._sprite(colour)
+                        for piece, colour in ((1, game.RED),
+                                              (2, game.YELLOW))}
+        self._font = pygame.font.SysFont("monospace", max(
+            WIN_FONT_SIZE * square_size // SQUARESIZE, MIN_FONT_SIZE))
+
+    def _sprite(self, colour: Tuple[int, int, int]) -> "pygame.Surface":
+        """
+        Render one checker on a transparent surface.
+
+        Args:
+            colour (Tuple[int, int, int]): The checker colour.
+
+        Returns:
+            pygame.Surface: The checker, centered in a square surface.
+        """
+        import pygame
+
+        radius = self.game.RADIUS
+        sprite = pygame.Surface((2 * radius + 1, 2 * radius + 1),
+                                pygame.SRCALPHA)
+        pygame.draw.circle(sprite, colour, (radius, radius), radius)
+        return sprite
+
+    def frames(self, moves: Sequence[int]) -> Iterator["pygame.Surface"]:
+        """
+        Draw the frames of a game.
+
+        The same surface is yielded each time with one more checker on
+        it, so save or copy each frame before asking for the next.
+
+        Args:
+            moves (Sequence[int]): Columns played, or TIMER_FORFEIT.
+
+        Returns:
+            Iterator[pygame.Surface]: The frames in order.
+        """
+        game = self.game
+        screen = game.screen
+        screen.fill(game.BG_COLOUR)
+        screen.blit(self.grid, (0, game.SQUARESIZE))
+        yield screen
+        radius = game.RADIUS
+        replayed = Connect5Game(game.ROW_COUNT, game.COLUMN_COUNT,
+                                game.CONNECT_LENGTH)
+        for row, col, piece in movelog.replay(moves, replayed):
+            if col == TIMER_FORFEIT:
+                continue
+            x, y = game.checker_center(row, col)
+            screen.blit(self.sprites[piece], (x - radius, y - radius))
+            if replayed.game_over:
+                colour = game.RED if piece == 1 else game.YELLOW
+                label = self._font.render(f"Player {piece} wins!!", 1,
+                                          colour)
+                screen.blit(label, WIN_LABEL_POS)
+            yield screen
+            if replayed.game_over:
+                return
+
+    def render(self, moves: Sequence[int], directory: str,
+               compression: int = PNG_COMPRESSION) -> int:
+        """
+        Write the frames of a game as numbered PNG files.
+
+        Args:
+            moves (Sequence[int]): Columns played, or TIMER_FORFEIT.
+            directory (str): The directory to write, created if needed.
+            compression (int): The zlib level of the PNG files.
+
+        Returns:
+            int: Number of frames written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        count = 0
+        for frame in self.frames(moves):
+            save_png(frame, os.path.join(directory,
+                                         FRAME_NAME.format(count)),
+                     compression)
+            count += 1
+        return count
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    """
+    Frame a PNG chunk with its length and checksum.
+
+    Args:
+        kind (bytes): The four-letter chunk type.
+        data (bytes): The chunk data.
+
+    Returns:
+        bytes: The complete chunk.
+    """
+    return (PNG_LENGTH.pack(len(data)) + kind + data +
+            PNG_LENGTH.pack(zlib.crc32(kind + data)))
+
+
+def save_png(surface: "pygame.Surface", path: str,
+             compression: int = PNG_COMPRESSION) -> None:
+    """
+    Write a surface as an RGB PNG file.
+
+    pygame.image.save always compresses hard, which takes about three
+    times as long as drawing and writing the frame at zlib level 1.
+
+    Args:
+        surface (pygame.Surface): The frame to write.
+        path (str): The PNG file.
+        compression (int): The zlib level, 0 (none) to 9 (smallest).
+
+    Returns:
+    None
+    """
+    import pygame
+
+    width, height = surface.get_size()
+    pixels = pygame.image.tobytes(surface, "RGB")
+    stride = width * 3
+    # Every scanline starts with its filter type
+    raw = b"".join(PNG_NO_FILTER + pixels[start:start + stride]
+                   for start in range(0, len(pixels), stride))
+    with open(path, "wb") as file:
+        file.write(PNG_SIGNATURE)
+        file.write(_png_chunk(b"IHDR", PNG_HEADER.pack(
+            width, height, PNG_BIT_DEPTH, PNG_RGB, 0, 0, 0)))
+        file.write(_png_chunk(b"IDAT", zlib.compress(raw, compression)))
+        file.write(_png_chunk(b"IEND", b""))
+
+
+def _render_games(args: Tuple[Tuple[int, int, int], int, int, str,
+                              List[Tuple[int, List[int]]]]) -> int:
+    """
+    Render a batch of games in a worker process.
+
+    Args:
+        args (tuple): The board shape, the square size, the zlib level,
+        the output directory and the (index, moves) of each game.
+
+    Returns:
+        int: Number of frames written.
+    """
+    shape, square_size, compression, out_dir, games = args
+    key = shape + (square_size,)
+    if key not in _renderers:
+        # No window is ever opened, so the dummy driver is enough
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        _renderers[key] = ReplayRenderer(*shape, square_size)
+    renderer = _renderers[key]
+    return sum(renderer.render(moves, os.path.join(out_dir,
+                                                   GAME_DIR.format(index)),
+                               compression)
+               for index, moves in games)
+
+
+def render_log(path: str, out_dir: str, workers: Optional[int] = None,
+               square_size: int = SQUARESIZE,
+               limit: Optional[int] = None,
+               compression: int = PNG_COMPRESSION) -> RenderStats:
+    """
+    Render every game of a move log across a process pool.
+
+    The log is streamed and only a few batches per worker are in
+    flight, so logs of any size render in constant memory.
+
+    Args:
+        path (str): The move log.
+        out_dir (str): The directory the game directories go in.
+        workers (Optional[int]): Number of processes, defaults to the
+        number of cores. 1 renders in this process.
+        square_size (int): The size of a board square in pixels.
+        limit (Optional[int]): Render only this many games.
+        compression (int): The zlib level of the PNG files.
+
+    Returns:
+        RenderStats: The number of frames and the throughput.
+    """
+    with open(path, "rb") as file:
+        shape = tuple(movelog.read_header(file))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    games = islice(enumerate(movelog.read_games(path)), limit)
+
+    def batches() -> Iterator[List[Tuple[int, List[int]]]]:
+        batch = []
+        for game in games:
+            batch.append(game)
+            if len(batch) == GAMES_PER_TASK:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    settings = (shape, square_size, compression, out_dir)
+    start = time.perf_counter()
+    frames = 0
+    count = 0
+    if workers == 1:
+        for batch in batches():
+            frames += _render_games(settings + (batch,))
+            count += len(batch)
+    else:
+        pending: Deque[Future] = deque()
+        with ProcessPoolExecutor(workers) as pool:
+            for batch in batches():
+                if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                    frames += pending.popleft().result()
+                pending.append(pool.submit(_render_games,
+                                           settings + (batch,)))
+                count += len(batch)
+            while pending:
+                frames += pending.popleft().result()
+    elapsed = time.perf_counter() - start
+    return RenderStats(count, frames, elapsed,
+                       frames / elapsed if elapsed else 0.0)
+
+
+def main() -> None:
+    """
+    Render a move log from the command line and report frames/second.
+
+    Returns:
+    None
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("log", help="binary move log to render")
+    parser.add_argument("out_dir", help="directory for the frames")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--square-size", type=int, default=SQUARESIZE)
+    parser.add_argument("--limit", type=int, default=None,
+                        help="render only the first LIMIT games")
+    parser.add_argument("--compression", type=int, default=PNG_COMPRESSION,
+                        choices=range(10), metavar="0-9",
+                        help="zlib level of the frames")
+    options = parser.parse_args()
+
+    stats = render_log(options.log, options.out_dir, options.workers,
+                       options.square_size, options.limit,
+                       options.compression)
+    print(f"{stats.games} games, {stats.frames} frames in "
+          f"{stats.elapsed:.2f}s ({stats.frames_per_second:.1f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
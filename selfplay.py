@@ -0,0 +1,261 @@
+"""Headless parallel self-play for Connect 5."""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import ai
+from connect5 import Connect5Game, TIMER_MAX
+
+# Constants
+SEARCH_DEPTH = 4
+SEARCH_TABLE_SIZE = 1 << 14
+GAME_SEED_STRIDE = 1000003
+CHUNKS_PER_WORKER = 4
+DRAW = -1
+
+Policy = Callable[[Connect5Game, random.Random], int]
+
+
+def random_policy(game: Connect5Game, rng: random.Random) -> int:
+    """
+    Pick a random legal column.
+
+    Args:
+        game (Connect5Game): The game to move in.
+        rng (random.Random): The game's random number generator.
+
+    Returns:
+        int: The column to play.
+    """
+    return rng.choice(game.legal_moves())
+
+
+def heuristic_policy(game: Connect5Game, rng: random.Random) -> int:
+    """
+    Win if possible, otherwise block, otherwise play near the center.
+
+    Args:
+        game (Connect5Game): The game to move in.
+        rng (random.Random): The game's random number generator.
+
+    Returns:
+        int: The column to play.
+    """
+    board = game.bitboard
+    piece = game.turn + 1
+    legal = game.legal_moves()
+    for mover in (piece, 3 - piece):
+        for col in legal:
+            row = board.play(col, mover)
+            wins = board.wins_at(row, col, mover)
+            board.undo(col)
+            if wins:
+                return col
+    center = (game.COLUMN_COUNT - 1) / 2
+    # Weight columns by closeness to the center
+    weights = [game.COLUMN_COUNT - abs(col - center) for col in legal]
+    return rng.choices(legal, weights)[0]
+
+
+def search_policy(game: Connect5Game, rng: random.Random) -> int:
+    """
+    Pick a column with a fixed-depth negamax search.
+
+    The depth is fixed rather than timed and every move starts with an
+    empty transposition table, so the move only depends on the position.
+
+    Args:
+        game (Connect5Game): The game to move in.
+        rng (random.Random): The game's random number generator.
+
+    Returns:
+        int: The column to play.
+    """
+    player = ai.NegamaxPlayer(SEARCH_TABLE_SIZE)
+    return player.search(game, TIMER_MAX, SEARCH_DEPTH).column
+
+
+POLICIES: Dict[str, Policy] = {
+    "random": random_policy,
+    "heuristic": heuristic_policy,
+    "search": search_policy,
+}
+
+
+class GameRecord(NamedTuple):
+    """
+    The result of one self-play game.
+
+    Attributes:
+        winner (int): Index into the policy pair of the winner, or DRAW.
+        first (int): Index into the policy pair of the first player.
+        length (int): Number of moves played.
+    """
+
+    winner: int
+    first: int
+    length: int
+
+
+class SelfPlayStats(NamedTuple):
+    """
+    Aggregated self-play results.
+
+    Attributes:
+        policies (Tuple[str, str]): The policy names that played.
+        games (int): Number of games played.
+        wins (Tuple[int, int]): Wins of each policy.
+        draws (int): Number of drawn games.
+        first_player_wins (int): Games won by whoever moved first.
+        mean_length (float): Average number of moves per game.
+        lengths (List[int]): Number of moves of every game, in order.
+        elapsed (float): Wall-clock time in seconds.
+        games_per_second (float): Throughput.
+    """
+
+    policies: Tuple[str, str]
+    games: int
+    wins: Tuple[int, int]
+    draws: int
+    first_player_wins: int
+    mean_length: float
+    lengths: List[int]
+    elapsed: float
+    games_per_second: float
+
+
+def play_game(policies: Tuple[str, str], seed: int,
+              index: int) -> GameRecord:
+    """
+    Play one game between two policies.
+
+    The policies swap sides every game, and the random number generator
+    is seeded from the seed and the game index only, so a game plays
+    out the same whichever worker runs it.
+
+    Args:
+        policies (Tuple[str, str]): Names of the two policies.
+        seed (int): The run seed.
+        index (int): The game number within the run.
+
+    Returns:
+        GameRecord: The result of the game.
+    """
+    rng = random.Random(seed * GAME_SEED_STRIDE + index)
+    first = index % 2
+    seats = (first, 1 - first)
+    moves = (POLICIES[policies[seats[0]]], POLICIES[policies[seats[1]]])
+    game = Connect5Game()
+    length = 0
+    while game.legal_moves():
+        piece = game.turn + 1
+        col = moves[game.turn](game, rng)
+        row = game.get_next_open_row(col)
+        game.drop_piece(row, col, piece)
+        length += 1
+        if game.win_check_at(row, col, piece):
+            return GameRecord(seats[piece - 1], first, length)
+        game.turn = (game.turn + 1) % 2
+    return GameRecord(DRAW, first, length)
+
+
+def _play_chunk(args: Tuple[Tuple[str, str], int, int, int]
+                ) -> List[GameRecord]:
+    """
+    Play a contiguous range of games in a worker process.
+
+    Args:
+        args (tuple): The policies, seed, first index and stop index.
+
+    Returns:
+        List[GameRecord]: The results in game order.
+    """
+    policies, seed, start, stop = args
+    return [play_game(policies, seed, index) for index in range(start, stop)]
+
+
+def run_selfplay(games: int, policies: Tuple[str, str] = ("random",
+                                                          "random"),
+                 seed: int = 0,
+                 workers: Optional[int] = None) -> SelfPlayStats:
+    """
+    Play many games between two policies across a process pool.
+
+    Args:
+        games (int): Number of games to play.
+        policies (Tuple[str, str]): Names of the two policies.
+        seed (int): The run seed, results are the same for any workers.
+        workers (Optional[int]): Number of processes, defaults to the
+        number of cores. 1 plays every game in this process.
+
+    Returns:
+        SelfPlayStats: The aggregated results.
+    """
+    for name in policies:
+        if name not in POLICIES:
+            raise ValueError(f"unknown policy: {name}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    start = time.perf_counter()
+    if workers == 1:
+        records = _play_chunk((policies, seed, 0, games))
+    else:
+        size = max(1, -(-games // (workers * CHUNKS_PER_WORKER)))
+        chunks = [(policies, seed, first, min(first + size, games))
+                  for first in range(0, games, size)]
+        records = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in pool.map(_play_chunk, chunks):
+                records.extend(chunk)
+    elapsed = time.perf_counter() - start
+
+    wins = [0, 0]
+    draws = 0
+    first_player_wins = 0
+    for record in records:
+        if record.winner == DRAW:
+            draws += 1
+            continue
+        wins[record.winner] += 1
+        if record.winner == record.first:
+            first_player_wins += 1
+    lengths = [record.length for record in records]
+    return SelfPlayStats(
+        tuple(policies), games, (wins[0], wins[1]), draws,
+        first_player_wins, sum(lengths) / games if games else 0.0,
+        lengths, elapsed, games / elapsed if elapsed else 0.0)
+
+
+def main() -> None:
+    """
+    Run self-play from the command line and print the statistics.
+
+    Returns:
+    None
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("games", type=int, help="number of games to play")
+    parser.add_argument("--policies", nargs=2, default=["random", "random"],
+                        choices=sorted(POLICIES), metavar="POLICY",
+                        help="the two policies that play each other")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    options = parser.parse_args()
+
+    stats = run_selfplay(options.games, tuple(options.policies),
+                         options.seed, options.workers)
+    for name, wins in zip(stats.policies, stats.wins):
+        print(f"{name}: {wins} wins")
+    print(f"draws: {stats.draws}")
+    print(f"first player wins: {stats.first_player_wins}")
+    print(f"mean length: {stats.mean_length:.2f} moves")
+    print(f"{stats.games_per_second:.1f} games/s "
+          f"({stats.elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
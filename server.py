@@ -0,0 +1,522 @@
+"""Asyncio server hosting many headless Connect 5 games.
+
+Clients send one command per line and get one reply line back:
+
+    NEW [ROWS COLUMNS CONNECT]  ->  OK <game id>
+    DROP <game id> <column>     ->  OK <row> <status>
+    STATE <game id>             ->  OK <turn> <status> <moves>
+    END <game id>               ->  OK
+    QUIT                        ->  OK, then the connection is closed
+
+<status> is PLAYING, WIN <piece> or DRAW, <moves> is a comma separated
+list of columns with -1 for turns lost to the hidden turn timer (or -
+when empty). Errors are answered with ERR <message>. The hidden turn
+timer of every game is a call_later handle on the event loop. Games
+belong to the connection that created them and are ended when it
+closes.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from connect5 import Connect5Game, TIMER_MAX
+
+# Constants
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5555
+MS_PER_SECOND = 1000
+MAX_BOARD_SIZE = 64  # largest side NEW accepts, built on the event loop
+STATUS_PLAYING = "PLAYING"
+STATUS_WIN = "WIN"
+STATUS_DRAW = "DRAW"
+LOADGEN_CLIENTS = 100
+LOADGEN_GAMES = 10
+PERCENTILE_P50 = 0.50
+PERCENTILE_P99 = 0.99
+
+
+class GameSession:
+    """
+    A hosted game and its hidden turn timer.
+
+    Attributes:
+        game (Connect5Game): The headless game.
+        timer (Optional[asyncio.TimerHandle]): The pending turn timeout.
+    """
+
+    __slots__ = ("game", "timer", "_loop")
+
+    def __init__(self, game: Connect5Game,
+                 loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Initialize a GameSession.
+
+        Args:
+            game (Connect5Game): The game to host.
+            loop (asyncio.AbstractEventLoop): The loop running the timer.
+
+        Returns:
+        None
+        """
+        self.game = game
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self._loop = loop
+
+    def restart_timer(self) -> None:
+        """
+        Give the player to move TIMER_MAX milliseconds from now.
+
+        Returns:
+        None
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer = self._loop.call_later(TIMER_MAX / MS_PER_SECOND,
+                                           self._timeout)
+
+    def stop_timer(self) -> None:
+        """
+        Cancel the turn timer.
+
+        Returns:
+        None
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+
+    def _timeout(self) -> None:
+        """
+        Pass the turn on when the turn timer runs out.
+
+        Returns:
+        None
+        """
+        self.game.forfeit_turn()
+        self.restart_timer()
+
+    def status(self) -> str:
+        """
+        Describe whether the game is still being played.
+
+        Returns:
+            str: PLAYING, WIN <piece> or DRAW.
+        """
+        game = self.game
+        if game.game_over:
+            # The winner moved last, so the turn has passed to the loser
+            return f"{STATUS_WIN} {2 - game.turn}"
+        if not game.legal_moves():
+            return STATUS_DRAW
+        return STATUS_PLAYING
+
+
+async def _read_line(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """
+    Read one command line.
+
+    Args:
+        reader (asyncio.StreamReader): The client's input.
+
+    Returns:
+        Optional[bytes]: The line, empty at the end of the input, or
+        None if the line was longer than the reader's limit. The whole
+        long line is skipped so none of it is read as a command.
+    """
+    try:
+        return await reader.readuntil(b"\n")
+    except asyncio.IncompleteReadError as error:
+        return error.partial
+    except asyncio.LimitOverrunError as error:
+        consumed = error.consumed
+    while True:
+        try:
+            await reader.readexactly(consumed)
+            await reader.readuntil(b"\n")
+            return None
+        except asyncio.IncompleteReadError:
+            return b""
+        except asyncio.LimitOverrunError as error:
+            consumed = error.consumed
+
+
+class GameServer:
+    """
+    A line protocol server for many concurrent game sessions.
+
+    Attributes:
+        sessions (Dict[int, GameSession]): The hosted games by id.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize a GameServer with no games.
+
+        Returns:
+        None
+        """
+        self.sessions: Dict[int, GameSession] = {}
+        self._next_id = 1
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """
+        Serve one client connection until it quits or disconnects.
+
+        Args:
+            reader (asyncio.StreamReader): The client's input.
+            writer (asyncio.StreamWriter): The client's output.
+
+        Returns:
+        None
+        """
+        owned: Set[int] = set()
+        try:
+            while True:
+                line = await _read_line(reader)
+                if line is None:
+                    writer.write(b"ERR line too long\n")
+                    await writer.drain()
+                    continue
+                if not line:
+                    break
+                try:
+                    words = line.decode().split()
+                except UnicodeDecodeError:
+                    writer.write(b"ERR bad encoding\n")
+                    await writer.drain()
+                    continue
+                if words and words[0].upper() == "QUIT":
+                    writer.write(b"OK\n")
+                    break
+                writer.write((self.execute(words, owned) + "\n").encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Games nobody can END any more would keep forfeiting turns
+            for game_id in owned:
+                self._end(game_id)
+            writer.close()
+
+    def execute(self, words: List[str],
+                owned: Optional[Set[int]] = None) -> str:
+        """
+        Run one command.
+
+        Args:
+            words (List[str]): The command and its arguments.
+            owned (Optional[Set[int]]): The ids of the games created by
+            the calling connection, updated by NEW and END.
+
+        Returns:
+            str: The reply line without its newline.
+        """
+        if not words:
+            return "ERR empty command"
+        command = words[0].upper()
+        try:
+            args = [int(word) for word in words[1:]]
+        except ValueError:
+            return "ERR arguments must be integers"
+        if command == "NEW":
+            return self._new(args, owned)
+        if command in ("DROP", "STATE", "END"):
+            if not args:
+                return "ERR missing game id"
+            session = self.sessions.get(args[0])
+            if session is None:
+                return "ERR unknown game"
+            if command == "DROP":
+                return self._drop(session, args[1:])
+            if command == "STATE":
+                return self._state(session)
+            self._end(args[0])
+            if owned is not None:
+                owned.discard(args[0])
+            return "OK"
+        return f"ERR unknown command {command}"
+
+    def _end(self, game_id: int) -> None:
+        """
+        Stop a game's timer and forget the game, if it is still hosted.
+
+        Args:
+            game_id (int): The game to end.
+
+        Returns:
+        None
+        """
+        session = self.sessions.pop(game_id, None)
+        if session is not None:
+            session.stop_timer()
+
+    def _new(self, args: List[int], owned: Optional[Set[int]]) -> str:
+        """
+        Create a game.
+
+        Args:
+            args (List[int]): Nothing, or rows, columns and run length.
+            owned (Optional[Set[int]]): The new game's id is added here.
+
+        Returns:
+            str: The reply line.
+        """
+        if args:
+            if len(args) != 3 or not all(1 <= value <= MAX_BOARD_SIZE
+                                         for value in args):
+                return "ERR NEW takes ROWS COLUMNS CONNECT"
+            game = Connect5Game(*args)
+        else:
+            game = Connect5Game()
+        game_id = self._next_id
+        self._next_id += 1
+        self.sessions[game_id] = GameSession(game,
+                                             asyncio.get_running_loop())
+        if owned is not None:
+            owned.add(game_id)
+        return f"OK {game_id}"
+
+    def _drop(self, session: GameSession, args: List[int]) -> str:
+        """
+        Play a column for the player to move.
+
+        Args:
+            session (GameSession): The game to play in.
+            args (List[int]): The column.
+
+        Returns:
+            str: The reply line.
+        """
+        game = session.game
+        if len(args) != 1:
+            return "ERR DROP takes GAME COLUMN"
+        col = args[0]
+        if session.status() != STATUS_PLAYING:
+            return "ERR game is over"
+        if not 0 <= col < game.COLUMN_COUNT:
+            return "ERR column out of range"
+        row = game.make_move(col)
+        if row is None:
+            return "ERR column is full"
+        status = session.status()
+        if status == STATUS_PLAYING:
+            session.restart_timer()
+        else:
+            session.stop_timer()
+        return f"OK {row} {status}"
+
+    def _state(self, session: GameSession) -> str:
+        """
+        Describe a game.
+
+        Args:
+            session (GameSession): The game to describe.
+
+        Returns:
+            str: The reply line.
+        """
+        moves = ",".join(map(str, session.game.moves)) or "-"
+        return f"OK {session.game.turn} {session.status()} {moves}"
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                unix_path: Optional[str] = None) -> None:
+    """
+    Run a GameServer until cancelled.
+
+    Args:
+        host (str): The TCP host to listen on.
+        port (int): The TCP port to listen on.
+        unix_path (Optional[str]): Listen on this Unix socket instead.
+
+    Returns:
+    None
+    """
+    server = GameServer()
+    if unix_path is not None:
+        listener = await asyncio.start_unix_server(server.handle, unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    async with listener:
+        await listener.serve_forever()
+
+
+class LoadReport(NamedTuple):
+    """
+    Results of a load generator run.
+
+    Attributes:
+        games (int): Number of games played.
+        moves (int): Number of DROP commands sent.
+        elapsed (float): Wall-clock time in seconds.
+        moves_per_second (float): Throughput.
+        p50 (float): Median DROP latency in milliseconds.
+        p99 (float): 99th percentile DROP latency in milliseconds.
+    """
+
+    games: int
+    moves: int
+    elapsed: float
+    moves_per_second: float
+    p50: float
+    p99: float
+
+
+async def _load_client(host: str, port: int, unix_path: Optional[str],
+                       games: int, seed: int,
+                       latencies: List[float]) -> int:
+    """
+    Play random games over one connection.
+
+    Args:
+        host (str): The server's TCP host.
+        port (int): The server's TCP port.
+        unix_path (Optional[str]): Connect to this Unix socket instead.
+        games (int): Number of games to play.
+        seed (int): Seed for the random moves.
+        latencies (List[float]): DROP latencies are appended here.
+
+    Returns:
+        int: Number of games finished.
+    """
+    rng = random.Random(seed)
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    finished = 0
+    for _ in range(games):
+        writer.write(b"NEW\n")
+        reply = (await reader.readline()).split()
+        game_id = int(reply[1])
+        game = Connect5Game()
+        while True:
+            col = rng.choice(game.legal_moves())
+            start = time.perf_counter()
+            writer.write(f"DROP {game_id} {col}\n".encode())
+            reply = (await reader.readline()).split()
+            latencies.append(time.perf_counter() - start)
+            if reply[0] != b"OK":
+                raise RuntimeError(b" ".join(reply).decode())
+            game.make_move(col)
+            if reply[2] != STATUS_PLAYING.encode():
+                break
+        writer.write(f"END {game_id}\n".encode())
+        await reader.readline()
+        finished += 1
+    writer.write(b"QUIT\n")
+    await reader.readline()
+    writer.close()
+    return finished
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """
+    Pick a percentile from sorted values.
+
+    Args:
+        ordered (List[float]): The values in ascending order.
+        fraction (float): The percentile as a fraction.
+
+    Returns:
+        float: The value, or 0.0 when there are none.
+    """
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run_load(clients: int = LOADGEN_CLIENTS,
+                   games: int = LOADGEN_GAMES, host: str = DEFAULT_HOST,
+                   port: int = DEFAULT_PORT,
+                   unix_path: Optional[str] = None,
+                   embedded: bool = False, seed: int = 0) -> LoadReport:
+    """
+    Play random games from many concurrent clients and time the moves.
+
+    Args:
+        clients (int): Number of concurrent connections.
+        games (int): Games played by each connection in turn.
+        host (str): The server's TCP host.
+        port (int): The server's TCP port.
+        unix_path (Optional[str]): Connect to this Unix socket instead.
+        embedded (bool): Start a server in this event loop first.
+        seed (int): Seed for the random moves.
+
+    Returns:
+        LoadReport: Throughput and latency.
+    """
+    listener = None
+    if embedded:
+        server = GameServer()
+        if unix_path is not None:
+            listener = await asyncio.start_unix_server(server.handle,
+                                                       unix_path)
+        else:
+            listener = await asyncio.start_server(server.handle, host, 0)
+            port = listener.sockets[0].getsockname()[1]
+
+    latencies: List[float] = []
+    start = time.perf_counter()
+    finished = await asyncio.gather(*(
+        _load_client(host, port, unix_path, games, seed + client,
+                     latencies)
+        for client in range(clients)))
+    elapsed = time.perf_counter() - start
+    if listener is not None:
+        listener.close()
+        await listener.wait_closed()
+
+    latencies.sort()
+    return LoadReport(sum(finished), len(latencies), elapsed,
+                      len(latencies) / elapsed if elapsed else 0.0,
+                      _percentile(latencies, PERCENTILE_P50) * MS_PER_SECOND,
+                      _percentile(latencies, PERCENTILE_P99) * MS_PER_SECOND)
+
+
+def main() -> None:
+    """
+    Run the server or the load generator from the command line.
+
+    Returns:
+    None
+    """
+    parser = argparse.ArgumentParser(
+        description="Connect 5 game server and load generator.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "loadgen"):
+        command = commands.add_parser(name)
+        command.add_argument("--host", default=DEFAULT_HOST)
+        command.add_argument("--port", type=int, default=DEFAULT_PORT)
+        command.add_argument("--unix", metavar="PATH",
+                             help="use a Unix socket instead of TCP")
+    loadgen = commands.choices["loadgen"]
+    loadgen.add_argument("--clients", type=int, default=LOADGEN_CLIENTS)
+    loadgen.add_argument("--games", type=int, default=LOADGEN_GAMES,
+                         help="games per client")
+    loadgen.add_argument("--embedded", action="store_true",
+                         help="run the server in the same process")
+    loadgen.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args()
+
+    if options.command == "serve":
+        try:
+            asyncio.run(serve(options.host, options.port, options.unix))
+        except KeyboardInterrupt:
+            pass
+        return
+    report = asyncio.run(run_load(options.clients, options.games,
+                                  options.host, options.port, options.unix,
+                                  options.embedded, options.seed))
+    print(f"{report.games} games, {report.moves} moves in "
+          f"{report.elapsed:.2f}s")
+    print(f"{report.moves_per_second:.0f} moves/s, "
+          f"p50 {report.p50:.2f} ms, p99 {report.p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""Live spectator feed for Connect 5 games using move deltas.
+
+Spectators are sent a small binary message per move instead of the
+whole board. Every KEYFRAME_INTERVAL moves the feed also takes a
+keyframe of the full position, so a spectator joining late gets one
+keyframe plus the few deltas after it rather than the game so far.
+
+Messages start with their kind and a sequence number, the number of
+moves (timer forfeits included) played when the message was made:
+
+    MOVE      kind, seq, column, row, piece
+    TIMER     kind, seq, -1, 0, piece that lost its turn
+    KEYFRAME  kind, seq, rows, columns, connect, turn, winner (0 for
+              none), then each player's stones as a little-endian
+              bitboard
+"""
+
+import argparse
+import random
+import struct
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+from bitboard import BitBoard, PLAYER_ONE_PIECE, PLAYER_TWO_PIECE
+from connect5 import Connect5Game, TIMER_FORFEIT
+
+# Constants
+MESSAGE_MOVE = 1
+MESSAGE_TIMER = 2
+MESSAGE_KEYFRAME = 3
+DELTA = struct.Struct("<BIhHB")
+KEYFRAME = struct.Struct("<BIHHHBB")
+KEYFRAME_INTERVAL = 16
+NO_WINNER = 0
+BITS_PER_BYTE = 8
+BENCH_SUBSCRIBERS = 2000
+BENCH_GAMES = 20
+FORFEIT_CHANCE = 0.05  # chance a benchmark turn is lost to the timer
+
+Subscriber = Callable[[bytes], None]
+
+
+def encode_keyframe(board: BitBoard, seq: int, turn: int,
+                    winner: Optional[int]) -> bytes:
+    """
+    Encode a full position.
+
+    Args:
+        board (BitBoard): The stones on the board.
+        seq (int): The number of moves played.
+        turn (int): Current player's turn (0 for player 1, 1 for player 2).
+        winner (Optional[int]): The piece that won, or None.
+
+    Returns:
+        bytes: The keyframe message.
+    """
+    size = -(-board.stride * board.columns // BITS_PER_BYTE)
+    return (KEYFRAME.pack(MESSAGE_KEYFRAME, seq, board.rows, board.columns,
+                          board.connect, turn, winner or NO_WINNER) +
+            board.stones[PLAYER_ONE_PIECE].to_bytes(size, "little") +
+            board.stones[PLAYER_TWO_PIECE].to_bytes(size, "little"))
+
+
+class SpectatorFeed:
+    """
+    Publishes the moves of a game to subscribers as deltas.
+
+    Each message is encoded once and the same bytes are handed to every
+    subscriber. The feed reads the game's move list, so it works for a
+    game played by anything that records its moves.
+
+    Attributes:
+        game (Connect5Game): The game being watched.
+        keyframe_interval (int): Deltas between keyframes.
+        subscribers (List[Subscriber]): Called with each new message.
+        keyframe (bytes): The latest keyframe.
+        backlog (List[bytes]): The deltas since the latest keyframe.
+        seq (int): The number of moves published.
+        bytes_sent (int): Message bytes delivered to subscribers.
+    """
+
+    def __init__(self, game: Connect5Game,
+                 keyframe_interval: int = KEYFRAME_INTERVAL) -> None:
+        """
+        Initialize a SpectatorFeed for a game, which may have started.
+
+        Args:
+            game (Connect5Game): The game to watch.
+            keyframe_interval (int): Deltas between keyframes.
+
+        Returns:
+        None
+        """
+        self.game = game
+        self.keyframe_interval = keyframe_interval
+        self.subscribers: List[Subscriber] = []
+        self.backlog: List[bytes] = []
+        self.seq = 0
+        self.bytes_sent = 0
+        self._heights = [0] * game.COLUMN_COUNT
+        self.update()
+        self.keyframe = self._take_keyframe()
+
+    def _take_keyframe(self) -> bytes:
+        """
+        Encode the game as it is now and drop the backlog.
+
+        Returns:
+            bytes: The keyframe message.
+        """
+        game = self.game
+        winner = 2 - game.turn if game.game_over else None
+        self.backlog = []
+        return encode_keyframe(game.bitboard, self.seq, game.turn, winner)
+
+    def subscribe(self, callback: Subscriber) -> None:
+        """
+        Add a subscriber and catch it up on the game so far.
+
+        Args:
+            callback (Subscriber): Called with each message.
+
+        Returns:
+        None
+        """
+        callback(self.keyframe)
+        for message in self.backlog:
+            callback(message)
+        self.bytes_sent += len(self.keyframe) + sum(map(len, self.backlog))
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        """
+        Stop sending messages to a subscriber.
+
+        Args:
+            callback (Subscriber): A subscribed callback.
+
+        Returns:
+        None
+        """
+        self.subscribers.remove(callback)
+
+    def update(self) -> int:
+        """
+        Publish the moves played since the last update.
+
+        Call this after make_move or forfeit_turn. A keyframe is taken
+        once the backlog reaches keyframe_interval deltas.
+
+        Returns:
+            int: Number of deltas published.
+        """
+        moves = self.game.moves
+        published = self.seq
+        for col in moves[published:]:
+            # Every move and timer forfeit passes the turn, so the
+            # player follows from the number of moves before it
+            piece = self.seq % 2 + 1
+            self.seq += 1
+            if col == TIMER_FORFEIT:
+                message = DELTA.pack(MESSAGE_TIMER, self.seq, TIMER_FORFEIT,
+                                     0, piece)
+            else:
+                row = self._heights[col]
+                self._heights[col] += 1
+                message = DELTA.pack(MESSAGE_MOVE, self.seq, col, row, piece)
+            for callback in self.subscribers:
+                callback(message)
+            self.bytes_sent += len(message) * len(self.subscribers)
+            self.backlog.append(message)
+        if len(self.backlog) >= self.keyframe_interval:
+            self.keyframe = self._take_keyframe()
+        return self.seq - published
+
+
+class SpectatorView:
+    """
+    A spectator's copy of a game rebuilt from feed messages.
+
+    Attributes:
+        board (Optional[BitBoard]): The stones, None until a keyframe.
+        turn (int): Current player's turn (0 for player 1, 1 for player 2).
+        winner (Optional[int]): The piece that won, or None.
+        seq (int): The number of moves applied.
+    """
+
+    __slots__ = ("board", "turn", "winner", "seq")
+
+    def __init__(self) -> None:
+        """
+        Initialize a SpectatorView waiting for its first keyframe.
+
+        Returns:
+        None
+        """
+        self.board: Optional[BitBoard] = None
+        self.turn = 0
+        self.winner: Optional[int] = None
+        self.seq = 0
+
+    def receive(self, message: bytes) -> None:
+        """
+        Apply a feed message.
+
+        Messages the view has already seen are ignored.
+
+        Args:
+            message (bytes): A message from SpectatorFeed.
+
+        Returns:
+        None
+        """
+        if message[0] == MESSAGE_KEYFRAME:
+            self._load_keyframe(message)
+            return
+        kind, seq, col, row, piece = DELTA.unpack(message)
+        if self.board is None:
+            raise ValueError("delta received before a keyframe")
+        if seq <= self.seq:
+            return
+        if seq != self.seq + 1:
+            raise ValueError(f"missed moves {self.seq + 1} to {seq - 1}")
+        self.seq = seq
+        self.turn = piece % 2
+        if kind == MESSAGE_MOVE:
+            self.board.drop(row, col, piece)
+            if self.board.wins_at(row, col, piece):
+                self.winner = piece
+
+    def _load_keyframe(self, message: bytes) -> None:
+        """
+        Replace the position with a keyframe's.
+
+        Args:
+            message (bytes): A keyframe message.
+
+        Returns:
+        None
+        """
+        (_, seq, rows, columns, connect, turn,
+         winner) = KEYFRAME.unpack_from(message)
+        if self.board is not None and seq < self.seq:
+            return
+        board = BitBoard(rows, columns, connect)
+        size = (len(message) - KEYFRAME.size) // 2
+        for piece in (PLAYER_ONE_PIECE, PLAYER_TWO_PIECE):
+            start = KEYFRAME.size + (piece - 1) * size
+            stones = int.from_bytes(message[start:start + size], "little")
+            while stones:
+                lowest = stones & -stones
+                index = lowest.bit_length() - 1
+                board.drop(index % board.stride, index // board.stride,
+                           piece)
+                stones ^= lowest
+        self.board = board
+        self.seq = seq
+        self.turn = turn
+        self.winner = winner or None
+
+
+class FanoutReport(NamedTuple):
+    """
+    Results of a fan-out benchmark.
+
+    Attributes:
+        subscribers (int): Number of spectators per game.
+        moves (int): Number of moves published.
+        deliveries (int): Messages handed to spectators.
+        elapsed (float): Wall-clock time in seconds.
+        deliveries_per_second (float): Throughput.
+        delta_bytes (int): Size of a delta message.
+        keyframe_bytes (int): Size of a keyframe message.
+        board_text_bytes (int): Size of the board as print_board shows it.
+        catch_up_messages (float): Mean messages a late joiner received.
+    """
+
+    subscribers: int
+    moves: int
+    deliveries: int
+    elapsed: float
+    deliveries_per_second: float
+    delta_bytes: int
+    keyframe_bytes: int
+    board_text_bytes: int
+    catch_up_messages: float
+
+
+def bench_fanout(subscribers: int = BENCH_SUBSCRIBERS,
+                 games: int = BENCH_GAMES, seed: int = 0,
+                 keyframe_interval: int = KEYFRAME_INTERVAL
+                 ) -> FanoutReport:
+    """
+    Play random games watched by many local spectators.
+
+    Half of the spectators watch from the start and half join at a
+    random point of the game. Every view is checked against the game
+    when it ends.
+
+    Args:
+        subscribers (int): Number of spectators per game.
+        games (int): Number of games to play in turn.
+        seed (int): Seed for the moves and join points.
+        keyframe_interval (int): Deltas between keyframes.
+
+    Returns:
+        FanoutReport: Throughput and message sizes.
+    """
+    # Imported here so the feed does not need numpy
+    import numpy as np
+
+    rng = random.Random(seed)
+    moves = 0
+    deliveries = 0
+    catch_up = 0
+    late = 0
+    board_text = 0
+    elapsed = 0.0
+    for _ in range(games):
+        game = Connect5Game()
+        feed = SpectatorFeed(game, keyframe_interval)
+        views = [SpectatorView() for _ in range(subscribers)]
+        joins = sorted(rng.randrange(game.ROW_COUNT * game.COLUMN_COUNT)
+                       for _ in range(subscribers // 2))
+        start = time.perf_counter()
+        for view in views[len(joins):]:
+            feed.subscribe(view.receive)
+        waiting = views[:len(joins)]
+        while not game.game_over and game.legal_moves():
+            while joins and joins[0] <= len(game.moves):
+                joins.pop(0)
+                feed.subscribe(waiting.pop().receive)
+                catch_up += 1 + len(feed.backlog)
+                deliveries += 1 + len(feed.backlog)
+                late += 1
+            if rng.random() < FORFEIT_CHANCE:
+                game.forfeit_turn()
+            else:
+                game.make_move(rng.choice(game.legal_moves()))
+            deliveries += feed.update() * len(feed.subscribers)
+            moves += 1
+        elapsed += time.perf_counter() - start
+        board_text = len(str(np.flip(game.board, 0)).encode())
+        expected = game.bitboard.to_list()
+        for view in views:
+            if view.board is not None and view.board.to_list() != expected:
+                raise RuntimeError("spectator view out of sync")
+    return FanoutReport(subscribers, moves, deliveries, elapsed,
+                        deliveries / elapsed if elapsed else 0.0,
+                        DELTA.size, len(feed.keyframe), board_text,
+                        catch_up / late if late else 0.0)
+
+
+def main() -> None:
+    """
+    Run the fan-out benchmark from the command line.
+
+    Returns:
+    None
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=BENCH_SUBSCRIBERS)
+    parser.add_argument("--games", type=int, default=BENCH_GAMES)
+    parser.add_argument("--keyframe-interval", type=int,
+                        default=KEYFRAME_INTERVAL)
+    parser.add_argument("--seed", type=int, default=0)
+    options = parser.parse_args()
+
+    report = bench_fanout(options.subscribers, options.games, options.seed,
+                          options.keyframe_interval)
+    print(f"{report.subscribers} spectators, {report.moves} moves, "
+          f"{report.deliveries} messages in {report.elapsed:.2f}s "
+          f"({report.deliveries_per_second:.0f} messages/s)")
+    print(f"delta {report.delta_bytes} bytes, keyframe "
+          f"{report.keyframe_bytes} bytes, printed board "
+          f"{report.board_text_bytes} bytes")
+    print(f"late joiners caught up with {report.catch_up_messages:.1f} "
+          f"messages on average")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Lean Connect 5 game state with make/unmake moves for search."""
+
+import copy
+import sys
+import tracemalloc
+from typing import Callable, List, Optional, Tuple
+
+from bitboard import BitBoard, CONNECT_LENGTH
+from connect5 import Connect5Game, COLUMN_COUNT, ROW_COUNT, TIMER_FORFEIT
+
+# Constants
+MEASURE_STATES = 10000
+MEASURE_MOVES = (3, 4, 3, 4, 2, 5, 1, 6)
+
+
+class GameState:
+    """
+    The rules-only state of a game, without any rendering attributes.
+
+    play() and undo() change the state in place using the move stack,
+    so a search can walk millions of positions on one GameState without
+    allocating boards. The board masks and Zobrist keys are shared
+    between every state of the same size.
+
+    Attributes:
+        bitboard (BitBoard): The stones on the board, named as on
+        Connect5Game so the searches accept either.
+        turn (int): Current player's turn (0 for player 1, 1 for player 2).
+        moves (List[int]): The move stack, columns played or TIMER_FORFEIT.
+        winner (Optional[int]): The piece that won, or None.
+    """
+
+    __slots__ = ("bitboard", "turn", "moves", "winner")
+
+    def __init__(self, rows: int = ROW_COUNT, columns: int = COLUMN_COUNT,
+                 connect: int = CONNECT_LENGTH) -> None:
+        """
+        Initialize a GameState at the start of a game.
+
+        Args:
+            rows (int): Number of rows on the game board.
+            columns (int): Number of columns on the game board.
+            connect (int): Number of checkers in a row needed to win.
+
+        Returns:
+        None
+        """
+        self.bitboard = BitBoard(rows, columns, connect)
+        self.turn = 0
+        self.moves: List[int] = []
+        self.winner: Optional[int] = None
+
+    @classmethod
+    def from_game(cls, game: Connect5Game) -> "GameState":
+        """
+        Copy the position of a game.
+
+        Args:
+            game (Connect5Game): The game to copy, which is not changed.
+
+        Returns:
+            GameState: A state holding the same position and moves.
+        """
+        state = cls.__new__(cls)
+        state.bitboard = game.bitboard.copy()
+        state.turn = game.turn
+        state.moves = list(game.moves)
+        # Only the last move can have won the game
+        state.winner = 2 - game.turn if game.game_over else None
+        return state
+
+    def copy(self) -> "GameState":
+        """
+        Create an independent copy of the state.
+
+        Returns:
+            GameState: A new state with the same position and moves.
+        """
+        state = GameState.__new__(GameState)
+        state.bitboard = self.bitboard.copy()
+        state.turn = self.turn
+        state.moves = list(self.moves)
+        state.winner = self.winner
+        return state
+
+    def legal_moves(self) -> Tuple[int, ...]:
+        """
+        Get the columns that can be played.
+
+        Returns:
+            Tuple[int, ...]: The playable columns in ascending order, or
+            nothing once the game is won.
+        """
+        if self.winner is not None:
+            return ()
+        return self.bitboard.legal_columns
+
+    def is_over(self) -> bool:
+        """
+        Check if the game has been won or the board is full.
+
+        Returns:
+            bool: True if no more moves can be played.
+        """
+        return self.winner is not None or not self.bitboard.legal_mask
+
+    def play(self, col: int) -> int:
+        """
+        Drop the current player's checker into a column.
+
+        Args:
+            col (int): The column to play.
+
+        Returns:
+            int: The row the checker landed in.
+        """
+        board = self.bitboard
+        if self.winner is not None:
+            raise ValueError("game is over")
+        if not 0 <= col < board.columns or not board.is_legal(col):
+            raise ValueError(f"column {col} cannot be played")
+        piece = self.turn + 1
+        row = board.play(col, piece)
+        self.moves.append(col)
+        self.turn ^= 1
+        if board.wins_at(row, col, piece):
+            self.winner = piece
+        return row
+
+    def pass_turn(self) -> None:
+        """
+        Pass the turn on, as when the hidden turn timer runs out.
+
+        Returns:
+        None
+        """
+        if self.winner is not None:
+            raise ValueError("game is over")
+        self.moves.append(TIMER_FORFEIT)
+        self.turn ^= 1
+
+    def undo(self) -> int:
+        """
+        Take back the last move or pass.
+
+        Returns:
+            int: The column taken back, or TIMER_FORFEIT for a pass.
+        """
+        col = self.moves.pop()
+        if col != TIMER_FORFEIT:
+            self.bitboard.undo(col)
+        self.turn ^= 1
+        self.winner = None
+        return col
+
+    def position_hash(self) -> int:
+        """
+        Get the 64-bit Zobrist hash of the position and side to move.
+
+        Returns:
+            int: The hash, equal to Connect5Game.position_hash() for the
+            same position.
+        """
+        if self.turn:
+            return self.bitboard.hash ^ self.bitboard.side_key
+        return self.bitboard.hash
+
+    def canonical_hash(self) -> int:
+        """
+        Get one hash for the position and its mirror image.
+
+        Returns:
+            int: The smaller of the position hash and the hash of the
+            position mirrored left to right, with the side to move.
+        """
+        return self.bitboard.canonical_hash(self.turn + 1)[0]
+
+
+def _bytes_per_copy(clone: Callable[[], object], count: int) -> float:
+    """
+    Measure the memory allocated by a copy function.
+
+    Args:
+        clone (Callable[[], object]): Makes one copy.
+        count (int): Number of copies to allocate.
+
+    Returns:
+        float: Bytes allocated per copy.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copies = [clone() for _ in range(count)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del copies
+    return used / count
+
+
+def measure_memory(count: int = MEASURE_STATES) -> Tuple[float, float]:
+    """
+    Measure the memory used per copy of a mid-game position.
+
+    Args:
+        count (int): Number of copies to allocate.
+
+    Returns:
+        Tuple[float, float]: Bytes per GameState copy, and per deep
+        copy of the same Connect5Game for comparison.
+    """
+    game = Connect5Game()
+    for col in MEASURE_MOVES:
+        game.make_move(col)
+    state = GameState.from_game(game)
+    return (_bytes_per_copy(state.copy, count),
+            _bytes_per_copy(lambda: copy.deepcopy(game), count))
+
+
+if __name__ == "__main__":
+    # Report the memory per state next to a deep-copied Connect5Game
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else MEASURE_STATES
+    state_bytes, game_bytes = measure_memory(count)
+    print(f"GameState copy:        {state_bytes:8.0f} bytes")
+    print(f"Connect5Game deepcopy: {game_bytes:8.0f} bytes")
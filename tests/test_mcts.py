@@ -0,0 +1,53 @@
+"""Check the Monte Carlo tree search player."""
+
+import random
+
+from connect5 import Connect5Game
+import mcts
+
+# Constants
+SEARCH_TIME = 150
+GAMES = 2
+SHORT_SEARCH_TIME = 50
+SHORT_SEARCHES = 10
+TIME_TOLERANCE = 0.01  # seconds a search may run over its budget
+
+
+def _check_tree(node):
+    """Every child in the tree must have been visited."""
+    for child in node.children.values():
+        assert child.visits > 0
+        assert child.parent is node
+        _check_tree(child)
+
+
+def test_reused_multi_worker_searches():
+    # Batches still running at the deadline are cancelled, which must
+    # not leave unvisited children for the next search to divide by
+    rng = random.Random(1)
+    with mcts.MCTSPlayer(workers=4, seed=1) as player:
+        for _ in range(GAMES):
+            game = Connect5Game()
+            while game.legal_moves() and not game.game_over:
+                result = player.search(game, SEARCH_TIME)
+                assert result.column in game.legal_moves()
+                _check_tree(player.root)
+                game.make_move(result.column)
+                if game.legal_moves() and not game.game_over:
+                    game.make_move(rng.choice(game.legal_moves()))
+
+
+def test_single_worker_search_keeps_to_budget():
+    # The deadline is checked between leaves, not only between batches
+    rng = random.Random(2)
+    game = Connect5Game()
+    with mcts.MCTSPlayer(workers=1, seed=2) as player:
+        for _ in range(SHORT_SEARCHES):
+            result = player.search(game, SHORT_SEARCH_TIME)
+            assert result.elapsed <= (SHORT_SEARCH_TIME / mcts.MS_PER_SECOND
+                                      + TIME_TOLERANCE)
+            _check_tree(player.root)
+            game.make_move(result.column)
+            if game.game_over:
+                break
+            game.make_move(rng.choice(game.legal_moves()))
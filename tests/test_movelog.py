@@ -0,0 +1,38 @@
+"""Check that move logs round-trip and reject bad moves."""
+
+import pytest
+
+from connect5 import TIMER_FORFEIT
+import movelog
+
+# Constants
+HEADER = movelog.LogHeader(7, 8, 5)
+
+
+def _record_moves(record):
+    """Split a packed record back into its moves."""
+    count = record[0]
+    return movelog.unpack_moves(record[1:], count, HEADER)
+
+
+def test_moves_round_trip():
+    moves = [3, TIMER_FORFEIT, 7, 0, TIMER_FORFEIT]
+    assert _record_moves(movelog.pack_moves(moves, HEADER)) == moves
+
+
+@pytest.mark.parametrize("move", [8, 9, -2])
+def test_out_of_range_moves_are_rejected(move):
+    with pytest.raises(ValueError):
+        movelog.pack_moves([3, move], HEADER)
+
+
+def test_replay_rejects_a_full_column(tmp_path):
+    path = str(tmp_path / "games.c5log")
+    full = [0] * HEADER.rows
+    with movelog.MoveLogWriter(path, *HEADER) as writer:
+        writer.write_game([3, 4])
+        writer.write_game(full + [0])
+    games = movelog.replay_log(path)
+    assert next(games).moves == [3, 4]
+    with pytest.raises(ValueError, match=f"record 1 move {len(full)}:"):
+        next(games)
@@ -0,0 +1,129 @@
+"""Check the bitboard rules engine against a brute-force board scan."""
+
+import random
+
+import pytest
+
+from bitboard import (SENTINEL_ROWS, ZOBRIST_BITS, ZOBRIST_SEED,
+                      zobrist_keys)
+from connect5 import Connect5Game
+
+# Constants
+SHAPES = [(7, 8, 5), (6, 7, 4), (5, 5, 3), (4, 4, 2), (9, 4, 5),
+          (8, 10, 6), (3, 9, 5)]
+GAMES_PER_SHAPE = 60
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def brute_force_win(board, piece, connect):
+    """Scan every cell and direction of a list board for a full line."""
+    rows, columns = len(board), len(board[0])
+    for row in range(rows):
+        for col in range(columns):
+            for d_row, d_col in DIRECTIONS:
+                end_row = row + d_row * (connect - 1)
+                end_col = col + d_col * (connect - 1)
+                if not (0 <= end_row < rows and 0 <= end_col < columns):
+                    continue
+                if all(board[row + d_row * i][col + d_col * i] == piece
+                       for i in range(connect)):
+                    return True
+    return False
+
+
+def brute_force_wins_at(board, row, col, piece, connect):
+    """Count the run through one cell in every direction."""
+    rows, columns = len(board), len(board[0])
+    for d_row, d_col in DIRECTIONS:
+        run = 1
+        for sign in (1, -1):
+            r, c = row + sign * d_row, col + sign * d_col
+            while (0 <= r < rows and 0 <= c < columns and
+                   board[r][c] == piece):
+                run += 1
+                r, c = r + sign * d_row, c + sign * d_col
+        if run >= connect:
+            return True
+    return False
+
+
+@pytest.mark.parametrize("rows, columns, connect", SHAPES)
+def test_played_games_match_brute_force(rows, columns, connect):
+    rng = random.Random(rows * 100 + columns * 10 + connect)
+    for _ in range(GAMES_PER_SHAPE):
+        game = Connect5Game(rows, columns, connect)
+        while game.legal_moves():
+            col = rng.choice(game.legal_moves())
+            piece = game.turn + 1
+            row = game.make_move(col)
+            board = game.board
+            assert game.heights == [
+                sum(1 for r in range(rows) if board[r][c])
+                for c in range(columns)]
+            assert game.legal_moves() == tuple(
+                c for c in range(columns) if game.heights[c] < rows)
+            assert game.bitboard.to_list() == board
+            assert game.win_check_at(row, col, piece) == \
+                brute_force_wins_at(board, row, col, piece, connect)
+            for side in (1, 2):
+                assert game.win_check(side) == \
+                    brute_force_win(board, side, connect)
+            if game.game_over:
+                break
+
+
+@pytest.mark.parametrize("rows, columns, connect", SHAPES)
+def test_random_boards_match_brute_force(rows, columns, connect):
+    # Stones placed anywhere, not only on top of a column
+    rng = random.Random(connect * 1000 + rows * columns)
+    for _ in range(GAMES_PER_SHAPE):
+        game = Connect5Game(rows, columns, connect)
+        for row in range(rows):
+            for col in range(columns):
+                piece = rng.choice((0, 1, 1, 2, 2))
+                if piece:
+                    game.drop_piece(row, col, piece)
+        for side in (1, 2):
+            assert game.win_check(side) == \
+                brute_force_win(game.board, side, connect)
+        for row in range(rows):
+            for col in range(columns):
+                piece = game.board[row][col]
+                if piece:
+                    assert game.win_check_at(row, col, piece) == \
+                        brute_force_wins_at(game.board, row, col, piece,
+                                            connect)
+
+
+def test_undo_restores_the_position():
+    rng = random.Random(7)
+    game = Connect5Game()
+    board = game.bitboard
+    start = (list(board.stones), list(board.heights), board.legal_mask,
+             board.hash, board.mirror_hash)
+    played = []
+    piece = 1
+    while board.legal_mask and len(played) < 30:
+        col = rng.choice(board.legal_columns)
+        board.play(col, piece)
+        played.append(col)
+        piece = 3 - piece
+    while played:
+        board.undo(played.pop())
+    assert (list(board.stones), list(board.heights), board.legal_mask,
+            board.hash, board.mirror_hash) == start
+
+
+def test_zobrist_keys_read_random_bytes_as_little_endian():
+    # Keys must not depend on the host byte order
+    rows, columns = 7, 8
+    cells = (rows + SENTINEL_ROWS) * columns
+    rng = random.Random(ZOBRIST_SEED)
+    keys, _, side_key = zobrist_keys(rows, columns)
+    size = ZOBRIST_BITS // 8
+    for piece in (1, 2):
+        data = rng.randbytes(cells * size)
+        assert keys[piece] == [
+            int.from_bytes(data[index:index + size], "little")
+            for index in range(0, len(data), size)]
+    assert side_key == rng.getrandbits(ZOBRIST_BITS)
@@ -0,0 +1,61 @@
+"""Check the game server's handling of connections."""
+
+import asyncio
+
+import server
+
+
+async def _connect(game_server):
+    """Start a server on a free port and open a connection to it."""
+    listener = await asyncio.start_server(game_server.handle,
+                                          server.DEFAULT_HOST, 0)
+    port = listener.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection(server.DEFAULT_HOST,
+                                                   port)
+    return listener, reader, writer
+
+
+def test_games_end_when_their_connection_closes():
+    async def run():
+        game_server = server.GameServer()
+        listener, reader, writer = await _connect(game_server)
+        for command in (b"NEW\n", b"NEW\n", b"DROP 1 3\n"):
+            writer.write(command)
+            assert (await reader.readline()).startswith(b"OK")
+        assert len(game_server.sessions) == 2
+        writer.close()
+        for _ in range(100):
+            if not game_server.sessions:
+                break
+            await asyncio.sleep(0.01)
+        listener.close()
+        await listener.wait_closed()
+        return game_server.sessions
+
+    assert asyncio.run(run()) == {}
+
+
+def test_bad_lines_get_error_replies():
+    async def run():
+        game_server = server.GameServer()
+        listener, reader, writer = await _connect(game_server)
+        replies = []
+        for command in (b"\xff\xfe\n", b"NEW " + b"9" * 200000 + b"\n",
+                        b"NEW\n"):
+            writer.write(command)
+            replies.append(await reader.readline())
+        writer.write(b"QUIT\n")
+        await reader.readline()
+        writer.close()
+        listener.close()
+        await listener.wait_closed()
+        return replies
+
+    assert asyncio.run(run()) == [b"ERR bad encoding\n",
+                                  b"ERR line too long\n", b"OK 1\n"]
+
+
+def test_oversized_boards_are_refused():
+    size = str(server.MAX_BOARD_SIZE + 1)
+    reply = server.GameServer().execute(["NEW", size, size, "5"])
+    assert reply.startswith("ERR")
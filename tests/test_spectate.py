@@ -0,0 +1,83 @@
+"""Check that spectator views rebuilt from the feed match the game."""
+
+import random
+
+import pytest
+
+from connect5 import Connect5Game
+from spectate import SpectatorFeed, SpectatorView
+
+# Constants
+KEYFRAME_INTERVALS = [1, 3, 16]
+GAMES_PER_INTERVAL = 15
+OPENING_MOVES = 12
+FORFEIT_CHANCE = 0.1
+
+
+def random_turn(game, rng):
+    """Play a random column, or lose the turn to the timer now and then."""
+    if rng.random() < FORFEIT_CHANCE:
+        game.forfeit_turn()
+    else:
+        game.make_move(rng.choice(game.legal_moves()))
+
+
+def check_view(view, game):
+    """The view must hold the game's stones, turn, moves and winner."""
+    assert view.board.to_list() == game.bitboard.to_list()
+    assert view.turn == game.turn
+    assert view.seq == len(game.moves)
+    assert view.winner == (2 - game.turn if game.game_over else None)
+
+
+@pytest.mark.parametrize("interval", KEYFRAME_INTERVALS)
+def test_views_follow_the_game(interval):
+    rng = random.Random(interval)
+    for _ in range(GAMES_PER_INTERVAL):
+        game = Connect5Game()
+        # The feed may start on a game that is already under way
+        for _ in range(rng.randrange(OPENING_MOVES)):
+            if game.game_over or not game.legal_moves():
+                break
+            random_turn(game, rng)
+        feed = SpectatorFeed(game, interval)
+        views = []
+        while True:
+            # A new spectator joins every move, starting from the latest
+            # keyframe and the deltas after it
+            assert 1 + len(feed.backlog) <= interval
+            view = SpectatorView()
+            feed.subscribe(view.receive)
+            views.append(view)
+            for watcher in views:
+                check_view(watcher, game)
+            if game.game_over or not game.legal_moves():
+                break
+            random_turn(game, rng)
+            feed.update()
+
+
+def test_repeated_messages_are_ignored():
+    rng = random.Random(0)
+    game = Connect5Game()
+    feed = SpectatorFeed(game)
+    view = SpectatorView()
+    messages = []
+    feed.subscribe(messages.append)
+    while not game.game_over and game.legal_moves():
+        random_turn(game, rng)
+        feed.update()
+    for message in messages + messages:
+        view.receive(message)
+    check_view(view, game)
+
+
+def test_delta_before_keyframe_is_rejected():
+    game = Connect5Game()
+    feed = SpectatorFeed(game)
+    messages = []
+    feed.subscribe(messages.append)
+    game.make_move(3)
+    feed.update()
+    with pytest.raises(ValueError):
+        SpectatorView().receive(messages[-1])
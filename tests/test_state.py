@@ -0,0 +1,82 @@
+"""Check that GameState undo restores the state play changed."""
+
+import random
+
+import pytest
+
+from bitboard import BitBoard
+from connect5 import TIMER_FORFEIT
+from state import GameState
+
+# Constants
+SHAPES = [(7, 8, 5), (6, 7, 4), (5, 5, 3), (4, 4, 2)]
+GAMES_PER_SHAPE = 30
+PASS_CHANCE = 0.1
+
+
+def snapshot(state):
+    """Copy every attribute of a state and its bitboard."""
+    board = {name: copy_value(getattr(state.bitboard, name))
+             for name in BitBoard.__slots__}
+    return board, state.turn, list(state.moves), state.winner
+
+
+def copy_value(value):
+    """Copy a list so later changes to it show up."""
+    return list(value) if isinstance(value, list) else value
+
+
+def play_and_undo(state, col):
+    """Play a column or pass, undo it and check nothing changed."""
+    before = snapshot(state)
+    if col == TIMER_FORFEIT:
+        state.pass_turn()
+    else:
+        state.play(col)
+    assert state.undo() == col
+    assert snapshot(state) == before
+
+
+@pytest.mark.parametrize("rows,columns,connect", SHAPES)
+def test_undo_restores_every_move(rows, columns, connect):
+    rng = random.Random(rows * 100 + columns * 10 + connect)
+    wins = 0
+    for _ in range(GAMES_PER_SHAPE):
+        state = GameState(rows, columns, connect)
+        while not state.is_over():
+            # Every legal move and a pass are taken back before one of
+            # them is played for real
+            for col in state.legal_moves() + (TIMER_FORFEIT,):
+                play_and_undo(state, col)
+            if rng.random() < PASS_CHANCE:
+                state.pass_turn()
+            else:
+                state.play(rng.choice(state.legal_moves()))
+        wins += state.winner is not None
+    assert wins
+
+
+def test_undo_after_a_win():
+    state = GameState(6, 7, 4)
+    for col in (0, 1, 0, 1, 0, 1):
+        state.play(col)
+    before = snapshot(state)
+    state.play(0)
+    assert state.winner == 1
+    assert state.is_over()
+    state.undo()
+    assert snapshot(state) == before
+    assert state.winner is None
+    assert state.legal_moves() == tuple(range(7))
+
+
+def test_undo_after_a_pass():
+    state = GameState()
+    state.play(3)
+    before = snapshot(state)
+    state.pass_turn()
+    assert state.turn == 0
+    assert state.moves[-1] == TIMER_FORFEIT
+    assert state.undo() == TIMER_FORFEIT
+    assert snapshot(state) == before
+    assert state.turn == 1
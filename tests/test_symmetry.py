@@ -0,0 +1,99 @@
+"""Check that mirror images share hashes and book moves."""
+
+import itertools
+import random
+
+import pytest
+
+from bitboard import BitBoard, PLAYER_ONE_PIECE, PLAYER_TWO_PIECE
+from connect5 import Connect5Game
+import opening_book
+from state import GameState
+
+# Constants
+SHAPES = [(7, 8, 5), (6, 7, 4), (5, 5, 3), (4, 6, 3)]
+GAMES_PER_SHAPE = 30
+BOOK_SHAPE = (5, 6, 4)
+BOOK_DEPTH = 3
+BOOK_SEARCH_DEPTH = 2
+
+
+def play_moves(board, moves):
+    """Play columns on a BitBoard, alternating from player 1."""
+    piece = PLAYER_ONE_PIECE
+    for col in moves:
+        board.play(col, piece)
+        piece = 3 - piece
+
+
+def play_game(rows, columns, connect, moves):
+    """Create a Connect5Game and play columns on it."""
+    game = Connect5Game(rows, columns, connect)
+    for col in moves:
+        game.make_move(col)
+    return game
+
+
+@pytest.mark.parametrize("rows,columns,connect", SHAPES)
+def test_mirror_shares_canonical_hash(rows, columns, connect):
+    rng = random.Random(rows * 100 + columns * 10 + connect)
+    for _ in range(GAMES_PER_SHAPE):
+        board = BitBoard(rows, columns, connect)
+        moves = []
+        piece = PLAYER_ONE_PIECE
+        while board.legal_mask:
+            moves.append(rng.choice(board.legal_columns))
+            board.play(moves[-1], piece)
+            piece = 3 - piece
+            # Built from scratch so the hashes are not shared updates
+            mirror = BitBoard(rows, columns, connect)
+            play_moves(mirror, [board.mirror_column(col) for col in moves])
+            assert mirror.hash == board.mirror_hash
+            assert mirror.mirror_hash == board.hash
+            assert mirror.canonical_key()[0] == board.canonical_key()[0]
+            for to_move in (PLAYER_ONE_PIECE, PLAYER_TWO_PIECE):
+                plain, flipped = board.canonical_hash(to_move)
+                assert mirror.canonical_hash(to_move)[0] == plain
+                if board.hash != board.mirror_hash:
+                    assert mirror.canonical_hash(to_move)[1] != flipped
+
+
+def test_game_state_mirror_shares_canonical_hash():
+    moves = [0, 1, 1, 5, 2, 7]
+    state = GameState()
+    mirror = GameState()
+    for col in moves:
+        state.play(col)
+        mirror.play(state.bitboard.mirror_column(col))
+    assert state.canonical_hash() == mirror.canonical_hash()
+    assert state.position_hash() != mirror.position_hash()
+
+
+def test_mirrored_book_hit_returns_mirrored_column(tmp_path):
+    rows, columns, connect = BOOK_SHAPE
+    path = str(tmp_path / "book.bin")
+    book = opening_book.generate(BOOK_DEPTH, BOOK_SEARCH_DEPTH, rows,
+                                 columns, connect)
+    opening_book.write_book(path, book, rows, columns, connect)
+    reader = opening_book.OpeningBook(path)
+    asymmetric = 0
+    try:
+        for length in range(BOOK_DEPTH):
+            for moves in itertools.product(range(columns), repeat=length):
+                game = play_game(rows, columns, connect, moves)
+                mirror = play_game(rows, columns, connect,
+                                   [columns - 1 - col for col in moves])
+                entry = reader.probe(game)
+                mirrored = reader.probe(mirror)
+                assert entry is not None and mirrored is not None
+                assert game.is_valid_location(entry.column)
+                if game.bitboard.key() == game.bitboard.mirror_key():
+                    # A symmetric position is its own mirror image
+                    assert mirrored == entry
+                    continue
+                assert mirrored.column == columns - 1 - entry.column
+                assert mirrored.score == entry.score
+                asymmetric += 1
+    finally:
+        reader.close()
+    assert asymmetric
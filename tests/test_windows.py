@@ -0,0 +1,112 @@
+"""Check incremental window counts against a brute-force board scan."""
+
+import random
+
+import pytest
+
+from bitboard import EMPTY_CELL, PLAYER_ONE_PIECE, PLAYER_TWO_PIECE
+from windows import WindowCounts, window_weights
+
+# Constants
+SHAPES = [(7, 8, 5), (6, 7, 4), (5, 5, 3), (4, 4, 2), (9, 4, 5)]
+GAMES_PER_SHAPE = 20
+UNDO_CHANCE = 0.3
+REPLACE_CHANCE = 0.1
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+def brute_force_windows(board, connect):
+    """List the (row, col) cells of every window of a list board."""
+    rows, columns = len(board), len(board[0])
+    windows = []
+    for row in range(rows):
+        for col in range(columns):
+            for d_row, d_col in DIRECTIONS:
+                end_row = row + d_row * (connect - 1)
+                end_col = col + d_col * (connect - 1)
+                if 0 <= end_row < rows and 0 <= end_col < columns:
+                    windows.append([(row + d_row * i, col + d_col * i)
+                                    for i in range(connect)])
+    return windows
+
+
+def brute_force_counts(board, connect):
+    """Score a list board and find each player's threat cells."""
+    weights = window_weights(connect)
+    stride = len(board) + 1
+    score = 0
+    threats = {PLAYER_ONE_PIECE: set(), PLAYER_TWO_PIECE: set()}
+    for window in brute_force_windows(board, connect):
+        pieces = [board[row][col] for row, col in window]
+        ones = pieces.count(PLAYER_ONE_PIECE)
+        twos = pieces.count(PLAYER_TWO_PIECE)
+        if ones and twos:
+            continue
+        score += weights[ones] - weights[twos]
+        for piece, count in ((PLAYER_ONE_PIECE, ones),
+                             (PLAYER_TWO_PIECE, twos)):
+            if count == connect - 1:
+                row, col = window[pieces.index(EMPTY_CELL)]
+                threats[piece].add(col * stride + row)
+    return score, threats
+
+
+def check_counts(counts, board, heights, connect):
+    """Compare every view of the counts with the brute-force scan."""
+    score, threats = brute_force_counts(board, connect)
+    stride = len(board) + 1
+    assert counts.score == score
+    for piece in (PLAYER_ONE_PIECE, PLAYER_TWO_PIECE):
+        assert counts.score_for(piece) == (score if piece == PLAYER_ONE_PIECE
+                                           else -score)
+        assert counts.threat_cells(piece) == threats[piece]
+        assert counts.winning_columns(piece, heights) == sorted(
+            {index // stride for index in threats[piece]
+             if index % stride == heights[index // stride]})
+
+
+@pytest.mark.parametrize("rows,columns,connect", SHAPES)
+def test_counts_follow_play_and_undo(rows, columns, connect):
+    rng = random.Random(rows * 100 + columns * 10 + connect)
+    for _ in range(GAMES_PER_SHAPE):
+        counts = WindowCounts(rows, columns, connect)
+        board = [[EMPTY_CELL] * columns for _ in range(rows)]
+        heights = [0] * columns
+        played = []
+        piece = PLAYER_ONE_PIECE
+        # Play until the board fills, taking back moves now and then
+        while len(played) < rows * columns:
+            open_columns = [col for col in range(columns)
+                            if heights[col] < rows]
+            if played and rng.random() < UNDO_CHANCE:
+                col = played.pop()
+                heights[col] -= 1
+                counts.remove(counts.cell(heights[col], col))
+                board[heights[col]][col] = EMPTY_CELL
+                piece = 3 - piece
+            else:
+                col = rng.choice(open_columns)
+                counts.add(counts.cell(heights[col], col), piece)
+                board[heights[col]][col] = piece
+                heights[col] += 1
+                played.append(col)
+                piece = 3 - piece
+            check_counts(counts, board, heights, connect)
+
+
+@pytest.mark.parametrize("rows,columns,connect", SHAPES)
+def test_set_replaces_stones(rows, columns, connect):
+    # set writes any cell, so stones may float and change hands
+    rng = random.Random(rows + columns + connect)
+    counts = WindowCounts(rows, columns, connect)
+    board = [[EMPTY_CELL] * columns for _ in range(rows)]
+    heights = [0] * columns
+    for _ in range(rows * columns * 4):
+        row, col = rng.randrange(rows), rng.randrange(columns)
+        if rng.random() < REPLACE_CHANCE:
+            piece = EMPTY_CELL
+        else:
+            piece = rng.choice((PLAYER_ONE_PIECE, PLAYER_TWO_PIECE))
+        counts.set(row, col, piece)
+        board[row][col] = piece
+        check_counts(counts, board, heights, connect)
@@ -0,0 +1,457 @@
+"""Round-robin AI tournaments with Elo ratings.
+
+Players are given as specs, a kind with optional integer settings:
+
+    random
+    heuristic
+    negamax:depth=6,table=65536    fixed depth, or time=MS for a budget
+    mcts:time=200,playouts=8       time budget per move
+
+Every pair of players meets the same number of games, alternating who
+moves first. Each game starts with a few random opening moves, and the
+two games of a pair played with swapped sides share their opening, so
+deterministic players do not replay one game over and over. Games are
+spread over a process pool and each game is seeded from the run seed
+and its index only, so results do not depend on the number of workers.
+Players searching on a time budget (mcts, or negamax with time and no
+depth) move differently on faster machines, so only runs without them
+repeat exactly.
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import ai
+import mcts
+import selfplay
+from bitboard import CONNECT_LENGTH
+from connect5 import Connect5Game, TIMER_MAX
+
+# Constants
+GAMES_PER_PAIR = 20
+OPENING_MOVES = 2
+MCTS_TIME_BUDGET = 200
+CHUNKS_PER_WORKER = 4
+DRAW = -1
+ELO_SCALE = 400 / math.log(10)  # Elo points per natural-log unit
+CONFIDENCE_Z = 1.96  # two-sided 95% interval
+PRIOR_DRAWS = 1  # virtual draws per pair, so perfect scores stay finite
+FIT_ITERATIONS = 10000
+FIT_TOLERANCE = 1e-10
+PLAYER_OPTIONS = {
+    "random": (),
+    "heuristic": (),
+    "negamax": ("depth", "time", "table"),
+    "mcts": ("time", "playouts", "leaves"),
+}
+
+Spec = Tuple[str, Dict[str, int]]
+
+
+class GameResult(NamedTuple):
+    """
+    The result of one tournament game.
+
+    Attributes:
+        players (Tuple[int, int]): Player indexes of the first and
+        second player.
+        winner (int): Player index of the winner, or DRAW.
+        moves (Tuple[int, int]): Moves made by the first and second
+        player.
+        think (Tuple[float, float]): Seconds spent choosing moves by the
+        first and second player.
+    """
+
+    players: Tuple[int, int]
+    winner: int
+    moves: Tuple[int, int]
+    think: Tuple[float, float]
+
+
+class Rating(NamedTuple):
+    """
+    The tournament result of one player.
+
+    Attributes:
+        name (str): The player spec.
+        elo (float): The rating, the mean of all players is 0.
+        margin (float): Half width of the 95% confidence interval.
+        wins (int): Games won.
+        draws (int): Games drawn.
+        losses (int): Games lost.
+        think_ms (float): Average time per move in milliseconds.
+    """
+
+    name: str
+    elo: float
+    margin: float
+    wins: int
+    draws: int
+    losses: int
+    think_ms: float
+
+
+class TournamentReport(NamedTuple):
+    """
+    Results of a tournament.
+
+    Attributes:
+        ratings (List[Rating]): Every player, best rated first.
+        games (int): Number of games played.
+        elapsed (float): Wall-clock time in seconds.
+        games_per_second (float): Throughput.
+    """
+
+    ratings: List[Rating]
+    games: int
+    elapsed: float
+    games_per_second: float
+
+
+def parse_spec(text: str) -> Spec:
+    """
+    Parse a player spec such as "negamax:depth=6".
+
+    Args:
+        text (str): The spec.
+
+    Returns:
+        Spec: The player kind and its settings.
+    """
+    kind, _, settings = text.partition(":")
+    if kind not in PLAYER_OPTIONS:
+        raise ValueError(f"unknown player kind: {kind}")
+    options: Dict[str, int] = {}
+    for setting in filter(None, settings.split(",")):
+        name, _, value = setting.partition("=")
+        if name not in PLAYER_OPTIONS[kind]:
+            raise ValueError(f"{kind} has no setting {name}")
+        try:
+            options[name] = int(value)
+        except ValueError:
+            raise ValueError(f"{kind} {name} must be an integer") from None
+    return kind, options
+
+
+class _Player:
+    """
+    One player's move chooser for a single game.
+
+    Searching players keep their state, such as the transposition table
+    or the MCTS tree, from one move to the next of the same game.
+    """
+
+    def __init__(self, spec: Spec, rng: random.Random) -> None:
+        """
+        Build the player for a new game.
+
+        Args:
+            spec (Spec): The player kind and its settings.
+            rng (random.Random): The game's random number generator.
+
+        Returns:
+        None
+        """
+        self.kind, self.options = spec
+        self.rng = rng
+        self.searcher = None
+        if self.kind == "negamax":
+            self.searcher = ai.NegamaxPlayer(
+                self.options.get("table", selfplay.SEARCH_TABLE_SIZE))
+        elif self.kind == "mcts":
+            self.searcher = mcts.MCTSPlayer(
+                1, self.options.get("playouts", mcts.PLAYOUTS_PER_LEAF),
+                self.options.get("leaves", mcts.LEAVES_PER_BATCH),
+                rng.getrandbits(32))
+
+    def move(self, game: Connect5Game) -> int:
+        """
+        Choose a column.
+
+        Args:
+            game (Connect5Game): The game to move in.
+
+        Returns:
+            int: The column to play.
+        """
+        options = self.options
+        if self.kind == "negamax":
+            if "time" in options:
+                return self.searcher.search(game, options["time"],
+                                            options.get("depth")).column
+            return self.searcher.search(
+                game, TIMER_MAX,
+                options.get("depth", selfplay.SEARCH_DEPTH)).column
+        if self.kind == "mcts":
+            return self.searcher.search(
+                game, options.get("time", MCTS_TIME_BUDGET)).column
+        return selfplay.POLICIES[self.kind](game, self.rng)
+
+
+def play_game(specs: Sequence[Spec], players: Tuple[int, int], opening: int,
+              seed: int, index: int,
+              opening_moves: int = OPENING_MOVES) -> GameResult:
+    """
+    Play one game between two players.
+
+    Args:
+        specs (Sequence[Spec]): Every player in the tournament.
+        players (Tuple[int, int]): Indexes of the first and second player.
+        opening (int): The number of the random opening to start from.
+        seed (int): The run seed.
+        index (int): The game number within the run.
+        opening_moves (int): Random moves played before the players
+        take over, which count for neither of them.
+
+    Returns:
+        GameResult: The result and the time each player took.
+    """
+    game = Connect5Game()
+    # Seeded with a string so openings are independent of game seeds
+    opening_rng = random.Random(f"opening {seed} {opening}")
+    for _ in range(opening_moves):
+        game.make_move(opening_rng.choice(game.legal_moves()))
+    rng = random.Random(seed * selfplay.GAME_SEED_STRIDE + index)
+    seats = (_Player(specs[players[0]], rng),
+             _Player(specs[players[1]], rng))
+    moves = [0, 0]
+    think = [0.0, 0.0]
+    winner = DRAW
+    while game.legal_moves():
+        side = game.turn
+        start = time.perf_counter()
+        col = seats[side].move(game)
+        think[side] += time.perf_counter() - start
+        moves[side] += 1
+        game.make_move(col)
+        if game.game_over:
+            winner = players[side]
+            break
+    return GameResult(players, winner, (moves[0], moves[1]),
+                      (think[0], think[1]))
+
+
+def _play_chunk(args: Tuple[Sequence[Spec], int, int,
+                            List[Tuple[int, Tuple[Tuple[int, int], int]]]]
+                ) -> List[GameResult]:
+    """
+    Play a list of games in a worker process.
+
+    Args:
+        args (tuple): The player specs, the seed, the opening moves and
+        the (index, (players, opening)) of each game.
+
+    Returns:
+        List[GameResult]: The results in game order.
+    """
+    specs, seed, opening_moves, games = args
+    return [play_game(specs, players, opening, seed, index, opening_moves)
+            for index, (players, opening) in games]
+
+
+def schedule(players: int, games_per_pair: int
+             ) -> List[Tuple[Tuple[int, int], int]]:
+    """
+    List the games of a round-robin, alternating the first player.
+
+    Args:
+        players (int): Number of players.
+        games_per_pair (int): Games each pair of players plays.
+
+    Returns:
+        List[Tuple[Tuple[int, int], int]]: The first and second player
+        of every game, and its opening number. Consecutive games of a
+        pair share an opening.
+    """
+    pairs = list(combinations(range(players), 2))
+    games = []
+    for game in range(games_per_pair):
+        for number, (first, second) in enumerate(pairs):
+            opening = game // 2 * len(pairs) + number
+            games.append(((first, second) if game % 2 == 0
+                          else (second, first), opening))
+    return games
+
+
+def fit_elo(players: int,
+            results: Sequence[GameResult]) -> Tuple[List[float],
+                                                    List[float]]:
+    """
+    Fit Elo ratings to game results by maximum likelihood.
+
+    The ratings are the Bradley-Terry strengths that best explain the
+    results, with a draw counting as half a win each way. Every pair
+    that met gets PRIOR_DRAWS extra draws so a player who won every game
+    still gets a finite rating. The margin comes from the Fisher
+    information of each player's own games.
+
+    Args:
+        players (int): Number of players.
+        results (Sequence[GameResult]): The games played.
+
+    Returns:
+        Tuple[List[float], List[float]]: The rating of each player, with
+        a mean of 0, and the half width of its 95% confidence interval.
+    """
+    games = [[0.0] * players for _ in range(players)]
+    score = [0.0] * players
+    for result in results:
+        first, second = result.players
+        games[first][second] += 1
+        games[second][first] += 1
+        if result.winner == DRAW:
+            score[first] += 0.5
+            score[second] += 0.5
+        else:
+            score[result.winner] += 1
+    for first, second in combinations(range(players), 2):
+        if games[first][second]:
+            for player in (first, second):
+                score[player] += 0.5 * PRIOR_DRAWS
+            games[first][second] += PRIOR_DRAWS
+            games[second][first] += PRIOR_DRAWS
+
+    # Minorization-maximization updates of the strengths
+    strength = [1.0] * players
+    for _ in range(FIT_ITERATIONS):
+        updated = []
+        for player in range(players):
+            total = sum(count / (strength[player] + strength[other])
+                        for other, count in enumerate(games[player])
+                        if count)
+            updated.append(score[player] / total if total else 1.0)
+        scale = math.exp(sum(map(math.log, updated)) / players)
+        updated = [value / scale for value in updated]
+        change = max(abs(math.log(new / old))
+                     for new, old in zip(updated, strength))
+        strength = updated
+        if change < FIT_TOLERANCE:
+            break
+
+    ratings = [ELO_SCALE * math.log(value) for value in strength]
+    margins = []
+    for player in range(players):
+        information = 0.0
+        for other, count in enumerate(games[player]):
+            if count:
+                expected = strength[player] / (strength[player] +
+                                               strength[other])
+                information += count * expected * (1 - expected)
+        margins.append(CONFIDENCE_Z * ELO_SCALE / math.sqrt(information)
+                       if information else math.inf)
+    return ratings, margins
+
+
+def run_tournament(specs: Sequence[str],
+                   games_per_pair: int = GAMES_PER_PAIR, seed: int = 0,
+                   workers: Optional[int] = None,
+                   opening_moves: int = OPENING_MOVES) -> TournamentReport:
+    """
+    Play a round-robin tournament across a process pool.
+
+    Args:
+        specs (Sequence[str]): The player specs, at least two.
+        games_per_pair (int): Games each pair of players plays.
+        seed (int): The run seed.
+        workers (Optional[int]): Number of processes, defaults to the
+        number of cores. 1 plays every game in this process.
+        opening_moves (int): Random moves that start every game.
+
+    Returns:
+        TournamentReport: The ratings of every player.
+    """
+    if len(specs) < 2:
+        raise ValueError("a tournament needs at least two players")
+    if len(set(specs)) != len(specs):
+        raise ValueError("player specs must be different")
+    # The first player needs CONNECT_LENGTH moves to win
+    if not 0 <= opening_moves < 2 * CONNECT_LENGTH - 1:
+        raise ValueError("the opening must end before anyone can win")
+    parsed = [parse_spec(spec) for spec in specs]
+    games = list(enumerate(schedule(len(specs), games_per_pair)))
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if workers == 1:
+        results = _play_chunk((parsed, seed, opening_moves, games))
+    else:
+        size = max(1, -(-len(games) // (workers * CHUNKS_PER_WORKER)))
+        chunks = [(parsed, seed, opening_moves, games[first:first + size])
+                  for first in range(0, len(games), size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk in pool.map(_play_chunk, chunks):
+                results.extend(chunk)
+    elapsed = time.perf_counter() - start
+
+    elos, margins = fit_elo(len(specs), results)
+    wins = [0] * len(specs)
+    draws = [0] * len(specs)
+    played = [0] * len(specs)
+    moves = [0] * len(specs)
+    think = [0.0] * len(specs)
+    for result in results:
+        for seat, player in enumerate(result.players):
+            played[player] += 1
+            moves[player] += result.moves[seat]
+            think[player] += result.think[seat]
+            if result.winner == DRAW:
+                draws[player] += 1
+        if result.winner != DRAW:
+            wins[result.winner] += 1
+    ratings = [Rating(spec, elos[player], margins[player], wins[player],
+                      draws[player],
+                      played[player] - wins[player] - draws[player],
+                      think[player] / moves[player] * ai.MS_PER_SECOND
+                      if moves[player] else 0.0)
+               for player, spec in enumerate(specs)]
+    ratings.sort(key=lambda rating: rating.elo, reverse=True)
+    return TournamentReport(ratings, len(results), elapsed,
+                            len(results) / elapsed if elapsed else 0.0)
+
+
+def main() -> None:
+    """
+    Run a tournament from the command line and print the ratings.
+
+    Returns:
+    None
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("players", nargs="+", metavar="PLAYER",
+                        help="player specs, at least two")
+    parser.add_argument("--games", type=int, default=GAMES_PER_PAIR,
+                        help="games per pair of players")
+    parser.add_argument("--opening", type=int, default=OPENING_MOVES,
+                        help="random moves that start every game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    options = parser.parse_args()
+
+    try:
+        report = run_tournament(options.players, options.games,
+                                options.seed, options.workers,
+                                options.opening)
+    except ValueError as error:
+        parser.error(str(error))
+    width = max(len(rating.name) for rating in report.ratings)
+    print(f"{'player':<{width}}      elo   +/-   W-D-L      ms/move")
+    for rating in report.ratings:
+        record = f"{rating.wins}-{rating.draws}-{rating.losses}"
+        print(f"{rating.name:<{width}} {rating.elo:8.1f} {rating.margin:5.0f}"
+              f"   {record:<11}{rating.think_ms:8.2f}")
+    print(f"{report.games} games in {report.elapsed:.2f}s "
+          f"({report.games_per_second:.1f} games/s)")
+
+
+if __name__ == "__main__":
+    main()
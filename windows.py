@@ -0,0 +1,336 @@
+"""Incremental stone counts for every winning window of a board."""
+
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from bitboard import (BitBoard, CONNECT_LENGTH, EMPTY_CELL, PLAYER_ONE_PIECE,
+                      PLAYER_TWO_PIECE, SENTINEL_ROWS)
+
+# Constants
+# Vertical, horizontal, positive and negative diagonal (row, col) steps
+WINDOW_DIRECTIONS = ((1, 0), (0, 1), (1, 1), (-1, 1))
+# Growth of a window's score per stone, matching the search heuristic
+WINDOW_WEIGHT_BASE = 8
+
+# Window cells and the windows through each cell, by board shape
+_WINDOW_INDEXES: Dict[Tuple[int, int, int],
+                      Tuple[List[Tuple[int, ...]],
+                            List[Tuple[int, ...]]]] = {}
+
+
+def window_index(rows: int, columns: int, connect: int = CONNECT_LENGTH
+                 ) -> Tuple[List[Tuple[int, ...]], List[Tuple[int, ...]]]:
+    """
+    Number every window of connect cells on a board.
+
+    Cells are numbered like bitboard bits, ``col * (rows + 1) + row``,
+    so the same index works for BitBoard and WindowCounts. The index is
+    built once per board shape and shared.
+
+    Args:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        connect (int): Number of checkers in a row needed to win.
+
+    Returns:
+        Tuple[List[Tuple[int, ...]], List[Tuple[int, ...]]]: The cells
+        of each window, and the windows through each cell.
+    """
+    shape = (rows, columns, connect)
+    if shape not in _WINDOW_INDEXES:
+        stride = rows + SENTINEL_ROWS
+        windows = []
+        through: List[List[int]] = [[] for _ in range(stride * columns)]
+        for row in range(rows):
+            for col in range(columns):
+                for row_step, col_step in WINDOW_DIRECTIONS:
+                    end_row = row + row_step * (connect - 1)
+                    end_col = col + col_step * (connect - 1)
+                    if not (0 <= end_row < rows and end_col < columns):
+                        continue
+                    cells = tuple((col + col_step * i) * stride +
+                                  row + row_step * i
+                                  for i in range(connect))
+                    for cell in cells:
+                        through[cell].append(len(windows))
+                    windows.append(cells)
+        _WINDOW_INDEXES[shape] = windows, [tuple(ids) for ids in through]
+    return _WINDOW_INDEXES[shape]
+
+
+def window_weights(connect: int) -> Tuple[int, ...]:
+    """
+    Get the default score of a window by number of stones.
+
+    Args:
+        connect (int): Number of checkers in a row needed to win.
+
+    Returns:
+        Tuple[int, ...]: The score for 0 to connect stones.
+    """
+    return (0,) + tuple(WINDOW_WEIGHT_BASE ** (count - 1)
+                        for count in range(1, connect + 1))
+
+
+class WindowCounts:
+    """
+    Stone counts per player for every window, updated one cell at a time.
+
+    Placing or removing a stone only touches the windows through its
+    cell (at most 4 * connect of them), so the heuristic score and the
+    set of open threats stay current without scanning the board.
+
+    A window scores weights[n] for the player holding all n stones in
+    it, and nothing if both players have stones in it. A threat is a
+    window one stone short of a win with no opposing stones.
+
+    Attributes:
+        rows (int): Number of rows on the game board.
+        columns (int): Number of columns on the game board.
+        connect (int): Number of pieces in a row needed to win.
+        windows (List[Tuple[int, ...]]): The cells of each window.
+        cell_windows (List[Tuple[int, ...]]): The windows through each
+        cell.
+        counts (List[List[int]]): Stones in each window, indexed by
+        piece like BitBoard.stones.
+        cells (List[int]): The piece in each cell.
+        score (int): The heuristic score for player 1.
+        threats (List[Set[int]]): The threat windows of each piece.
+    """
+
+    __slots__ = ("rows", "columns", "connect", "windows", "cell_windows",
+                 "counts", "cells", "score", "threats", "_stride",
+                 "_weights")
+
+    def __init__(self, rows: int, columns: int,
+                 connect: int = CONNECT_LENGTH,
+                 weights: Optional[Sequence[int]] = None) -> None:
+        """
+        Initialize WindowCounts for an empty board.
+
+        Args:
+            rows (int): Number of rows on the game board.
+            columns (int): Number of columns on the game board.
+            connect (int): Number of pieces in a row needed to win.
+            weights (Optional[Sequence[int]]): Score of a window by
+            number of stones, defaults to window_weights(connect). A
+            complete window scores the last weight times
+            WINDOW_WEIGHT_BASE if it is not given.
+
+        Returns:
+        None
+        """
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        self.windows, self.cell_windows = window_index(rows, columns,
+                                                       connect)
+        self.counts = [[], [0] * len(self.windows), [0] * len(self.windows)]
+        self.cells = [EMPTY_CELL] * len(self.cell_windows)
+        self.score = 0
+        self.threats: List[Set[int]] = [set(), set(), set()]
+        self._stride = rows + SENTINEL_ROWS
+        if weights is None:
+            weights = window_weights(connect)
+        weights = tuple(weights)
+        if len(weights) == connect:
+            weights += (weights[-1] * WINDOW_WEIGHT_BASE,)
+        self._weights = weights
+
+    @classmethod
+    def from_board(cls, board: BitBoard,
+                   weights: Optional[Sequence[int]] = None
+                   ) -> "WindowCounts":
+        """
+        Count the windows of an existing position.
+
+        Args:
+            board (BitBoard): The position to count.
+            weights (Optional[Sequence[int]]): Score of a window by
+            number of stones.
+
+        Returns:
+            WindowCounts: Counts matching the position.
+        """
+        counts = cls(board.rows, board.columns, board.connect, weights)
+        for piece in (PLAYER_ONE_PIECE, PLAYER_TWO_PIECE):
+            stones = board.stones[piece]
+            while stones:
+                low = stones & -stones
+                counts.add(low.bit_length() - 1, piece)
+                stones ^= low
+        return counts
+
+    def cell(self, row: int, col: int) -> int:
+        """
+        Get the index of a cell.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+
+        Returns:
+            int: The cell index used by add and remove.
+        """
+        return col * self._stride + row
+
+    def set(self, row: int, col: int, piece: int) -> None:
+        """
+        Change a cell, replacing or clearing any stone already there.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+            piece (int): The piece to place (EMPTY_CELL clears the cell).
+
+        Returns:
+        None
+        """
+        index = col * self._stride + row
+        if self.cells[index] != EMPTY_CELL:
+            self.remove(index)
+        if piece != EMPTY_CELL:
+            self.add(index, piece)
+
+    def add(self, index: int, piece: int) -> None:
+        """
+        Count a stone placed on an empty cell.
+
+        Args:
+            index (int): The cell index.
+            piece (int): The piece placed.
+
+        Returns:
+        None
+        """
+        self.cells[index] = piece
+        self._change(index, piece, 1)
+
+    def remove(self, index: int) -> None:
+        """
+        Uncount the stone on a cell.
+
+        Args:
+            index (int): The cell index.
+
+        Returns:
+        None
+        """
+        piece = self.cells[index]
+        self.cells[index] = EMPTY_CELL
+        self._change(index, piece, -1)
+
+    def _change(self, index: int, piece: int, step: int) -> None:
+        """
+        Add step stones of a piece to every window through a cell.
+
+        Args:
+            index (int): The cell index.
+            piece (int): The piece added or removed.
+            step (int): 1 to add the stone, -1 to remove it.
+
+        Returns:
+        None
+        """
+        own = self.counts[piece]
+        other = self.counts[3 - piece]
+        own_threats = self.threats[piece]
+        other_threats = self.threats[3 - piece]
+        weights = self._weights
+        short = self.connect - 1
+        delta = 0
+        for window in self.cell_windows[index]:
+            before = own[window]
+            after = before + step
+            own[window] = after
+            opposed = other[window]
+            if opposed:
+                # Only a window the piece leaves empty or first enters
+                # changes the other player's score and threats
+                if not after:
+                    delta -= weights[opposed]
+                    if opposed == short:
+                        other_threats.add(window)
+                elif not before:
+                    delta += weights[opposed]
+                    other_threats.discard(window)
+                continue
+            delta += weights[after] - weights[before]
+            if after == short:
+                own_threats.add(window)
+            elif before == short:
+                own_threats.discard(window)
+        self.score += delta if piece == PLAYER_ONE_PIECE else -delta
+
+    def score_for(self, piece: int) -> int:
+        """
+        Get the heuristic score for a player.
+
+        Args:
+            piece (int): The piece to score for.
+
+        Returns:
+            int: A positive score when the position favours piece.
+        """
+        return self.score if piece == PLAYER_ONE_PIECE else -self.score
+
+    def threat_cells(self, piece: int) -> Set[int]:
+        """
+        Get the empty cells that would complete a window for a player.
+
+        Args:
+            piece (int): The player's piece.
+
+        Returns:
+            Set[int]: The cell indexes.
+        """
+        cells = self.cells
+        found = set()
+        for window in self.threats[piece]:
+            for index in self.windows[window]:
+                if cells[index] == EMPTY_CELL:
+                    found.add(index)
+                    break
+        return found
+
+    def winning_columns(self, piece: int, heights: Sequence[int]
+                        ) -> List[int]:
+        """
+        Find the columns a player wins by playing now.
+
+        Args:
+            piece (int): The player's piece.
+            heights (Sequence[int]): Number of filled cells per column.
+
+        Returns:
+            List[int]: The winning columns in ascending order.
+        """
+        stride = self._stride
+        return sorted({index // stride
+                       for index in self.threat_cells(piece)
+                       if index % stride == heights[index // stride]})
+
+    def open_fours(self, piece: int) -> int:
+        """
+        Count the open lines of a player.
+
+        An open line is connect - 1 stones in a row with an empty cell
+        at both ends, so it shows up as two threats sharing the same
+        stones. The other player can only block one end.
+
+        Args:
+            piece (int): The player's piece.
+
+        Returns:
+            int: The number of open lines.
+        """
+        cells = self.cells
+        seen = set()
+        lines = 0
+        for window in self.threats[piece]:
+            stones = frozenset(index for index in self.windows[window]
+                               if cells[index] != EMPTY_CELL)
+            if stones in seen:
+                lines += 1
+            else:
+                seen.add(stones)
+        return lines